@@ -0,0 +1,104 @@
+"""1-minute and 1-hour continuous aggregates, hierarchical on joint_samples_1s"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0002"
+down_revision = "20250820_0001"
+branch_labels = None
+depends_on = None
+
+
+# (view, source, bucket width, refresh start_offset, end_offset, schedule_interval)
+ROLLUPS = (
+    ("joint_samples_1m", "joint_samples_1s", "1 minute", "1 day", "2 minutes", "5 minutes"),
+    ("joint_samples_1h", "joint_samples_1m", "1 hour", "7 days", "1 hour", "30 minutes"),
+)
+
+
+def _add_refresh_policy(view: str, start: str, end: str, every: str) -> None:
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+          mat_schema TEXT;
+          mat_name   TEXT;
+        BEGIN
+          SELECT materialization_hypertable_schema, materialization_hypertable_name
+            INTO mat_schema, mat_name
+          FROM timescaledb_information.continuous_aggregates
+          WHERE view_schema='public' AND view_name='{view}';
+
+          IF mat_schema IS NOT NULL AND NOT EXISTS (
+            SELECT 1
+            FROM timescaledb_information.jobs
+            WHERE proc_name = 'policy_refresh_continuous_aggregate'
+              AND hypertable_schema = mat_schema
+              AND hypertable_name   = mat_name
+          ) THEN
+            PERFORM add_continuous_aggregate_policy(
+              '{view}',
+              start_offset => INTERVAL '{start}',
+              end_offset   => INTERVAL '{end}',
+              schedule_interval => INTERVAL '{every}'
+            );
+          END IF;
+        END$$;
+        """
+    )
+
+
+def _remove_refresh_policy(view: str) -> None:
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+          job_id INTEGER;
+        BEGIN
+          SELECT j.job_id INTO job_id
+          FROM timescaledb_information.jobs j
+          JOIN timescaledb_information.continuous_aggregates c
+            ON j.hypertable_schema = c.materialization_hypertable_schema
+           AND j.hypertable_name   = c.materialization_hypertable_name
+          WHERE j.proc_name = 'policy_refresh_continuous_aggregate'
+            AND c.view_schema='public' AND c.view_name='{view}';
+
+          IF job_id IS NOT NULL THEN
+            PERFORM remove_continuous_aggregate_policy('{view}');
+          END IF;
+        END$$;
+        """
+    )
+
+
+def upgrade() -> None:
+    # Hierarchical CAGGs (TimescaleDB >= 2.9): each level re-aggregates the one
+    # below, so refreshing 1h never touches raw chunks. Same columns as 1s, so
+    # readers can switch levels by table name alone.
+    for view, source, width, start, end, every in ROLLUPS:
+        op.execute(
+            f"""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS {view}
+            WITH (timescaledb.continuous) AS
+            SELECT
+              time_bucket('{width}', bucket) AS bucket,
+              joint_id,
+              run_id,
+              AVG(avg_position) AS avg_position,
+              MIN(min_position) AS min_position,
+              MAX(max_position) AS max_position,
+              AVG(avg_velocity) AS avg_velocity,
+              AVG(avg_torque)   AS avg_torque,
+              AVG(avg_supply_v) AS avg_supply_v
+            FROM {source}
+            GROUP BY 1, joint_id, run_id
+            WITH NO DATA;
+            """
+        )
+        _add_refresh_policy(view, start, end, every)
+
+
+def downgrade() -> None:
+    for view, *_ in reversed(ROLLUPS):
+        _remove_refresh_policy(view)
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {view}")
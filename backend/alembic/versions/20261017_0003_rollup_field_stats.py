@@ -0,0 +1,178 @@
+"""Per-field statistics and fault counts in the 1s/1m/1h continuous aggregates
+
+A continuous aggregate can't gain columns, so the 1s one is rebuilt. The old
+joint_samples_1s is kept (frozen, no refresh policy) as
+joint_samples_1s_legacy: it may hold buckets older than the raw retention
+that can't be recomputed. The new levels are backfilled from what raw data
+is left, which can take a while on a large joint_samples.
+
+Fields are nullable and not all drivers report all of them, so each level
+keeps `n_<field>` (non-NULL samples of that field) next to `sample_count`,
+and the coarser levels weight a field's means by its own count.
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0003"
+down_revision = "20261017_0002"
+branch_labels = None
+depends_on = None
+
+
+FIELDS = ("position", "velocity", "torque", "motor_temp", "controller_temp", "supply_v")
+
+# (view, source, bucket width, refresh start_offset, end_offset, schedule_interval)
+LEVELS = (
+    ("joint_samples_1s", "joint_samples", "1 second", "1 hour", "1 minute", "1 minute"),
+    ("joint_samples_1m", "joint_samples_1s", "1 minute", "1 day", "2 minutes", "5 minutes"),
+    ("joint_samples_1h", "joint_samples_1m", "1 hour", "7 days", "1 hour", "30 minutes"),
+)
+
+
+def _add_refresh_policy(view: str, start: str, end: str, every: str) -> None:
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+          mat_schema TEXT;
+          mat_name   TEXT;
+        BEGIN
+          SELECT materialization_hypertable_schema, materialization_hypertable_name
+            INTO mat_schema, mat_name
+          FROM timescaledb_information.continuous_aggregates
+          WHERE view_schema='public' AND view_name='{view}';
+
+          IF mat_schema IS NOT NULL AND NOT EXISTS (
+            SELECT 1
+            FROM timescaledb_information.jobs
+            WHERE proc_name = 'policy_refresh_continuous_aggregate'
+              AND hypertable_schema = mat_schema
+              AND hypertable_name   = mat_name
+          ) THEN
+            PERFORM add_continuous_aggregate_policy(
+              '{view}',
+              start_offset => INTERVAL '{start}',
+              end_offset   => INTERVAL '{end}',
+              schedule_interval => INTERVAL '{every}'
+            );
+          END IF;
+        END$$;
+        """
+    )
+
+
+def _remove_refresh_policy(view: str) -> None:
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+          job_id INTEGER;
+        BEGIN
+          SELECT j.job_id INTO job_id
+          FROM timescaledb_information.jobs j
+          JOIN timescaledb_information.continuous_aggregates c
+            ON j.hypertable_schema = c.materialization_hypertable_schema
+           AND j.hypertable_name   = c.materialization_hypertable_name
+          WHERE j.proc_name = 'policy_refresh_continuous_aggregate'
+            AND c.view_schema='public' AND c.view_name='{view}';
+
+          IF job_id IS NOT NULL THEN
+            PERFORM remove_continuous_aggregate_policy('{view}');
+          END IF;
+        END$$;
+        """
+    )
+
+
+def _stats_from_raw() -> str:
+    cols = []
+    for f in FIELDS:
+        cols += [
+            f"AVG({f}) AS avg_{f}", f"MIN({f}) AS min_{f}", f"MAX({f}) AS max_{f}", f"COUNT({f}) AS n_{f}",
+        ]
+    cols += [
+        "COUNT(*) AS sample_count",
+        "SUM(CASE WHEN fault_code <> 0 THEN 1 ELSE 0 END) AS fault_count",
+    ]
+    return ",\n              ".join(cols)
+
+
+def _stats_from_level() -> str:
+    cols = []
+    for f in FIELDS:
+        # Weighted by the samples that had the field, so partly filled
+        # buckets and rows where it was NULL don't skew the mean
+        cols += [
+            f"SUM(avg_{f} * n_{f}) / NULLIF(SUM(n_{f}), 0) AS avg_{f}",
+            f"MIN(min_{f}) AS min_{f}",
+            f"MAX(max_{f}) AS max_{f}",
+            f"SUM(n_{f})::bigint AS n_{f}",
+        ]
+    cols += [
+        "SUM(sample_count)::bigint AS sample_count",
+        "SUM(fault_count)::bigint AS fault_count",
+    ]
+    return ",\n              ".join(cols)
+
+
+def upgrade() -> None:
+    for view in ("joint_samples_1h", "joint_samples_1m"):
+        _remove_refresh_policy(view)
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {view}")
+    _remove_refresh_policy("joint_samples_1s")
+    op.execute("ALTER MATERIALIZED VIEW joint_samples_1s RENAME TO joint_samples_1s_legacy")
+
+    for view, source, width, start, end, every in LEVELS:
+        ts, stats = ("ts", _stats_from_raw()) if source == "joint_samples" else ("bucket", _stats_from_level())
+        op.execute(
+            f"""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS {view}
+            WITH (timescaledb.continuous) AS
+            SELECT
+              time_bucket('{width}', {ts}) AS bucket,
+              joint_id,
+              run_id,
+              {stats}
+            FROM {source}
+            GROUP BY 1, joint_id, run_id
+            WITH NO DATA;
+            """
+        )
+        _add_refresh_policy(view, start, end, every)
+
+    # refresh_continuous_aggregate can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for view, *_ in LEVELS:
+            op.execute(f"CALL refresh_continuous_aggregate('{view}', NULL, NULL)")
+
+
+def downgrade() -> None:
+    for view, *_ in reversed(LEVELS):
+        _remove_refresh_policy(view)
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {view}")
+    op.execute("ALTER MATERIALIZED VIEW joint_samples_1s_legacy RENAME TO joint_samples_1s")
+    _add_refresh_policy("joint_samples_1s", "1 hour", "1 minute", "1 minute")
+
+    # Shapes from 20261017_0002
+    for view, source, width, start, end, every in LEVELS[1:]:
+        op.execute(
+            f"""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS {view}
+            WITH (timescaledb.continuous) AS
+            SELECT
+              time_bucket('{width}', bucket) AS bucket,
+              joint_id,
+              run_id,
+              AVG(avg_position) AS avg_position,
+              MIN(min_position) AS min_position,
+              MAX(max_position) AS max_position,
+              AVG(avg_velocity) AS avg_velocity,
+              AVG(avg_torque)   AS avg_torque,
+              AVG(avg_supply_v) AS avg_supply_v
+            FROM {source}
+            GROUP BY 1, joint_id, run_id
+            WITH NO DATA;
+            """
+        )
+        _add_refresh_policy(view, start, end, every)
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request, Depends
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends
 from backend.joints.odrive.joint import ODriveJoint
+from backend.joints.odrive.can_joint import ODriveCanJoint
 from backend.joints.moteus.joint import MoteusJoint
 from backend.joints.base import Joint
+from backend.joints import batch, trajectory
+from backend.util.spline import setpoints
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import uuid4
 from datetime import datetime, timezone
-import json
 
 from backend.db import get_session
 from backend.models import RunEvent
 from backend.api.ws_manager import manager
-from pydantic import BaseModel, ConfigDict, model_validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from typing import Dict, Optional, Literal, List, Any
 
 router = APIRouter(prefix="/joints", tags=["joints"])
@@ -19,6 +22,8 @@ router = APIRouter(prefix="/joints", tags=["joints"])
 joints: Dict[str, Joint] = {
     # ODrive on can0, node 0
     # "joint1": ODriveJoint(serial_number="385F324D3037", node_id=0),
+    # ODrive over CANSimple (telemetry from cyclic messages, no polling)
+    # "joint2": ODriveCanJoint(node_id=0, channel="can0"),
     "joint1": MoteusJoint(node_id=1),
 }
 
@@ -77,6 +82,75 @@ class MoveResponse(BaseModel):
     # Allow extra keys from specific joint.move(...) implementations
     model_config = ConfigDict(extra='allow')
 
+class MoveTarget(BaseModel):
+    joint: str
+    position: float
+    velocity: Optional[float] = None
+    accel: Optional[float] = None
+    hold: bool = True
+
+    model_config = ConfigDict(extra='forbid')
+
+class MoveBatchBody(BaseModel):
+    moves: List[MoveTarget] = Field(min_length=1)
+    run_id: Optional[int] = None
+
+    @model_validator(mode="after")
+    def unique_joints(self):
+        names = [m.joint for m in self.moves]
+        if len(set(names)) != len(names):
+            raise ValueError("Each joint may appear only once per batch.")
+        return self
+
+class MoveBatchResponse(BaseModel):
+    ok: bool
+    batch_id: str
+    # Per joint: {"ok", "cmd_id", **joint.move(...)} or {"ok": False, "error"}
+    results: Dict[str, MoveResponse]
+
+class TrajectoryBody(BaseModel):
+    joints: List[str] = Field(min_length=1)
+    times: List[float] = Field(min_length=2)    # s from the start, increasing
+    positions: List[List[float]]                # turns: one row per waypoint, one column per joint
+    velocities: Optional[List[List[float]]] = None     # rev/s at each waypoint (cubic/quintic)
+    accelerations: Optional[List[List[float]]] = None  # rev/s^2 at each waypoint (quintic)
+    method: Literal["linear", "cubic", "quintic"] = "cubic"
+    rate_hz: float = Field(trajectory.TRAJ_RATE_HZ, gt=0, le=trajectory.TRAJ_MAX_RATE_HZ)
+    # Start from where the joints are now: their positions become a waypoint at t=0
+    from_current: bool = False
+    hold: bool = True
+    run_id: Optional[int] = None
+
+    model_config = ConfigDict(extra='forbid')
+
+    @model_validator(mode="after")
+    def unique_joints(self):
+        if len(set(self.joints)) != len(self.joints):
+            raise ValueError("Each joint may appear only once per trajectory.")
+        return self
+
+class TrackingError(BaseModel):
+    max_error: Optional[float] = None  # turns
+    rms_error: Optional[float] = None  # turns
+    samples: int
+
+class TrajectoryStatus(BaseModel):
+    id: str
+    state: Literal['pending', 'running', 'done', 'aborted', 'error']
+    error: Optional[str] = None
+    joints: List[str]
+    cmd_ids: Dict[str, str]
+    run_id: Optional[int] = None
+    rate_hz: float
+    duration_s: float
+    cycles_total: int
+    cycles: int
+    index: int
+    missed: int
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    tracking: Dict[str, TrackingError]
+
 class StopResponse(BaseModel):
     status: Literal['stopped']
 
@@ -98,7 +172,9 @@ def list_joints() -> List[JointSummary]:
     """
     result = []
     for name, joint in joints.items():
-        if isinstance(joint, ODriveJoint):
+        if getattr(joint, "joint_type", None):
+            jtype = joint.joint_type  # RemoteJoint proxy (SAMPLER_PROCESS=1)
+        elif isinstance(joint, ODriveJoint):
             jtype = "odrive"
         elif isinstance(joint, MoteusJoint):
             jtype = "moteus"
@@ -121,7 +197,6 @@ async def move_joint(
     accel: Optional[float] = None,
     hold: bool = True,
     run_id: Optional[int] = None,
-    request: Request = None,
     session: AsyncSession = Depends(get_session),
 ) -> MoveResponse:
     joint = joints.get(joint_name)
@@ -135,17 +210,18 @@ async def move_joint(
         await joint.status()
     except Exception:
         # Tell UI immediately
-        await manager.broadcast(joint_name, json.dumps({
+        await manager.broadcast(joint_name, {
             "type": "cmd_ack",
             "joint_id": joint_name,
             "cmd_id": cmd_id,
             "accepted": False,
             "run_id": run_id,
             "reason": "joint_offline",
-        }))
+        })
         raise HTTPException(status_code=503, detail="Joint is offline; try again when power/transport is available")
 
-    # Only if online: (optionally) log event + enqueue target + ack(true) + send command
+    # Only if online: (optionally) log event + ack(true) + send command
+    # (the sampler mirrors the new target into the next sample row)
     if run_id is not None:
         evt = RunEvent(
             run_id=run_id,
@@ -157,41 +233,208 @@ async def move_joint(
         session.add(evt)
         await session.commit()
 
-    ingestor = request.app.state.ingestor
-    await ingestor.enqueue({
-        "ts": datetime.now(timezone.utc),
-        "joint_id": joint_name,
-        "run_id": run_id,
-        "position": None,
-        "velocity": None,
-        "accel": None,
-        "torque": None,
-        "supply_v": None,
-        "motor_temp": None,
-        "controller_temp": None,
-        "mode": None,
-        "fault_code": None,
-        "error_flags": None,
-        "target_position": position,
-        "target_velocity": velocity,
-        "target_accel": accel,
-        "target_torque": None,
-    })
-
-    await manager.broadcast(joint_name, json.dumps({
+    await manager.broadcast(joint_name, {
         "type": "cmd_ack",
         "joint_id": joint_name,
         "cmd_id": cmd_id,
         "accepted": True,
         "run_id": run_id,
         "cmd": {"position": position, "velocity": velocity, "accel": accel, "hold": hold},
-    }))
+    })
 
     result = await joint.move(position, velocity, accel, hold, cmd_id=cmd_id, run_id=run_id)
     # Preserve existing shape: {"ok": True, "cmd_id": ..., **result}
     return {"ok": True, "cmd_id": cmd_id, **(result or {})}
 
 
+@router.post("/move-batch", operation_id="moveJointsBatch", response_model=MoveBatchResponse)
+async def move_joints_batch(
+    body: MoveBatchBody,
+    session: AsyncSession = Depends(get_session),
+) -> MoveBatchResponse:
+    """
+    Move several joints as one command: one readiness probe and one RunEvent
+    insert for the whole batch, and the position commands of joints on a
+    shared transport sent in a single cycle.
+    """
+    unknown = [m.joint for m in body.moves if m.joint not in joints]
+    if unknown:
+        raise HTTPException(404, f"Unknown joint(s): {', '.join(unknown)}")
+
+    run_id = body.run_id
+    batch_id = str(uuid4())
+    cmd_ids = {m.joint: str(uuid4()) for m in body.moves}
+
+    offline = await batch.probe({m.joint: joints[m.joint] for m in body.moves})
+    if offline:
+        await asyncio.gather(*(
+            manager.broadcast(m.joint, {
+                "type": "cmd_ack",
+                "joint_id": m.joint,
+                "cmd_id": cmd_ids[m.joint],
+                "batch_id": batch_id,
+                "accepted": False,
+                "run_id": run_id,
+                "reason": "joint_offline",
+            })
+            for m in body.moves
+        ))
+        raise HTTPException(
+            status_code=503,
+            detail=f"Joint(s) offline: {', '.join(offline)}; nothing was sent",
+        )
+
+    if run_id is not None:
+        now = datetime.now(timezone.utc)
+        session.add_all([
+            RunEvent(
+                run_id=run_id,
+                joint_id=m.joint,
+                event_type="move_requested",
+                payload={
+                    "position": m.position, "velocity": m.velocity, "accel": m.accel,
+                    "hold": m.hold, "batch_id": batch_id,
+                },
+                ts=now,
+            )
+            for m in body.moves
+        ])
+        await session.commit()
+
+    # No sample row here: joint_samples.position is NOT NULL, and the
+    # sampler's next tick mirrors the new targets into a measured sample
+
+    await asyncio.gather(*(
+        manager.broadcast(m.joint, {
+            "type": "cmd_ack",
+            "joint_id": m.joint,
+            "cmd_id": cmd_ids[m.joint],
+            "batch_id": batch_id,
+            "accepted": True,
+            "run_id": run_id,
+            "cmd": {"position": m.position, "velocity": m.velocity, "accel": m.accel, "hold": m.hold},
+        })
+        for m in body.moves
+    ))
+
+    sent = await batch.move({
+        m.joint: (joints[m.joint], m.position, m.velocity, m.accel, m.hold, cmd_ids[m.joint], run_id)
+        for m in body.moves
+    })
+    results = {}
+    for m in body.moves:
+        result = sent.get(m.joint) or {}
+        results[m.joint] = {"ok": "error" not in result, "cmd_id": cmd_ids[m.joint], **result}
+    return {
+        "ok": all(r["ok"] for r in results.values()),
+        "batch_id": batch_id,
+        "results": results,
+    }
+
+
+@router.post("/trajectory", operation_id="startTrajectory", response_model=TrajectoryStatus)
+async def start_trajectory(
+    body: TrajectoryBody,
+    session: AsyncSession = Depends(get_session),
+) -> TrajectoryStatus:
+    """
+    Stream a multi-joint trajectory through the waypoints at `rate_hz`.
+    Returns once streaming has started; poll GET /joints/trajectory/{id}.
+    """
+    unknown = [n for n in body.joints if n not in joints]
+    if unknown:
+        raise HTTPException(404, f"Unknown joint(s): {', '.join(unknown)}")
+    busy = trajectory.busy_joints(body.joints)
+    if busy:
+        raise HTTPException(409, f"Joint(s) already running a trajectory: {', '.join(busy)}")
+
+    statuses = await asyncio.gather(*(joints[n].status() for n in body.joints), return_exceptions=True)
+    current = [None if isinstance(st, Exception) else st.get("position") for st in statuses]
+    offline = [n for n, p in zip(body.joints, current) if p is None]
+    if offline:
+        raise HTTPException(503, f"Joint(s) offline: {', '.join(offline)}; nothing was sent")
+
+    times, positions = body.times, body.positions
+    velocities, accelerations = body.velocities, body.accelerations
+    if body.from_current:
+        if times[0] <= 0:
+            raise HTTPException(400, "With from_current, waypoint times must start after 0")
+        zero = [0.0] * len(body.joints)
+        times, positions = [0.0, *times], [current, *positions]
+        velocities = velocities and [zero, *velocities]
+        accelerations = accelerations and [zero, *accelerations]
+    if times[-1] - times[0] > trajectory.TRAJ_MAX_SECONDS:
+        raise HTTPException(400, f"Trajectory longer than {trajectory.TRAJ_MAX_SECONDS:g} s")
+
+    try:
+        _, pos, vel, acc = await asyncio.to_thread(
+            setpoints, times, positions, body.rate_hz, body.method, velocities, accelerations,
+        )
+        run = trajectory.TrajectoryRun(
+            {n: joints[n] for n in body.joints}, pos, vel, acc, body.rate_hz, body.hold, body.run_id,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    far = [
+        f"{n} ({abs(pos[0, i] - current[i]):.3f} turns)"
+        for i, n in enumerate(body.joints)
+        if abs(pos[0, i] - current[i]) > trajectory.TRAJ_START_TOLERANCE
+    ]
+    if far:
+        raise HTTPException(409, f"First waypoint is away from the current position of: {', '.join(far)}")
+
+    if body.run_id is not None:
+        now = datetime.now(timezone.utc)
+        session.add_all([
+            RunEvent(
+                run_id=body.run_id,
+                joint_id=n,
+                event_type="trajectory_requested",
+                payload={
+                    "trajectory_id": run.id, "method": body.method, "rate_hz": body.rate_hz,
+                    "times": times, "positions": [row[i] for row in positions],
+                },
+                ts=now,
+            )
+            for i, n in enumerate(body.joints)
+        ])
+        await session.commit()
+
+    await asyncio.gather(*(
+        manager.broadcast(n, {
+            "type": "cmd_ack",
+            "joint_id": n,
+            "cmd_id": run.cmd_ids[n],
+            "trajectory_id": run.id,
+            "accepted": True,
+            "run_id": body.run_id,
+        })
+        for n in body.joints
+    ))
+
+    trajectory.start(run)
+    return run.as_dict()
+
+
+@router.get("/trajectory/{trajectory_id}", operation_id="getTrajectory", response_model=TrajectoryStatus)
+async def get_trajectory(trajectory_id: str) -> TrajectoryStatus:
+    run = trajectory.get(trajectory_id)
+    if run is None:
+        raise HTTPException(404, "Unknown trajectory")
+    return run.as_dict()
+
+
+@router.post("/trajectory/{trajectory_id}/abort", operation_id="abortTrajectory", response_model=TrajectoryStatus)
+async def abort_trajectory(trajectory_id: str) -> TrajectoryStatus:
+    """Stop streaming; the joints are stopped as by POST /joints/{name}/stop."""
+    run = trajectory.get(trajectory_id)
+    if run is None:
+        raise HTTPException(404, "Unknown trajectory")
+    await run.abort()
+    return run.as_dict()
+
+
 @router.post("/{joint_name}/stop", response_model=StopResponse)
 async def stop_joint(joint_name: str) -> StopResponse:
     joint = joints.get(joint_name)
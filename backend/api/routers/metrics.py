@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+from backend.api.ws_manager import manager
+from backend.ingest.query_cache import query_cache
+from backend.util.metrics import registry, render_stats
+
+router = APIRouter(tags=["metrics"])
+
+_INGEST_COUNTERS = ("enqueued", "dropped", "spilled", "flushed", "flushes", "flush_errors", "lost", "rejected")
+_SPOOL_COUNTERS = ("spooled", "replayed", "dropped")
+_CACHE_COUNTERS = ("hits", "misses", "evictions", "expired", "invalidated", "clears")
+_WS_COUNTERS = ("broadcasts", "dropped", "sends", "send_errors", "coalesced", "compact_frames")
+
+
+@router.get("/metrics", operation_id="getMetrics", response_class=PlainTextResponse)
+async def metrics(request: Request) -> PlainTextResponse:
+    """
+    Prometheus text exposition: sampler latency/period histograms and missed
+    deadlines, event-loop lag, plus the ingest queue, query cache and
+    WebSocket stats.
+    """
+    lines = [registry.render()]
+
+    ingestor = getattr(request.app.state, "ingestor", None)
+    if ingestor is not None:
+        stats = ingestor.stats()
+        spool = stats.pop("spool", None)
+        lines += render_stats(
+            "telemetry_ingest", stats, _INGEST_COUNTERS, "Telemetry ingest", backend=stats["backend"],
+        )
+        if spool:
+            lines += render_stats("telemetry_spool", spool, _SPOOL_COUNTERS, "Telemetry write-ahead spool")
+
+    lines += render_stats("telemetry_query_cache", query_cache.stats(), _CACHE_COUNTERS, "Telemetry query cache")
+
+    ws = manager.stats.as_dict()
+    ws["connections"] = manager.connection_count()
+    lines += render_stats("ws_broadcast", ws, _WS_COUNTERS, "WebSocket broadcast")
+
+    lines.append("")
+    return PlainTextResponse("\n".join(lines), media_type="text/plain; version=0.0.4")
@@ -1,11 +1,13 @@
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Literal
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend.db import get_session
 from backend.models import Run
+from backend.api import run_export
 
 router = APIRouter(prefix="/runs", tags=["runs"])
 
@@ -53,4 +55,42 @@ async def stop_run(run_id: int, session: AsyncSession = Depends(get_session)):
     if run.ended_at is None:
         run.ended_at = datetime.now(timezone.utc)
         await session.commit()
-    return RunStopOut(run_id=run.id, ended_at=run.ended_at)
\ No newline at end of file
+    return RunStopOut(run_id=run.id, ended_at=run.ended_at)
+
+
+async def _export_run_check(run_id: int, session: AsyncSession) -> None:
+    if not run_export.available():
+        raise HTTPException(501, "Run export needs pyarrow (pip install pyarrow)")
+    if (await session.execute(select(Run.id).where(Run.id == run_id))).first() is None:
+        raise HTTPException(404, "Run not found")
+
+@router.get("/{run_id}/export.arrow", operation_id="exportRunArrow", response_class=StreamingResponse)
+async def export_run_arrow(
+    run_id: int,
+    table: Literal["samples", "events"] = Query("samples"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Arrow IPC stream of the run's joint_samples (all joints, time order),
+    or its run_events with ?table=events.
+    """
+    await _export_run_check(run_id, session)
+    return StreamingResponse(
+        run_export.arrow_stream(run_id, table),
+        media_type=run_export.ARROW_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="run{run_id}_{table}.arrow"'},
+    )
+
+@router.get("/{run_id}/export.parquet", operation_id="exportRunParquet", response_class=StreamingResponse)
+async def export_run_parquet(
+    run_id: int,
+    table: Literal["samples", "events"] = Query("samples"),
+    session: AsyncSession = Depends(get_session),
+):
+    """Parquet file of the run's joint_samples, or its run_events with ?table=events."""
+    await _export_run_check(run_id, session)
+    return StreamingResponse(
+        run_export.parquet_stream(run_id, table),
+        media_type=run_export.PARQUET_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="run{run_id}_{table}.parquet"'},
+    )
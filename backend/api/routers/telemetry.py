@@ -1,13 +1,28 @@
+import asyncio
+import base64
+import csv
+import io
+import os
+import time
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional, Any, Dict
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import AsyncIterator, List, Literal, Optional, Any, Dict
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, model_validator
 from sqlalchemy import select, desc, text
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend.db import get_session
+from backend.db import SessionLocal, get_session
+from backend.db_pool import db_pool
 from backend.models import JointSample
 from backend.api.routers.joints import joints
+from backend.ingest.query_cache import SAMPLES_SETTLE_S, query_cache, segment_starts
+from backend.ingest.columnar import COLUMNS, FLOAT_COLUMNS, ts_to_us, us_to_ts
 from backend.ingest.telemetry_queue import ingestor
+from backend.joints.sampler import get_sampler_stats
+from backend.api.ws_manager import manager
+from backend.util.downsample import downsample
+from backend.util.json_fast import fast_dumps_bytes
 
 router = APIRouter(prefix="/telemetry", tags=["telemetry"])
 
@@ -70,8 +85,130 @@ def _row_from_sample(joint_name: str, s: SampleIn, run_id: Optional[int]) -> Dic
         "run_id": run_id,
     }
 
+# Rows fetched per server-side cursor round trip and written per response chunk
+EXPORT_CHUNK = 2000
+_EXPORT_MEDIA = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Continuous aggregates per level, and the fields they keep avg/min/max of
+ROLLUP_VIEWS = {"1s": "joint_samples_1s", "1m": "joint_samples_1m", "1h": "joint_samples_1h"}
+ROLLUP_FIELDS = ("position", "velocity", "torque", "motor_temp", "controller_temp", "supply_v")
+# Longest /rollup window per level (1s: 43200 rows per joint and run)
+ROLLUP_MAX_MINUTES = {"1s": 720, "1m": 7 * 24 * 60, "1h": 366 * 24 * 60}
+# Query cache segments per level, and how long after a segment ends its rows
+# may still change (refresh end_offset + schedule interval, plus the level below)
+ROLLUP_SEGMENT_S = {"1s": 60, "1m": 3600, "1h": 86400}
+ROLLUP_SETTLE_S = {"1s": 120, "1m": 120 + 420, "1h": 120 + 420 + 5400}
+# Same for raw samples behind /samples (settle time: see query_cache)
+SAMPLES_SEGMENT_S = 10
+# Rollup levels for /series, coarsest first: (name, view, seconds per row)
+SERIES_LEVELS = (
+    ("1h", ROLLUP_VIEWS["1h"], 3600.0),
+    ("1m", ROLLUP_VIEWS["1m"], 60.0),
+    ("1s", ROLLUP_VIEWS["1s"], 1.0),
+)
+# Raw rows per second per joint, used to estimate how many a range holds
+SERIES_RAW_HZ = float(os.getenv("SAMPLER_HZ", 100))
+# Most raw rows method=lttb|minmax will pull into memory for one request
+SERIES_MAX_RAW_ROWS = int(os.getenv("SERIES_MAX_RAW_ROWS", 2_000_000))
+
+
+def _ndjson_chunk(rows) -> bytes:
+    out = []
+    for row in rows:
+        rec = dict(zip(COLUMNS, row))
+        rec["ts"] = rec["ts"].isoformat()
+        out.append(fast_dumps_bytes(rec))
+    out.append(b"")
+    return b"\n".join(out)
+
+
+def _csv_chunk(rows, header: bool = False) -> bytes:
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    if header:
+        w.writerow(COLUMNS)
+    w.writerows(
+        ["" if v is None else (v.isoformat() if isinstance(v, datetime) else v) for v in row]
+        for row in rows
+    )
+    return buf.getvalue().encode("utf-8")
+
+
+async def _export_stream(q, fmt: str) -> AsyncIterator[bytes]:
+    # Own session: a request-scoped dependency would be closed before the body is streamed
+    async with SessionLocal() as session:
+        result = await session.stream(q.execution_options(yield_per=EXPORT_CHUNK))
+        if fmt == "csv":
+            yield _csv_chunk((), header=True)
+        async for rows in result.partitions():
+            yield _ndjson_chunk(rows) if fmt == "ndjson" else _csv_chunk(rows)
+
 # ---------- Endpoints ----------
 
+@router.get("/sampler/stats", operation_id="getSamplerStats")
+async def sampler_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-tick latency for each running sampler loop (per joint, or per bus in SAMPLER_MODE=bus)."""
+    return get_sampler_stats()
+
+@router.get("/sampler/process", operation_id="getSamplerProcessStats")
+async def sampler_process_stats(request: Request) -> Dict[str, Any]:
+    """Sampler process liveness, restarts and ring counters (SAMPLER_PROCESS=1 only)."""
+    proc = getattr(request.app.state, "sampler_process", None)
+    if proc is None:
+        raise HTTPException(404, "Sampler runs in the API process (SAMPLER_PROCESS=0)")
+    return proc.stats()
+
+@router.get("/ingest/stats", operation_id="getIngestStats")
+async def ingest_stats(request: Request) -> Dict[str, Any]:
+    """Ingest queue depth, enqueued/dropped/flushed row counters and flush latency."""
+    return request.app.state.ingestor.stats()
+
+@router.get("/cache/stats", operation_id="getQueryCacheStats")
+async def query_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters of the segment cache behind /rollup and /samples."""
+    return query_cache.stats()
+
+@router.get("/db/stats", operation_id="getDbPoolStats")
+async def db_pool_stats() -> Dict[str, Any]:
+    """asyncpg pool used for the hot statements: size, acquires, wait percentiles."""
+    return db_pool.stats()
+
+@router.get("/ws/stats", operation_id="getWsStats")
+async def ws_stats() -> Dict[str, Any]:
+    """WebSocket broadcast encode/send timings, fan-out and drops."""
+    return {"connections": manager.connection_count(), **manager.stats.as_dict()}
+
+@router.get("/export", operation_id="exportTelemetry", response_class=StreamingResponse)
+async def export_samples(
+    joint_id: Optional[str] = Query(None, description="Only this joint (default: all joints)"),
+    run_id: Optional[int] = Query(None),
+    start: Optional[datetime] = Query(None, description="Inclusive lower bound on ts"),
+    end: Optional[datetime] = Query(None, description="Exclusive upper bound on ts"),
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+):
+    """
+    Stream raw samples in time order as NDJSON or CSV. Rows come off a
+    server-side cursor EXPORT_CHUNK at a time and are written out chunk by
+    chunk, so memory stays flat however large the range is.
+    """
+    t = JointSample.__table__.c
+    q = select(*[t[c] for c in COLUMNS])
+    if joint_id is not None:
+        q = q.where(t.joint_id == joint_id)
+    if run_id is not None:
+        q = q.where(t.run_id == run_id)
+    if start is not None:
+        q = q.where(t.ts >= start)
+    if end is not None:
+        q = q.where(t.ts < end)
+    q = q.order_by(t.ts)
+    name = f"telemetry_{joint_id or 'all'}{f'_run{run_id}' if run_id is not None else ''}.{format}"
+    return StreamingResponse(
+        _export_stream(q, format),
+        media_type=_EXPORT_MEDIA[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
+
 @router.post("/{joint_name}/samples", operation_id="postTelemetrySamples")
 async def add_sample_or_batch(
     joint_name: str,
@@ -95,41 +232,191 @@ async def add_sample_or_batch(
         from sqlalchemy import insert
         await session.execute(insert(JointSample), rows)
         await session.commit()
+        for r in rows:
+            ingestor.history.append_row(r)
+        ts_us = [ts_to_us(r["ts"]) for r in rows]
+        query_cache.written(joint_name, min(ts_us), max(ts_us))
     else:
         for r in rows:
             await ingestor.enqueue(r)
     return {"ok": True, "count": len(rows)}
 
+def _sample_out(r: JointSample) -> SampleOut:
+    return SampleOut(
+        joint_id=r.joint_id, ts=r.ts, run_id=r.run_id,
+        position=r.position, velocity=r.velocity, accel=r.accel,
+        torque=r.torque, supply_v=r.supply_v,
+        motor_temp=r.motor_temp, controller_temp=r.controller_temp,
+        mode=r.mode, fault_code=r.fault_code, error_flags=r.error_flags,
+        target_position=r.target_position, target_velocity=r.target_velocity,
+        target_accel=r.target_accel, target_torque=r.target_torque,
+    )
+
+# Latest-N for /samples without a window: the asyncpg pool's prepared form
+_LATEST_SQL = f"SELECT {', '.join(COLUMNS)} FROM joint_samples WHERE joint_id = $1 ORDER BY ts DESC LIMIT $2"
+_LATEST_RUN_SQL = (
+    f"SELECT {', '.join(COLUMNS)} FROM joint_samples WHERE joint_id = $1 AND run_id = $3 ORDER BY ts DESC LIMIT $2"
+)
+db_pool.warm_up(_LATEST_SQL, "", 0)
+db_pool.warm_up(_LATEST_RUN_SQL, "", 0, 0)
+
+async def _samples_query(session, joint_name, run_id, start=None, end=None, limit=None) -> List[SampleOut]:
+    if start is None and end is None and limit is not None and db_pool.ready:
+        if run_id is None:
+            rows = await db_pool.fetch(_LATEST_SQL, joint_name, limit)
+        else:
+            rows = await db_pool.fetch(_LATEST_RUN_SQL, joint_name, limit, run_id)
+        return [SampleOut(**dict(r)) for r in rows]
+    q = select(JointSample).where(JointSample.joint_id == joint_name)
+    if run_id is not None:
+        q = q.where(JointSample.run_id == run_id)
+    if start is not None:
+        q = q.where(JointSample.ts >= start)
+    if end is not None:
+        q = q.where(JointSample.ts < end)
+    q = q.order_by(desc(JointSample.ts))
+    if limit is not None:
+        q = q.limit(limit)
+    return [_sample_out(r) for r in (await session.execute(q)).scalars().all()]
+
+async def _samples_since(session, joint_name, run_id, cutoff: datetime, limit: int) -> List[SampleOut]:
+    """Newest-first rows since `cutoff`: the open tail from the DB, closed segments from the cache."""
+    now_us = time.time_ns() // 1000
+    width = SAMPLES_SEGMENT_S * 1_000_000
+    cutoff_us = ts_to_us(cutoff)
+    closed = [
+        a for a in segment_starts(cutoff_us, now_us, width)
+        if a + width <= now_us - SAMPLES_SETTLE_S * 1_000_000
+    ]
+    tail_from = us_to_ts(closed[-1] + width) if closed else cutoff
+    rows = await _samples_query(session, joint_name, run_id, start=tail_from, limit=limit)
+    key = ("samples", joint_name, run_id, COLUMNS)
+    for a in reversed(closed):
+        if len(rows) >= limit:
+            break
+        seg = query_cache.get(key + (a,))
+        if seg is None:
+            seg = await _samples_query(session, joint_name, run_id, start=us_to_ts(a), end=us_to_ts(a + width))
+            query_cache.put(key + (a,), seg, joint_name, a, a + width)
+        if a < cutoff_us:
+            seg = [r for r in seg if r.ts >= cutoff]
+        rows.extend(seg)
+    return rows[:limit]
+
 @router.get("/{joint_name}/samples", response_model=List[SampleOut], operation_id="getTelemetrySamples")
 async def get_samples(
     joint_name: str,
+    response: Response,
     limit: int = Query(1000, ge=1, le=100000),
     since_seconds: Optional[int] = Query(None, ge=1),
     run_id: Optional[int] = Query(None),
     session: AsyncSession = Depends(get_session),
 ):
+    """
+    Newest samples first. Windows that fit in the in-memory history ring
+    (TELEMETRY_HISTORY_SECONDS) are answered from it; `X-Telemetry-Source`
+    says whether `memory` or `db` served the request. Older parts of a
+    `since_seconds` window come from the query cache once they've settled.
+    """
     if joint_name not in joints:
         raise HTTPException(404, "Unknown joint")
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=since_seconds) if since_seconds else None
+
+    if cutoff is not None:
+        recent = ingestor.history.recent(joint_name, ts_to_us(cutoff), limit, run_id)
+        if recent is not None:
+            response.headers["X-Telemetry-Source"] = "memory"
+            return [SampleOut(**r) for r in recent]
+
+    response.headers["X-Telemetry-Source"] = "db"
+    if cutoff is not None:
+        return await _samples_since(session, joint_name, run_id, cutoff, limit)
+    return await _samples_query(session, joint_name, run_id, limit=limit)
+
+class SamplesPage(BaseModel):
+    samples: List[SampleOut]
+    next_cursor: str  # pass back as ?cursor= on the next poll
+    overlap_cursor: str  # next_cursor moved SAMPLES_SETTLE_S back, to catch late rows
+
+# Cursor = (ts in µs, row id); id -1 means every row at that ts has been returned
+def _encode_cursor(ts_us: int, row_id: int = -1) -> str:
+    return base64.urlsafe_b64encode(f"{ts_us}:{row_id}".encode()).decode().rstrip("=")
+
+def _page(samples: List[SampleOut], ts_us: int, row_id: int = -1) -> SamplesPage:
+    return SamplesPage(
+        samples=samples,
+        next_cursor=_encode_cursor(ts_us, row_id),
+        overlap_cursor=_encode_cursor(ts_us - SAMPLES_SETTLE_S * 1_000_000),
+    )
+
+def _decode_cursor(cursor: str):
+    try:
+        ts_us, row_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split(":")
+        return int(ts_us), int(row_id)
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+@router.get("/{joint_name}/samples/after", response_model=SamplesPage, operation_id="getTelemetrySamplesAfter")
+async def get_samples_after(
+    joint_name: str,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous poll"),
+    since_seconds: int = Query(10, ge=0, description="Where to start when there's no cursor"),
+    limit: int = Query(1000, ge=1, le=100000),
+    run_id: Optional[int] = Query(None),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Incremental polling: samples strictly after `cursor`, oldest first, and
+    the cursor to resume from. Each poll only reads rows it hasn't returned
+    before, from the history ring when it covers them (`X-Telemetry-Source`
+    as for /samples) or else off the (joint_id, ts) index.
+
+    Rows are ordered by ts, so a row that lands after a poll with a ts
+    older than that poll's cursor is not returned from next_cursor: a
+    backfilled POST, spooled rows replayed after a DB outage, or rows held
+    in the ingest queue while the DB stalled. Rows normally land within
+    SAMPLES_SETTLE_S; a client that must see them polls from
+    `overlap_cursor` (next_cursor moved that far back) every so often, or
+    always, and drops rows it already has by (ts, run_id), since the
+    sampler writes one row per joint and timestamp. Rows replayed from a
+    longer outage only show up in /samples?start=&end= reads.
+    """
+    if joint_name not in joints:
+        raise HTTPException(404, "Unknown joint")
+    if cursor is not None:
+        after_us, after_id = _decode_cursor(cursor)
+    else:
+        after_us, after_id = time.time_ns() // 1000 - since_seconds * 1_000_000, -1
+
+    if after_id < 0:
+        recent = ingestor.history.after(joint_name, after_us, limit, run_id)
+        if recent is not None:
+            response.headers["X-Telemetry-Source"] = "memory"
+            if not recent:
+                return _page([], after_us)
+            return _page([SampleOut(**r) for r in recent], ts_to_us(recent[-1]["ts"]))
+
+    after = us_to_ts(after_us)
     q = select(JointSample).where(JointSample.joint_id == joint_name)
     if run_id is not None:
         q = q.where(JointSample.run_id == run_id)
-    if since_seconds:
-        cutoff = datetime.now(timezone.utc) - timedelta(seconds=since_seconds)
-        q = q.where(JointSample.ts >= cutoff)
-    q = q.order_by(desc(JointSample.ts)).limit(limit)
-    res = (await session.execute(q)).scalars().all()
-    return [
-        SampleOut(
-            joint_id=r.joint_id, ts=r.ts, run_id=r.run_id,
-            position=r.position, velocity=r.velocity, accel=r.accel,
-            torque=r.torque, supply_v=r.supply_v,
-            motor_temp=r.motor_temp, controller_temp=r.controller_temp,
-            mode=r.mode, fault_code=r.fault_code, error_flags=r.error_flags,
-            target_position=r.target_position, target_velocity=r.target_velocity,
-            target_accel=r.target_accel, target_torque=r.target_torque,
+    if after_id < 0:
+        q = q.where(JointSample.ts > after)
+    else:
+        q = q.where(JointSample.ts >= after).where(
+            (JointSample.ts > after) | (JointSample.id > after_id)
         )
-        for r in res
-    ]
+    q = q.order_by(JointSample.ts, JointSample.id).limit(limit + 1)
+    res = (await session.execute(q)).scalars().all()
+    response.headers["X-Telemetry-Source"] = "db"
+    page = res[:limit]
+    if not page:
+        return _page([], after_us, after_id)
+    last = page[-1]
+    # Only pin the row id when the page stops inside a group of equal timestamps
+    split = len(res) > limit and res[limit].ts == last.ts
+    return _page([_sample_out(r) for r in page], ts_to_us(last.ts), last.id if split else -1)
 
 class RollupPoint(BaseModel):
     ts: datetime = Field(alias="bucket")
@@ -139,37 +426,301 @@ class RollupPoint(BaseModel):
     min_position: Optional[float] = None
     max_position: Optional[float] = None
     avg_velocity: Optional[float] = None
+    min_velocity: Optional[float] = None
+    max_velocity: Optional[float] = None
     avg_torque: Optional[float] = None
+    min_torque: Optional[float] = None
+    max_torque: Optional[float] = None
+    avg_motor_temp: Optional[float] = None
+    min_motor_temp: Optional[float] = None
+    max_motor_temp: Optional[float] = None
+    avg_controller_temp: Optional[float] = None
+    min_controller_temp: Optional[float] = None
+    max_controller_temp: Optional[float] = None
     avg_supply_v: Optional[float] = None
+    min_supply_v: Optional[float] = None
+    max_supply_v: Optional[float] = None
+    sample_count: Optional[int] = None
+    fault_count: Optional[int] = None  # samples with a non-zero fault_code
+
+_ROLLUP_COLUMNS = ", ".join(
+    [f"{agg}_{f}" for f in ROLLUP_FIELDS for agg in ("avg", "min", "max")] + ["sample_count", "fault_count"]
+)
+
+def _rollup_pg_sql(level: str, bounded: bool, by_run: bool) -> str:
+    """Rollup select for the asyncpg pool: $1 joint, $2 start[, $3 end][, run]."""
+    where = "joint_id = $1 AND bucket >= $2"
+    n = 2
+    if bounded:
+        n += 1
+        where += f" AND bucket < ${n}"
+    if by_run:
+        n += 1
+        where += f" AND run_id = ${n}"
+    return (
+        f"SELECT bucket, joint_id, run_id, {_ROLLUP_COLUMNS} FROM {ROLLUP_VIEWS[level]} "
+        f"WHERE {where} ORDER BY bucket ASC"
+    )
+
+_ROLLUP_PG_SQL = {
+    (level, bounded, by_run): _rollup_pg_sql(level, bounded, by_run)
+    for level in ROLLUP_VIEWS for bounded in (False, True) for by_run in (False, True)
+}
+def _warm_rollups() -> None:
+    epoch = us_to_ts(0)
+    for (level, bounded, by_run), sql in _ROLLUP_PG_SQL.items():
+        db_pool.warm_up(sql, "", *([epoch] * (2 if bounded else 1)), *([0] if by_run else []))
+
+_warm_rollups()
+
+async def _rollup_query(session, level, params, start_us, end_us=None) -> List[Dict[str, Any]]:
+    if db_pool.ready:
+        args = [params["joint_id"], us_to_ts(start_us)]
+        if end_us is not None:
+            args.append(us_to_ts(end_us))
+        if "run_id" in params:
+            args.append(params["run_id"])
+        sql = _ROLLUP_PG_SQL[(level, end_us is not None, "run_id" in params)]
+        return [dict(r) for r in await db_pool.fetch(sql, *args)]
+    params = dict(params, start=us_to_ts(start_us))
+    where = "joint_id = :joint_id AND bucket >= :start"
+    if end_us is not None:
+        where += " AND bucket < :end"
+        params["end"] = us_to_ts(end_us)
+    if "run_id" in params:
+        where += " AND run_id = :run_id"
+    sql = text(f"""
+        SELECT bucket, joint_id, run_id, {_ROLLUP_COLUMNS}
+        FROM {ROLLUP_VIEWS[level]}
+        WHERE {where}
+        ORDER BY bucket ASC
+    """)
+    return [dict(r) for r in (await session.execute(sql, params)).mappings().all()]
 
 @router.get("/{joint_name}/rollup", response_model=List[RollupPoint], operation_id="getTelemetryRollup")
-async def rollup_1s(
+async def rollup(
     joint_name: str,
-    minutes: int = Query(10, ge=1, le=720),
+    minutes: int = Query(10, ge=1, description="Window ending now; at most ROLLUP_MAX_MINUTES[level]"),
+    level: Literal["1s", "1m", "1h"] = Query("1s"),
     run_id: Optional[int] = Query(None),
     session: AsyncSession = Depends(get_session),
 ):
+    """
+    Rollup rows of the last `minutes`. Segments of the window that have
+    settled (ROLLUP_SETTLE_S) are served from the query cache; only the
+    open tail is read from the aggregate on every call.
+    """
     if joint_name not in joints:
         raise HTTPException(404, "Unknown joint")
+    if minutes > ROLLUP_MAX_MINUTES[level]:
+        raise HTTPException(400, f"At most {ROLLUP_MAX_MINUTES[level]} minutes at level {level}")
 
-    params: Dict[str, Any] = {
-        "joint_id": joint_name,
-        "since": minutes,
-    }
-    where_run = ""
+    params: Dict[str, Any] = {"joint_id": joint_name}
+    if run_id is not None:
+        params["run_id"] = run_id
+    now_us = time.time_ns() // 1000
+    start_us = now_us - minutes * 60_000_000
+    width = ROLLUP_SEGMENT_S[level] * 1_000_000
+    starts = segment_starts(start_us, now_us, width)
+    closed = [a for a in starts if a + width <= now_us - ROLLUP_SETTLE_S[level] * 1_000_000]
+
+    key = ("rollup", level, joint_name, run_id, ROLLUP_FIELDS)
+    segs: Dict[int, List[Dict[str, Any]]] = {}
+    missing: List[int] = []
+    for a in closed:
+        rows = query_cache.get(key + (a,))
+        if rows is None:
+            missing.append(a)
+        else:
+            segs[a] = rows
+    # One query per run of adjacent missing segments, split back per segment
+    while missing:
+        n = 1
+        while n < len(missing) and missing[n] == missing[n - 1] + width:
+            n += 1
+        lo, hi = missing[0], missing[n - 1] + width
+        fetched: Dict[int, List[Dict[str, Any]]] = {a: [] for a in missing[:n]}
+        for r in await _rollup_query(session, level, params, lo, hi):
+            b = ts_to_us(r["bucket"])
+            fetched[b - b % width].append(r)
+        for a, rows in fetched.items():
+            query_cache.put(key + (a,), rows, joint_name, a, a + width)
+        segs.update(fetched)
+        missing = missing[n:]
+
+    out = [r for a in closed for r in segs[a]]
+    if closed and closed[0] < start_us:
+        # The first segment starts before the window
+        out = [r for r in segs[closed[0]] if ts_to_us(r["bucket"]) >= start_us] + out[len(segs[closed[0]]):]
+    out += await _rollup_query(session, level, params, closed[-1] + width if closed else start_us)
+    return [RollupPoint(**r) for r in out]
+
+class SeriesPoint(BaseModel):
+    ts: datetime
+    avg: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class SeriesOut(BaseModel):
+    joint_id: str
+    field: str
+    method: str
+    source: Literal["raw", "1s", "1m", "1h"]
+    bucket_seconds: Optional[float] = None  # None: raw rows, one point per sample
+    points: List[SeriesPoint]
+
+def _series_plan(span_s: float, max_points: int, levels=SERIES_LEVELS, raw: bool = True):
+    """
+    (source name, table, bucket seconds) for a span drawn in at most
+    max_points. `raw` allows unbucketed rows when the span should hold no
+    more than max_points of them at SAMPLER_HZ.
+    """
+    if raw and span_s * SERIES_RAW_HZ <= max_points:
+        return "raw", "joint_samples", None
+    width = span_s / max_points
+    for name, view, res in levels:
+        if res <= width:
+            return name, view, width
+    return "raw", "joint_samples", width
+
+def _series_where(run_id: Optional[int], ts_col: str, params: Dict[str, Any]) -> str:
+    where = f"joint_id = :joint_id AND {ts_col} >= :start AND {ts_col} < :end"
     if run_id is not None:
-        where_run = "AND run_id = :run_id"
+        where += " AND run_id = :run_id"
         params["run_id"] = run_id
+    return where
+
+async def _series_envelope(session, field, params, run_id, max_points, span_s):
+    # Fields without rollups (accel, targets) bucket raw rows
+    levels = SERIES_LEVELS if field in ROLLUP_FIELDS else ()
+    source, table, width = _series_plan(span_s, max_points, levels)
+    if width is None:
+        where = _series_where(run_id, "ts", params)
+        params["limit"] = max_points + 1
+        sql = text(f"""
+            SELECT ts AS ts, {field} AS avg, {field} AS min, {field} AS max
+            FROM joint_samples
+            WHERE {where}
+            ORDER BY ts ASC
+            LIMIT :limit
+        """)
+        rows = (await session.execute(sql, params)).mappings().all()
+        if len(rows) <= max_points:
+            return source, width, [SeriesPoint(**row) for row in rows]
+        # Denser than SAMPLER_HZ (several writers, backfill): bucket instead
+        # of cutting off the end of the range
+        source, table, width = _series_plan(span_s, max_points, levels, raw=False)
 
+    raw = table == "joint_samples"
+    ts_col = "ts" if raw else "bucket"
+    where = _series_where(run_id, ts_col, params)
+    if raw:
+        aggs = f"AVG({field}) AS avg, MIN({field}) AS min, MAX({field}) AS max"
+    else:
+        # Weight rollup means by the field's own sample counts, as the coarser levels do
+        aggs = (
+            f"SUM(avg_{field} * n_{field}) / NULLIF(SUM(n_{field}), 0) AS avg, "
+            f"MIN(min_{field}) AS min, MAX(max_{field}) AS max"
+        )
+    # Buckets aligned on `start`, so [start, end) splits into max_points of
+    # them; rounding of the width can open one more at the very end, which
+    # is folded into the last
+    params["width"] = width
+    params["last"] = max_points - 1
     sql = text(f"""
-        SELECT bucket, joint_id, run_id,
-               avg_position, min_position, max_position,
-               avg_velocity, avg_torque, avg_supply_v
-        FROM joint_samples_1s
-        WHERE joint_id = :joint_id
-          AND bucket >= now() - (:since || ' minutes')::interval
-          {where_run}
-        ORDER BY bucket ASC
+        SELECT LEAST(
+                   time_bucket(make_interval(secs => :width), {ts_col}, CAST(:start AS timestamptz)),
+                   CAST(:start AS timestamptz) + make_interval(secs => :width) * :last
+               ) AS ts,
+               {aggs}
+        FROM {table}
+        WHERE {where}
+        GROUP BY 1
+        ORDER BY 1 ASC
     """)
     rows = (await session.execute(sql, params)).mappings().all()
-    return [RollupPoint(**row) for row in rows]
+    return source, width, [SeriesPoint(**row) for row in rows]
+
+def _pick_points(t: np.ndarray, v: np.ndarray, max_points: int, method: str) -> List[SeriesPoint]:
+    idx = downsample(t, v, max_points, method)
+    return [
+        SeriesPoint(ts=us_to_ts(int(us)), avg=y, min=y, max=y)
+        for us, y in zip(t[idx].tolist(), v[idx].tolist())
+    ]
+
+async def _series_samples(session, field, params, run_id, max_points, method):
+    where = _series_where(run_id, "ts", params)
+    params["limit"] = SERIES_MAX_RAW_ROWS + 1
+    sql = text(f"""
+        SELECT (extract(epoch FROM ts) * 1000000)::bigint AS t, {field} AS v
+        FROM joint_samples
+        WHERE {where}
+        ORDER BY ts ASC
+        LIMIT :limit
+    """)
+    result = await session.stream(sql.execution_options(yield_per=EXPORT_CHUNK * 10), params)
+    ts_parts, v_parts = [], []
+    async for rows in result.partitions():
+        t, v = zip(*rows)
+        ts_parts.append(np.array(t, dtype=np.int64))
+        v_parts.append(np.array(v, dtype=np.float64))  # NULL -> nan, skipped by downsample
+    if not ts_parts:
+        return []
+    t = np.concatenate(ts_parts)
+    if len(t) > SERIES_MAX_RAW_ROWS:
+        raise HTTPException(400, f"More than {SERIES_MAX_RAW_ROWS} samples in range; narrow it or use method=envelope")
+    return await asyncio.to_thread(_pick_points, t, np.concatenate(v_parts), max_points, method)
+
+@router.get("/{joint_name}/series", response_model=SeriesOut, operation_id="getTelemetrySeries")
+async def series(
+    joint_name: str,
+    start: Optional[datetime] = Query(None, description="Inclusive; default end - 10 minutes"),
+    end: Optional[datetime] = Query(None, description="Exclusive; default now"),
+    max_points: int = Query(1000, ge=2, le=20000),
+    run_id: Optional[int] = Query(None),
+    field: Literal[FLOAT_COLUMNS] = Query("position"),
+    method: Literal["envelope", "lttb", "minmax"] = Query("envelope"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    `field` over [start, end) in at most `max_points` points.
+
+    method=envelope reads the cheapest source that still resolves the
+    requested width: raw rows when the whole range fits, else the coarsest
+    of the 1h/1m/1s rollups (or raw samples, below 1 s) re-bucketed to
+    span / max_points. Each point keeps the min/max envelope of everything
+    it covers, so spikes survive the downsampling. Rollups only hold what
+    their refresh policy has materialized, so the newest minute or so of a
+    range read from them is missing.
+
+    method=lttb|minmax reads the raw samples (at most SERIES_MAX_RAW_ROWS)
+    and keeps real samples picked by backend.util.downsample; avg, min and
+    max of each point are the sample's value.
+    """
+    if joint_name not in joints:
+        raise HTTPException(404, "Unknown joint")
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(minutes=10)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise HTTPException(400, "start must be before end")
+
+    params: Dict[str, Any] = {"joint_id": joint_name, "start": start, "end": end}
+    if method == "envelope":
+        source, width, points = await _series_envelope(
+            session, field, params, run_id, max_points, (end - start).total_seconds(),
+        )
+    else:
+        source, width = "raw", None
+        points = await _series_samples(session, field, params, run_id, max_points, method)
+    return SeriesOut(
+        joint_id=joint_name,
+        field=field,
+        method=method,
+        source=source,
+        bucket_seconds=width,
+        points=points,
+    )
@@ -1,25 +1,51 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import asyncio
+import json
+import math
 from datetime import datetime, timezone
 
 from backend.api.ws_manager import manager
 from backend.joints.sampler import get_last_snapshot
 from backend.api.routers.joints import joints
-from backend.util.json_fast import fast_dumps 
 
 router = APIRouter(prefix="/ws", tags=["ws"])
 
+
+def _client_options(websocket: WebSocket):
+    q = websocket.query_params
+    binary = q.get("frames") == "binary"
+    try:
+        rate_hz = float(q["rate_hz"]) if q.get("rate_hz") else None
+    except ValueError:
+        rate_hz = None
+    fields = [f for f in q.get("fields", "").split(",") if f] or None
+    compact = q.get("encoding") == "compact"
+    return binary, rate_hz, fields, compact
+
+
 @router.websocket("/joint/{joint_name}")
 async def ws_joint(websocket: WebSocket, joint_name: str):
+    # Optional query params:
+    #   ?frames=binary      same JSON payloads as binary frames (skips the str decode)
+    #   ?rate_hz=5          telemetry at most this often (latest value wins in between)
+    #   ?fields=position,velocity   only these telemetry fields (plus type/ts/joint_id)
+    #   ?encoding=compact   schema message, then delta-encoded binary telemetry (ws_compact)
+    binary, rate_hz, fields, compact = _client_options(websocket)
+
     # Accept first, then register with manager
     await websocket.accept()
-    await manager.connect(joint_name, websocket)
+    sub = await manager.connect(
+        joint_name, websocket, binary=binary, rate_hz=rate_hz, fields=fields, compact=compact,
+    )
+    if sub is None:
+        await websocket.close()
+        return
 
     try:
         # Send last snapshot if we have it; else do a quick status probe
         snap = get_last_snapshot(joint_name)
         if snap:
-            await websocket.send_text(fast_dumps(snap))
+            manager.push(sub, joint_name, snap)
         else:
             try:
                 # Use fast path if available to avoid diag reads in the hot path
@@ -27,10 +53,10 @@ async def ws_joint(websocket: WebSocket, joint_name: str):
                 st = await status_fn(include_control=False) if status_fn.__code__.co_argcount >= 2 else await status_fn()
                 now = datetime.now(timezone.utc).isoformat()
 
-                await websocket.send_text(fast_dumps({
+                manager.push(sub, joint_name, {
                     "type": "status", "joint_id": joint_name, "online": True
-                }))
-                await websocket.send_text(fast_dumps({
+                })
+                manager.push(sub, joint_name, {
                     "type": "telemetry", "joint_id": joint_name, "ts": now,
                     "position": st.get("position"), "velocity": st.get("velocity"),
                     "accel": None, "torque": None, "supply_v": st.get("supply_v"),
@@ -38,11 +64,11 @@ async def ws_joint(websocket: WebSocket, joint_name: str):
                     "mode": None, "fault_code": st.get("fault"), "error_flags": 0,
                     "target_position": None, "target_velocity": None,
                     "target_accel": None, "target_torque": None,
-                }))
+                })
             except Exception as e:
-                await websocket.send_text(fast_dumps({
+                manager.push(sub, joint_name, {
                     "type": "status", "joint_id": joint_name, "online": False, "reason": str(e)
-                }))
+                })
 
         # Wait until either:
         #  - the backend is shutting down (hot reload), or
@@ -73,4 +99,112 @@ async def ws_joint(websocket: WebSocket, joint_name: str):
         # swallow unexpected WS exceptions; manager cleanup below
         pass
     finally:
-        manager.disconnect(joint_name, websocket)
\ No newline at end of file
+        manager.disconnect(joint_name, websocket)
+
+def _str_list(msg: dict, key: str):
+    """msg[key] as a list of strings (a bare string counts as one), None if absent."""
+    value = msg.get(key)
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"{key} must be a list of strings")
+    return value
+
+
+def _rate(msg: dict):
+    value = msg.get("rate_hz")
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value <= 0:
+        raise ValueError("rate_hz must be a positive number")
+    return float(value)
+
+
+def _subscription(stream, unknown) -> dict:
+    return {
+        "type": "subscribed",
+        "joints": sorted(stream.joints),
+        "types": sorted(stream.types) if stream.types else None,
+        "rate_hz": stream.rate_hz,
+        "fields": sorted(stream.fields) if stream.fields else None,
+        "unknown": unknown,
+    }
+
+
+@router.websocket("/stream")
+async def ws_stream(websocket: WebSocket):
+    """
+    One socket for many joints. The client sends control messages such as
+        {"op": "subscribe", "joints": ["joint1", "joint2"], "types": ["telemetry", "fault"],
+         "rate_hz": 10, "fields": ["position", "velocity"]}
+        {"op": "unsubscribe", "joints": ["joint2"]}
+    (rate_hz/fields/frames may also be given as query params, as on /ws/joint;
+    with ?encoding=compact telemetry arrives as binary delta frames next to the JSON frame)
+    and receives one frame per tick: {"type": "frame", "tick": n, "messages": [...]},
+    where messages are the same payloads /ws/joint sends, latest telemetry per joint.
+    """
+    binary, rate_hz, fields, compact = _client_options(websocket)
+    await websocket.accept()
+    stream = manager.open_stream(websocket, binary, compact)
+    if stream is None:
+        await websocket.close()
+        return
+
+    t_shutdown = asyncio.create_task(manager.shutdown_event.wait())
+    try:
+        while True:
+            t_recv = asyncio.create_task(websocket.receive_text())
+            done, _ = await asyncio.wait({t_shutdown, t_recv}, return_when=asyncio.FIRST_COMPLETED)
+            if t_recv not in done:
+                t_recv.cancel()
+                await asyncio.gather(t_recv, return_exceptions=True)
+                break
+            try:
+                msg = json.loads(t_recv.result())
+                if not isinstance(msg, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                await manager.send_direct(websocket, {"type": "error", "reason": f"bad message: {e}"}, binary)
+                continue
+
+            op = msg.get("op", "subscribe")
+            try:
+                requested = _str_list(msg, "joints") or []
+                if op == "subscribe":
+                    types = _str_list(msg, "types")
+                    mask = _str_list(msg, "fields") if "fields" in msg else fields
+                    rate = _rate(msg) or rate_hz
+            except ValueError as e:
+                await manager.send_direct(websocket, {"type": "error", "reason": f"bad {op}: {e}"}, binary)
+                continue
+            if op == "subscribe":
+                unknown = [j for j in requested if j not in joints]
+                added = manager.subscribe(
+                    stream,
+                    [j for j in requested if j in joints],
+                    types=types,
+                    rate_hz=rate,
+                    fields=mask,
+                )
+                # New subscribers get the latest telemetry in their first frame
+                for j in added:
+                    snap = get_last_snapshot(j)
+                    if snap:
+                        manager.push(stream, j, snap)
+                await manager.send_direct(websocket, _subscription(stream, unknown), binary)
+            elif op == "unsubscribe":
+                manager.unsubscribe(stream, requested or None)
+                await manager.send_direct(websocket, _subscription(stream, []), binary)
+            else:
+                await manager.send_direct(websocket, {"type": "error", "reason": f"unknown op {op!r}"}, binary)
+
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        pass
+    finally:
+        t_shutdown.cancel()
+        await asyncio.gather(t_shutdown, return_exceptions=True)
+        manager.close_subscriber(stream)
@@ -0,0 +1,149 @@
+"""
+Columnar export of a run's joint_samples and run_events (Arrow IPC stream
+or Parquet) for offline analysis.
+
+Rows come off a server-side cursor EXPORT_BATCH_ROWS at a time; each chunk
+becomes one Arrow record batch (one Parquet row group), converted and
+encoded in a worker thread, and the encoded bytes are handed to the
+response as they are produced. Timestamps stay microsecond UTC.
+
+pyarrow is optional: without it the export endpoints answer 501.
+"""
+import asyncio
+from typing import Any, AsyncIterator, List, Sequence
+
+from sqlalchemy import select
+
+from backend.db import SessionLocal
+from backend.ingest.columnar import COLUMNS
+from backend.models import JointSample, RunEvent
+from backend.util.json_fast import fast_dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+EXPORT_BATCH_ROWS = 65536
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+EVENT_COLUMNS = ("ts", "joint_id", "event_type", "payload", "id")
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _samples_schema():
+    types = {
+        "ts": pa.timestamp("us", tz="UTC"),
+        "joint_id": pa.string(),
+        "run_id": pa.int32(),
+        "mode": pa.string(),
+        "fault_code": pa.int32(),
+        "error_flags": pa.int64(),
+    }
+    return pa.schema([(c, types.get(c, pa.float64())) for c in COLUMNS])
+
+
+def _events_schema():
+    return pa.schema([
+        ("ts", pa.timestamp("us", tz="UTC")),
+        ("joint_id", pa.string()),
+        ("event_type", pa.string()),
+        ("payload", pa.string()),  # JSON text
+        ("id", pa.int64()),
+    ])
+
+
+def _tables(run_id: int):
+    s = JointSample.__table__.c
+    e = RunEvent.__table__.c
+    return {
+        "samples": (
+            _samples_schema(),
+            select(*[s[c] for c in COLUMNS]).where(s.run_id == run_id).order_by(s.ts, s.joint_id),
+            None,
+        ),
+        "events": (
+            _events_schema(),
+            select(*[e[c] for c in EVENT_COLUMNS]).where(e.run_id == run_id).order_by(e.ts, e.id),
+            EVENT_COLUMNS.index("payload"),
+        ),
+    }
+
+
+class _Sink:
+    """Write-only file object that hands out what was written since the last take()."""
+
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        b = bytes(data)
+        self._parts.append(b)
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+
+def _record_batch(rows: Sequence[Sequence[Any]], schema, json_col) -> "pa.RecordBatch":
+    cols = list(zip(*rows))
+    if json_col is not None:
+        cols[json_col] = [None if v is None else fast_dumps(v) for v in cols[json_col]]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(col, type=field.type) for col, field in zip(cols, schema)],
+        schema=schema,
+    )
+
+
+async def _batches(session, q, schema, json_col) -> AsyncIterator["pa.RecordBatch"]:
+    result = await session.stream(q.execution_options(yield_per=EXPORT_BATCH_ROWS))
+    async for rows in result.partitions():
+        # Conversion is CPU work: keep it off the event loop the samplers share
+        yield await asyncio.to_thread(_record_batch, rows, schema, json_col)
+
+
+async def arrow_stream(run_id: int, table: str = "samples") -> AsyncIterator[bytes]:
+    """One Arrow IPC stream of `table` ("samples" or "events"), one record batch per chunk."""
+    schema, q, json_col = _tables(run_id)[table]
+    async with SessionLocal() as session:
+        sink = _Sink()
+        writer = pa.ipc.new_stream(sink, schema)
+        yield sink.take()
+        async for batch in _batches(session, q, schema, json_col):
+            await asyncio.to_thread(writer.write_batch, batch)
+            yield sink.take()
+        writer.close()
+        yield sink.take()
+
+
+async def parquet_stream(run_id: int, table: str = "samples") -> AsyncIterator[bytes]:
+    """One Parquet file of `table` ("samples" or "events"), one row group per batch."""
+    schema, q, json_col = _tables(run_id)[table]
+    async with SessionLocal() as session:
+        sink = _Sink()
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        async for batch in _batches(session, q, schema, json_col):
+            await asyncio.to_thread(writer.write_batch, batch)
+            yield sink.take()
+        writer.close()
+        yield sink.take()
@@ -0,0 +1,193 @@
+"""
+Compact binary telemetry frames for WebSocket clients (`?encoding=compact`).
+
+The client first gets a JSON schema message:
+
+    {"type": "schema", "encoding": "compact", "version": 1,
+     "fields": [{"name": "ts", "fmt": "q"}, ...], "strings": [null, "joint1", ...]}
+
+and from then on each telemetry tick is one binary message (little-endian):
+
+    header  u8 version, u32 tick, u8 record count
+    record  u16 joint_id (string code), u8 flags (1 = keyframe),
+            u16 present bitmask, u16 null bitmask,
+            then one value per present, non-null field in schema order
+
+A record carries only the fields that changed since the previous record
+this client got for that joint; the first record per joint, and the first
+after the field mask changed, is a keyframe with every field. A tick with
+more than 255 joints goes out as several frames with the same tick. `ts` is int64 µs since the Unix epoch and string fields
+(`mode`) are codes into the `strings` table, which is extended with a
+{"type": "strings", "offset": n, "values": [...]} JSON message before any
+frame that uses a new code. Non-telemetry messages stay JSON text frames.
+"""
+import struct
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from backend.ingest.columnar import strings, ts_to_us
+
+VERSION = 1
+
+# (name, struct format) in wire order; 16 fields -> u16 bitmasks
+FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("ts", "q"),
+    ("run_id", "i"),
+    ("position", "f"),
+    ("velocity", "f"),
+    ("accel", "f"),
+    ("torque", "f"),
+    ("supply_v", "f"),
+    ("motor_temp", "f"),
+    ("controller_temp", "f"),
+    ("mode", "H"),
+    ("fault_code", "I"),
+    ("error_flags", "Q"),
+    ("target_position", "f"),
+    ("target_velocity", "f"),
+    ("target_accel", "f"),
+    ("target_torque", "f"),
+)
+_STRING_FIELDS = frozenset(("mode",))
+_NAMES = tuple(name for name, _ in FIELDS)
+_ALL = (1 << len(FIELDS)) - 1
+
+_HEADER = struct.Struct("<BIB")
+_RECORD = struct.Struct("<HBHH")
+_KEYFRAME = 1
+MAX_RECORDS = 255
+
+
+def schema() -> dict:
+    return {
+        "type": "schema",
+        "encoding": "compact",
+        "version": VERSION,
+        "fields": [{"name": name, "fmt": fmt} for name, fmt in FIELDS],
+        "strings": list(strings.strings),
+    }
+
+
+_TS = _NAMES.index("ts")
+_STRING_IDX = tuple(_NAMES.index(name) for name in _STRING_FIELDS)
+_FMTS = tuple(fmt for _, fmt in FIELDS)
+_value_structs: Dict[int, struct.Struct] = {}
+
+
+def _values_struct(bits: int) -> struct.Struct:
+    """One Struct per distinct set of packed fields, so a record is a single pack()."""
+    st = _value_structs.get(bits)
+    if st is None:
+        st = _value_structs[bits] = struct.Struct(
+            "<" + "".join(_FMTS[i] for i in range(len(FIELDS)) if (bits >> i) & 1)
+        )
+    return st
+
+
+def _wire_values(payload: dict) -> List[Any]:
+    vals = [payload.get(name) for name in _NAMES]
+    ts = vals[_TS]
+    if isinstance(ts, str):
+        vals[_TS] = ts_to_us(datetime.fromisoformat(ts))
+    elif isinstance(ts, datetime):
+        vals[_TS] = ts_to_us(ts)
+    for i in _STRING_IDX:
+        if vals[i] is not None:
+            vals[i] = strings.code(vals[i])
+    return vals
+
+
+class CompactEncoder:
+    """Per-subscriber delta state: what this client last saw for each joint."""
+
+    def __init__(self, fields: Optional[FrozenSet[str]] = None) -> None:
+        self.tick = 0
+        self._last: Dict[str, List[Any]] = {}
+        self._strings_sent = len(strings.strings)  # covered by schema()
+        self.set_fields(fields)
+
+    def set_fields(self, fields: Optional[FrozenSet[str]]) -> None:
+        mask = _ALL if fields is None else sum(
+            1 << i for i, name in enumerate(_NAMES) if name in fields
+        )
+        if mask != getattr(self, "_mask", mask):
+            # The client never saw the fields masked out so far: resend everything
+            self._last.clear()
+        self._mask = mask
+
+    def forget(self, joint_id: str) -> None:
+        """Next record for this joint will be a keyframe again."""
+        self._last.pop(joint_id, None)
+
+    def encode(self, items: List[Tuple[str, dict]]) -> Tuple[Optional[dict], List[bytes]]:
+        """
+        Encode (joint_id, telemetry payload) pairs of one tick, MAX_RECORDS
+        per frame. Returns (strings update message or None, frames).
+        """
+        self.tick = (self.tick + 1) & 0xFFFFFFFF
+        frames = [
+            self._frame(items[i:i + MAX_RECORDS]) for i in range(0, len(items), MAX_RECORDS)
+        ]
+
+        update = None
+        if len(strings.strings) > self._strings_sent:
+            update = {
+                "type": "strings",
+                "offset": self._strings_sent,
+                "values": strings.strings[self._strings_sent:],
+            }
+            self._strings_sent = len(strings.strings)
+        return update, frames
+
+    def _frame(self, items: List[Tuple[str, dict]]) -> bytes:
+        body: List[bytes] = []
+        mask = self._mask
+        for joint_id, payload in items:
+            vals = _wire_values(payload)
+            prev = self._last.get(joint_id)
+            self._last[joint_id] = vals
+            flags = _KEYFRAME if prev is None else 0
+            present = nulls = 0
+            packed = []
+            bit = 1
+            for i, v in enumerate(vals):
+                if mask & bit and (prev is None or v != prev[i] or type(v) is not type(prev[i])):
+                    present |= bit
+                    if v is None:
+                        nulls |= bit
+                    else:
+                        packed.append(v)
+                bit <<= 1
+            body.append(_RECORD.pack(strings.code(joint_id), flags, present, nulls))
+            body.append(_values_struct(present & ~nulls).pack(*packed))
+        return _HEADER.pack(VERSION, self.tick, len(items)) + b"".join(body)
+
+
+def decode(frame: bytes, table: List[Optional[str]], state: Dict[str, dict]) -> List[dict]:
+    """
+    Reference decoder (mirrors what a client does): applies one frame to
+    `state` (joint -> last full payload) and returns the updated payloads.
+    """
+    version, tick, count = _HEADER.unpack_from(frame, 0)
+    off = _HEADER.size
+    out = []
+    for _ in range(count):
+        jcode, flags, present, nulls = _RECORD.unpack_from(frame, off)
+        off += _RECORD.size
+        joint_id = table[jcode]
+        cur = {} if flags & _KEYFRAME else dict(state.get(joint_id, {}))
+        for i, (name, fmt) in enumerate(FIELDS):
+            if not (present >> i) & 1:
+                continue
+            if (nulls >> i) & 1:
+                cur[name] = None
+                continue
+            (v,) = struct.unpack_from("<" + fmt, frame, off)
+            off += struct.calcsize(fmt)
+            cur[name] = table[v] if name in _STRING_FIELDS else v
+        cur["type"] = "telemetry"
+        cur["joint_id"] = joint_id
+        cur["tick"] = tick
+        state[joint_id] = cur
+        out.append(cur)
+    return out
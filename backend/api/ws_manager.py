@@ -1,113 +1,402 @@
 from __future__ import annotations
 import asyncio
-from collections import defaultdict
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+import os
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, FrozenSet, Iterable, List, Optional, Set
 from starlette.websockets import WebSocket
 
-WS_MAX_QUEUE = 32  # small buffer; drop oldest when full
+from backend.api.ws_compact import CompactEncoder, schema as compact_schema
+from backend.util.json_fast import fast_dumps_bytes
+
+WS_MAX_QUEUE = 32  # pending non-telemetry events per subscriber; drop oldest when full
+WS_DEFAULT_HZ = float(os.getenv("WS_DEFAULT_HZ", "30"))
+WS_MAX_HZ = float(os.getenv("WS_MAX_HZ", "100"))
+WS_MIN_HZ = 0.1
+
+# Kept in telemetry messages regardless of a subscriber's field mask
+_ALWAYS_FIELDS = frozenset(("type", "ts", "joint_id"))
+
+
+class WsFrame:
+    """
+    One encoded message shared by every subscriber it is queued to.
+    The UTF-8 text view is decoded lazily, at most once, for text-frame clients.
+    """
+
+    __slots__ = ("data", "binary", "_text")
+
+    def __init__(self, data: bytes, binary: Optional[bool] = None) -> None:
+        self.data = data
+        self.binary = binary  # None = whatever the subscriber negotiated
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.data.decode("utf-8")
+        return self._text
+
+
+class BroadcastStats:
+    """Encode/send timings for the broadcast path (times in ns, reported in µs)."""
+
+    def __init__(self) -> None:
+        self.broadcasts = 0
+        self.encode_ns = 0
+        self.encode_max_ns = 0
+        self.bytes = 0
+        self.fanout = 0
+        self.dropped = 0
+        self.sends = 0
+        self.send_ns = 0
+        self.send_max_ns = 0
+        self.send_errors = 0
+        self.coalesced = 0
+        self.compact_frames = 0
+        self.compact_encode_ns = 0
+        self.compact_bytes = 0
+
+    def observe_encode(self, dt_ns: int, size: int, fanout: int) -> None:
+        self.broadcasts += 1
+        self.encode_ns += dt_ns
+        if dt_ns > self.encode_max_ns:
+            self.encode_max_ns = dt_ns
+        self.bytes += size
+        self.fanout += fanout
+
+    def observe_send(self, dt_ns: int) -> None:
+        self.sends += 1
+        self.send_ns += dt_ns
+        if dt_ns > self.send_max_ns:
+            self.send_max_ns = dt_ns
+
+    def as_dict(self) -> dict:
+        b, s = self.broadcasts, self.sends
+        return {
+            "broadcasts": b,
+            "encode_avg_us": round(self.encode_ns / b / 1000, 2) if b else None,
+            "encode_max_us": round(self.encode_max_ns / 1000, 2),
+            "bytes_avg": round(self.bytes / b, 1) if b else None,
+            "fanout_avg": round(self.fanout / b, 2) if b else None,
+            "dropped": self.dropped,
+            "sends": s,
+            "send_avg_us": round(self.send_ns / s / 1000, 2) if s else None,
+            "send_max_us": round(self.send_max_ns / 1000, 2),
+            "send_errors": self.send_errors,
+            "coalesced": self.coalesced,
+            "compact_frames": self.compact_frames,
+            "compact_encode_avg_us": (
+                round(self.compact_encode_ns / self.compact_frames / 1000, 2) if self.compact_frames else None
+            ),
+            "compact_bytes_avg": (
+                round(self.compact_bytes / self.compact_frames, 1) if self.compact_frames else None
+            ),
+        }
+
+
+class _Subscriber:
+    """
+    One WebSocket client: a /ws/joint socket (one joint, plain messages) or a
+    /ws/stream socket (many joints, one {"type": "frame"} per tick).
+
+    Holds the subscription (joints, message types, rate, telemetry field mask)
+    plus what is pending for the next tick: the latest telemetry per joint
+    (newer replaces older, so slow clients never see stale backlog) and an
+    ordered, bounded list of other events (acks, faults, cmd_done...).
+
+    With `compact` set, telemetry is kept as the raw payload and encoded per
+    subscriber into delta binary frames (see ws_compact) at send time.
+    """
+
+    def __init__(self, ws: WebSocket, binary: bool, framed: bool, compact: bool = False) -> None:
+        self.ws = ws
+        self.binary = binary
+        self.framed = framed
+        self.compact: Optional[CompactEncoder] = CompactEncoder() if compact else None
+        self.joints: Set[str] = set()
+        self.types: Optional[Set[str]] = None  # None = every message type
+        self.fields: Optional[FrozenSet[str]] = None  # None = full telemetry payload
+        self.period = 1.0 / WS_DEFAULT_HZ
+        self.latest: Dict[str, Any] = {}  # WsFrame, or the payload dict when compact
+        self.events: Deque[WsFrame] = deque()
+        self.dirty = asyncio.Event()
+        self.tick = 0
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def rate_hz(self) -> float:
+        return 1.0 / self.period
+
+    def wants(self, msg_type: Optional[str]) -> bool:
+        return self.types is None or msg_type is None or msg_type in self.types
 
-@dataclass
-class _Conn:
-    ws: WebSocket
-    q: asyncio.Queue[str]
-    task: asyncio.Task
 
 class ConnectionManager:
     def __init__(self) -> None:
-        self._by_joint: Dict[str, List[_Conn]] = defaultdict(list)
+        # Topic index: joint -> subscribers, so fan-out only touches interested clients
+        self._subs_by_joint: Dict[str, Set[_Subscriber]] = defaultdict(set)
+        self._subs: Set[_Subscriber] = set()
+        self._max_hz: Dict[str, float] = {}
         self.shutting_down: bool = False
         self.shutdown_event: asyncio.Event = asyncio.Event()
+        self.stats = BroadcastStats()
 
-    async def _sender(self, joint_id: str, conn: _Conn):
-        try:
-            while not self.shutting_down:
-                msg = await conn.q.get()
-                if msg is None:  # sentinel
-                    break
-                try:
-                    await conn.ws.send_text(msg)
-                except Exception:
-                    break
-        finally:
-            self._remove_conn(joint_id, conn)
+    # ---------- lifecycle ----------
 
-    def _remove_conn(self, joint_id: str, conn: _Conn):
-        conns = self._by_joint.get(joint_id)
-        if not conns:
-            return
-        try:
-            conns.remove(conn)
-        except ValueError:
-            pass
-        if not conns:
-            self._by_joint.pop(joint_id, None)
+    def _open(self, websocket: WebSocket, binary: bool, framed: bool, compact: bool) -> Optional[_Subscriber]:
+        if self.shutting_down:
+            return None
+        sub = _Subscriber(websocket, binary, framed, compact)
+        if compact:
+            # Schema goes out first, before any binary frame
+            sub.events.append(WsFrame(fast_dumps_bytes(compact_schema()), binary=False))
+            sub.dirty.set()
+        sub.task = asyncio.create_task(self._sender(sub))
+        self._subs.add(sub)
+        return sub
+
+    async def connect(
+        self,
+        joint_id: str,
+        websocket: WebSocket,
+        binary: bool = False,
+        rate_hz: Optional[float] = None,
+        fields: Optional[Iterable[str]] = None,
+        compact: bool = False,
+    ) -> Optional[_Subscriber]:
+        """Register a single-joint (/ws/joint) client."""
+        sub = self._open(websocket, binary, framed=False, compact=compact)
+        if sub is not None:
+            self.subscribe(sub, [joint_id], rate_hz=rate_hz, fields=fields)
+        return sub
 
-    async def connect(self, joint_id: str, websocket: WebSocket) -> None:
+    def open_stream(self, websocket: WebSocket, binary: bool = False, compact: bool = False) -> Optional[_Subscriber]:
+        """Register a multiplexed (/ws/stream) client; joints are added with subscribe()."""
+        return self._open(websocket, binary, framed=True, compact=compact)
+
+    def disconnect(self, joint_id: str, websocket: WebSocket) -> None:
+        for sub in list(self._subs_by_joint.get(joint_id, ())):
+            if sub.ws is websocket:
+                self.close_subscriber(sub)
+                return
+
+    def close_subscriber(self, sub: _Subscriber) -> None:
+        self.unsubscribe(sub)
+        self._subs.discard(sub)
+        if sub.task and not sub.task.done():
+            sub.task.cancel()
+
+    # ---------- subscriptions ----------
+
+    def subscribe(
+        self,
+        sub: _Subscriber,
+        joints: Iterable[str],
+        types: Optional[Iterable[str]] = None,
+        rate_hz: Optional[float] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> List[str]:
+        """
+        Add joints to a subscriber and replace whichever of its type filter,
+        rate and field mask are given. Returns the newly added joints.
+        """
+        if types is not None:
+            sub.types = set(types) or None
+        if fields is not None:
+            sub.fields = frozenset(fields) | _ALWAYS_FIELDS if fields else None
+            if sub.compact is not None:
+                sub.compact.set_fields(sub.fields)
+        if rate_hz:
+            sub.period = 1.0 / min(WS_MAX_HZ, max(WS_MIN_HZ, float(rate_hz)))
+        added = []
+        for j in joints:
+            if j not in sub.joints:
+                sub.joints.add(j)
+                self._subs_by_joint[j].add(sub)
+                added.append(j)
+        for j in sub.joints:
+            self._refresh_rate(j)
+        return added
+
+    def unsubscribe(self, sub: _Subscriber, joints: Optional[Iterable[str]] = None) -> None:
+        """Drop some (or, with joints=None, all) joints from a subscriber."""
+        for j in list(sub.joints if joints is None else joints):
+            sub.joints.discard(j)
+            sub.latest.pop(j, None)
+            if sub.compact is not None:
+                sub.compact.forget(j)
+            subs = self._subs_by_joint.get(j)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    self._subs_by_joint.pop(j, None)
+            self._refresh_rate(j)
+
+    def _refresh_rate(self, joint_id: str) -> None:
+        subs = self._subs_by_joint.get(joint_id)
+        if subs:
+            self._max_hz[joint_id] = max(s.rate_hz for s in subs)
+        else:
+            self._max_hz.pop(joint_id, None)
+
+    def max_rate(self, joint_id: str, default: float = WS_DEFAULT_HZ) -> float:
+        """Highest rate any subscriber wants for this joint (producers need not publish faster)."""
+        return self._max_hz.get(joint_id, default)
+
+    def subscriber_count(self, joint_id: str) -> int:
+        return len(self._subs_by_joint.get(joint_id, ()))
+
+    def connection_count(self) -> int:
+        return len(self._subs)
+
+    # ---------- fan-out ----------
+
+    @staticmethod
+    def encode(payload: Any) -> WsFrame:
+        """Encode a payload once; bytes/str are taken as already-encoded JSON."""
+        if isinstance(payload, WsFrame):
+            return payload
+        if isinstance(payload, bytes):
+            return WsFrame(payload)
+        if isinstance(payload, str):
+            return WsFrame(payload.encode("utf-8"))
+        return WsFrame(fast_dumps_bytes(payload))
+
+    async def broadcast(self, joint_id: str, payload: Any) -> None:
+        """
+        Non-blocking: encode `payload` once (once per distinct field mask for
+        telemetry) and stage the same frame on every subscriber of `joint_id`.
+        Each subscriber's sender picks it up on its own next tick.
+        """
         if self.shutting_down:
             return
-        q: asyncio.Queue[str] = asyncio.Queue(WS_MAX_QUEUE)
-        conn = _Conn(ws=websocket, q=q, task=None)  # type: ignore
-        task = asyncio.create_task(self._sender(joint_id, conn))
-        conn.task = task  # assign after creation
-        self._by_joint[joint_id].append(conn)
+        subs = self._subs_by_joint.get(joint_id)
+        if not subs:
+            return
+        t0 = time.perf_counter_ns()
+        msg_type = payload.get("type") if isinstance(payload, dict) else None
+        maskable = msg_type == "telemetry"
+        frames: Dict[Optional[FrozenSet[str]], WsFrame] = {}
+        n = 0
+        for sub in subs:
+            if not sub.wants(msg_type):
+                continue
+            if maskable and sub.compact is not None:
+                self._stage(sub, joint_id, payload, msg_type)  # encoded per subscriber at send time
+                n += 1
+                continue
+            mask = sub.fields if maskable else None
+            frame = frames.get(mask)
+            if frame is None:
+                if mask is None:
+                    frame = self.encode(payload)
+                else:
+                    frame = self.encode({k: v for k, v in payload.items() if k in mask})
+                frames[mask] = frame
+            self._stage(sub, joint_id, frame, msg_type)
+            n += 1
+        if frames:
+            size = sum(len(f.data) for f in frames.values())
+            self.stats.observe_encode(time.perf_counter_ns() - t0, size, n)
 
-    def disconnect(self, joint_id: str, websocket: WebSocket) -> None:
-        conns = self._by_joint.get(joint_id)
-        if not conns:
+    def push(self, sub: _Subscriber, joint_id: str, payload: Any) -> None:
+        """Stage one payload for a single subscriber (e.g. the snapshot on subscribe)."""
+        msg_type = payload.get("type") if isinstance(payload, dict) else None
+        if not sub.wants(msg_type):
             return
-        target: Optional[_Conn] = None
-        for c in conns:
-            if c.ws is websocket:
-                target = c
-                break
-        if not target:
+        if msg_type == "telemetry" and sub.compact is not None:
+            self._stage(sub, joint_id, payload, msg_type)
             return
+        if msg_type == "telemetry" and sub.fields is not None:
+            payload = {k: v for k, v in payload.items() if k in sub.fields}
+        self._stage(sub, joint_id, self.encode(payload), msg_type)
+
+    def _stage(self, sub: _Subscriber, joint_id: str, frame: Any, msg_type: Optional[str]) -> None:
+        if msg_type == "telemetry":
+            if sub.latest.get(joint_id) is not None:
+                self.stats.coalesced += 1
+            sub.latest[joint_id] = frame
+        else:
+            if len(sub.events) >= WS_MAX_QUEUE:
+                sub.events.popleft()
+                self.stats.dropped += 1
+            sub.events.append(frame)
+        sub.dirty.set()
+
+    def _take(self, sub: _Subscriber) -> List[WsFrame]:
+        """Everything pending for this tick: events in order, then the latest telemetry."""
+        events = list(sub.events)
+        sub.events.clear()
+        if sub.compact is not None:
+            telemetry: List[WsFrame] = []
+            items = list(sub.latest.items())
+        else:
+            telemetry = list(sub.latest.values())
+            items = []
+        sub.latest.clear()
+
+        if sub.framed and (events or telemetry):
+            # Splice one frame from the already-encoded parts
+            sub.tick += 1
+            parts = events + telemetry
+            out = [WsFrame(
+                b'{"type":"frame","tick":%d,"messages":[' % sub.tick + b",".join(f.data for f in parts) + b"]}"
+            )]
+        else:
+            out = events + telemetry
+
+        if items:
+            t0 = time.perf_counter_ns()
+            update, frames = sub.compact.encode(items)
+            stats = self.stats
+            stats.compact_encode_ns += time.perf_counter_ns() - t0
+            stats.compact_frames += len(frames)
+            stats.compact_bytes += sum(len(data) for data in frames)
+            if update is not None:
+                out.append(WsFrame(fast_dumps_bytes(update), binary=False))
+            out.extend(WsFrame(data, binary=True) for data in frames)
+        return out
+
+    async def _sender(self, sub: _Subscriber) -> None:
+        loop = asyncio.get_running_loop()
+        stats = self.stats
+        next_send = loop.time()
         try:
-            target.q.put_nowait(None)  # stop sender loop
-        except Exception:
+            while not self.shutting_down:
+                await sub.dirty.wait()
+                delay = next_send - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)  # let this tick's updates pile up
+                sub.dirty.clear()
+                for frame in self._take(sub):
+                    t0 = time.perf_counter_ns()
+                    if sub.binary if frame.binary is None else frame.binary:
+                        await sub.ws.send_bytes(frame.data)
+                    else:
+                        await sub.ws.send_text(frame.text)
+                    stats.observe_send(time.perf_counter_ns() - t0)
+                next_send = max(next_send, loop.time()) + sub.period
+        except asyncio.CancelledError:
             pass
-        if target.task and not target.task.done():
-            target.task.cancel()
-        self._remove_conn(joint_id, target)
+        except Exception:
+            stats.send_errors += 1
+        finally:
+            self.unsubscribe(sub)
+            self._subs.discard(sub)
 
-    async def broadcast(self, joint_id: str, message: str) -> None:
-        """Non-blocking: enqueue to each connection's queue; drop oldest if full."""
-        if self.shutting_down:
-            return
-        conns = self._by_joint.get(joint_id)
-        if not conns:
-            return
-        dead: List[_Conn] = []
-        for c in list(conns):
-            try:
-                c.q.put_nowait(message)
-            except asyncio.QueueFull:
-                # drop oldest, then try again
-                try:
-                    _ = c.q.get_nowait()
-                except Exception:
-                    pass
-                try:
-                    c.q.put_nowait(message)
-                except Exception:
-                    dead.append(c)
-            except Exception:
-                dead.append(c)
-        for c in dead:
-            self.disconnect(joint_id, c.ws)
+    async def send_direct(self, websocket: WebSocket, payload: Any, binary: bool = False) -> None:
+        """Send one payload to a single socket (snapshots/probes on connect)."""
+        frame = self.encode(payload)
+        if binary:
+            await websocket.send_bytes(frame.data)
+        else:
+            await websocket.send_text(frame.text)
 
     async def shutdown(self) -> None:
         self.shutting_down = True
         self.shutdown_event.set()
-        for joint_id, conns in list(self._by_joint.items()):
-            for c in list(conns):
-                try:
-                    c.q.put_nowait(None)
-                except Exception:
-                    pass
-                if c.task and not c.task.done():
-                    c.task.cancel()
-            self._by_joint.pop(joint_id, None)
-
-manager = ConnectionManager()
\ No newline at end of file
+        for sub in list(self._subs):
+            self.close_subscriber(sub)
+
+manager = ConnectionManager()
@@ -1,12 +1,42 @@
+import asyncio
+import logging
 import os
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://robot:robot@db:5432/robot")
 
-engine = create_async_engine(DATABASE_URL, pool_size=5, max_overflow=5, future=True)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+# Test each connection on checkout (one extra round trip) to survive DB restarts
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0") not in ("0", "false", "no")
+
+engine = create_async_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    future=True,
+)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
+def asyncpg_dsn(url: str = DATABASE_URL) -> str:
+    """Plain libpq-style DSN for talking to asyncpg directly (drops the SQLAlchemy driver suffix)."""
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+async def warm_engine(n: int = DB_POOL_SIZE) -> bool:
+    """Open (and ping) `n` pooled connections now instead of on the first requests."""
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    try:
+        await asyncio.gather(*(ping() for _ in range(n)))
+    except Exception as e:
+        logging.getLogger(__name__).warning("Database warm-up failed: %s", e)
+        return False
+    return True
+
 class Base(DeclarativeBase):
     pass
 
@@ -0,0 +1,172 @@
+"""
+asyncpg pool for the hot statements (telemetry insert, latest-N samples,
+rollup reads), next to the SQLAlchemy engine that serves everything else.
+
+Queries go through asyncpg's per-connection statement cache, so each
+statement is parsed and planned once per connection and then only bound
+and executed. Modules owning a hot statement register it with warm_up();
+every new pool connection prepares all of them before it is handed out,
+so the first requests after boot don't pay for it. Time spent waiting
+for a free connection goes to the `db_pool_wait_seconds` histogram.
+
+Until the pool is up (database not reachable yet, or scripts that never
+start it) `ready` is False and callers use their SQLAlchemy path. If the
+first connect fails, start() keeps retrying in the background with
+exponential backoff, so a database that comes up after the app still gets
+the fast path; `db_pool_ready` and the connect attempts are in /metrics.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+import asyncpg
+
+from backend.db import asyncpg_dsn
+from backend.util.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+DB_FAST_POOL_MIN = int(os.getenv("DB_FAST_POOL_MIN", 2))
+DB_FAST_POOL_MAX = int(os.getenv("DB_FAST_POOL_MAX", 8))
+# Prepared statements kept per connection (asyncpg LRU)
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", 256))
+# Longest wait between two background connect attempts
+DB_FAST_POOL_RETRY_MAX_S = float(os.getenv("DB_FAST_POOL_RETRY_MAX_S", 30))
+
+
+class DbPool:
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        min_size: int = DB_FAST_POOL_MIN,
+        max_size: int = DB_FAST_POOL_MAX,
+    ):
+        self.dsn = dsn or asyncpg_dsn()
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.pool: Optional[asyncpg.Pool] = None
+        self._warm: List[Tuple[str, Tuple[Any, ...]]] = []
+        self.acquires = 0
+        self.warm_errors = 0
+        self.connect_attempts = 0
+        self.last_error: Optional[str] = None
+        self._retry: Optional[asyncio.Task] = None
+        self.wait_hist = registry.histogram(
+            "db_pool_wait_seconds", "Time to acquire a connection from the pool", pool="asyncpg",
+        )
+        registry.gauge("db_pool_size", "Open connections", fn=lambda: self.pool.get_size() if self.pool else 0, pool="asyncpg")
+        registry.gauge("db_pool_idle", "Idle connections", fn=lambda: self.pool.get_idle_size() if self.pool else 0, pool="asyncpg")
+        registry.gauge("db_pool_ready", "1 once the pool is connected", fn=lambda: int(self.ready), pool="asyncpg")
+        self.connect_errors = registry.counter(
+            "db_pool_connect_errors_total", "Failed attempts to connect the pool", pool="asyncpg",
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self.pool is not None
+
+    def warm_up(self, sql: str, *args: Any) -> None:
+        """Prepare `sql` on every new connection by running it once with `args` (should touch no rows)."""
+        self._warm.append((sql, args))
+
+    async def _init(self, conn: asyncpg.Connection) -> None:
+        for sql, args in self._warm:
+            try:
+                await conn.execute(sql, *args)
+            except Exception as e:
+                # e.g. a rollup view that isn't there yet: prepared on first use instead
+                self.warm_errors += 1
+                logger.debug("Warm-up of %r failed: %s", sql[:60], e)
+
+    async def _connect(self) -> bool:
+        self.connect_attempts += 1
+        try:
+            self.pool = await asyncpg.create_pool(
+                self.dsn,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                statement_cache_size=DB_STATEMENT_CACHE,
+                init=self._init,
+            )
+        except Exception as e:
+            self.connect_errors.inc()
+            self.last_error = (str(e).splitlines() or [type(e).__name__])[0]
+            return False
+        self.last_error = None
+        return True
+
+    async def _reconnect(self) -> None:
+        delay = 1.0
+        while True:
+            await asyncio.sleep(delay)
+            if await self._connect():
+                logger.info("asyncpg pool connected after %d attempt(s)", self.connect_attempts)
+                return
+            delay = min(DB_FAST_POOL_RETRY_MAX_S, delay * 2)
+
+    async def start(self) -> bool:
+        """Connect the pool; on failure keep retrying in the background and return False."""
+        if self.pool is not None:
+            return True
+        if self._retry is not None and not self._retry.done():
+            return False
+        if await self._connect():
+            return True
+        logger.warning("asyncpg pool unavailable (%s); hot statements go through SQLAlchemy until it connects",
+                       self.last_error)
+        self._retry = asyncio.create_task(self._reconnect())
+        return False
+
+    async def close(self) -> None:
+        if self._retry is not None:
+            self._retry.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._retry
+            self._retry = None
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            await pool.close()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[asyncpg.Connection]:
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        async with self.pool.acquire() as conn:
+            self.wait_hist.observe(loop.time() - t0)
+            self.acquires += 1
+            yield conn
+
+    async def fetch(self, sql: str, *args: Any) -> List[asyncpg.Record]:
+        async with self.connection() as conn:
+            return await conn.fetch(sql, *args)
+
+    async def execute(self, sql: str, *args: Any) -> str:
+        async with self.connection() as conn:
+            return await conn.execute(sql, *args)
+
+    def stats(self) -> dict:
+        pool = self.pool
+        p50, p99 = self.wait_hist.quantile(0.5), self.wait_hist.quantile(0.99)
+        return {
+            "ready": pool is not None,
+            "size": pool.get_size() if pool else 0,
+            "idle": pool.get_idle_size() if pool else 0,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "connecting": self._retry is not None and not self._retry.done(),
+            "connect_attempts": self.connect_attempts,
+            "connect_errors": self.connect_errors.value,
+            "last_error": self.last_error,
+            "acquires": self.acquires,
+            "warm_statements": len(self._warm),
+            "warm_errors": self.warm_errors,
+            "wait_p50_ms": None if p50 is None else p50 * 1000.0,
+            "wait_p99_ms": None if p99 is None else p99 * 1000.0,
+        }
+
+
+# Singleton shared by the ingestor and the routers
+db_pool = DbPool()
@@ -0,0 +1,193 @@
+import math
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+# Column order used everywhere a batch is written out (COPY, unnest, spool);
+# `id` is an identity column and is filled by the DB.
+COLUMNS = (
+    "ts", "joint_id", "run_id",
+    "position", "velocity", "accel",
+    "torque", "supply_v", "motor_temp", "controller_temp",
+    "mode", "fault_code", "error_flags",
+    "target_position", "target_velocity", "target_accel", "target_torque",
+)
+FLOAT_COLUMNS = (
+    "position", "velocity", "accel",
+    "torque", "supply_v", "motor_temp", "controller_temp",
+    "target_position", "target_velocity", "target_accel", "target_torque",
+)
+INT_COLUMNS = ("run_id", "fault_code", "error_flags")
+STR_COLUMNS = ("joint_id", "mode")
+
+# NULL markers: NaN in float columns, NULL_INT in int columns, code 0 in string columns
+NAN = math.nan
+NULL_INT = -(1 << 63)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+
+
+class _Interner:
+    """Process-wide string table so joint ids / modes are stored as small ints."""
+
+    def __init__(self) -> None:
+        self.strings: List[Optional[str]] = [None]
+        self.bytes: List[bytes] = [b""]
+        self._codes: Dict[Optional[str], int] = {None: 0}
+
+    def code(self, s: Optional[str]) -> int:
+        c = self._codes.get(s)
+        if c is None:
+            s = str(s)
+            c = self._codes.get(s)
+            if c is None:
+                c = len(self.strings)
+                self.strings.append(s)
+                self.bytes.append(s.encode("utf-8"))
+                self._codes[s] = c
+        return c
+
+
+strings = _Interner()
+
+
+def ts_to_us(ts: datetime) -> int:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (ts - EPOCH) // _US
+
+
+def us_to_ts(us: int) -> datetime:
+    return EPOCH + us * _US
+
+
+class SampleBatch:
+    """
+    Preallocated column store for up to `capacity` JointSample rows.
+
+    Producers write straight into the typed arrays with `append(...)`; flush
+    paths read the columns back out. No per-row object is kept around:
+    timestamps are int64 microseconds since the Unix epoch, strings are
+    interned codes, and NULLs use the markers above.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.size = 0
+        self.ts = array("q", bytes(8 * capacity))
+        self.joint_id = array("H", bytes(2 * capacity))
+        self.mode = array("H", bytes(2 * capacity))
+        self.run_id = array("q", bytes(8 * capacity))
+        self.fault_code = array("q", bytes(8 * capacity))
+        self.error_flags = array("q", bytes(8 * capacity))
+        self.position = array("d", bytes(8 * capacity))
+        self.velocity = array("d", bytes(8 * capacity))
+        self.accel = array("d", bytes(8 * capacity))
+        self.torque = array("d", bytes(8 * capacity))
+        self.supply_v = array("d", bytes(8 * capacity))
+        self.motor_temp = array("d", bytes(8 * capacity))
+        self.controller_temp = array("d", bytes(8 * capacity))
+        self.target_position = array("d", bytes(8 * capacity))
+        self.target_velocity = array("d", bytes(8 * capacity))
+        self.target_accel = array("d", bytes(8 * capacity))
+        self.target_torque = array("d", bytes(8 * capacity))
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.capacity
+
+    def clear(self) -> None:
+        self.size = 0
+
+    def append(
+        self,
+        ts_us: int,
+        joint_id: str,
+        run_id: Optional[int],
+        position: Optional[float],
+        velocity: Optional[float],
+        accel: Optional[float],
+        torque: Optional[float],
+        supply_v: Optional[float],
+        motor_temp: Optional[float],
+        controller_temp: Optional[float],
+        mode: Optional[str],
+        fault_code: Optional[int],
+        error_flags: Optional[int],
+        target_position: Optional[float],
+        target_velocity: Optional[float],
+        target_accel: Optional[float],
+        target_torque: Optional[float],
+    ) -> None:
+        i = self.size
+        self.ts[i] = ts_us
+        self.joint_id[i] = strings.code(joint_id)
+        self.run_id[i] = NULL_INT if run_id is None else run_id
+        self.position[i] = NAN if position is None else position
+        self.velocity[i] = NAN if velocity is None else velocity
+        self.accel[i] = NAN if accel is None else accel
+        self.torque[i] = NAN if torque is None else torque
+        self.supply_v[i] = NAN if supply_v is None else supply_v
+        self.motor_temp[i] = NAN if motor_temp is None else motor_temp
+        self.controller_temp[i] = NAN if controller_temp is None else controller_temp
+        self.mode[i] = strings.code(mode)
+        self.fault_code[i] = NULL_INT if fault_code is None else fault_code
+        self.error_flags[i] = NULL_INT if error_flags is None else error_flags
+        self.target_position[i] = NAN if target_position is None else target_position
+        self.target_velocity[i] = NAN if target_velocity is None else target_velocity
+        self.target_accel[i] = NAN if target_accel is None else target_accel
+        self.target_torque[i] = NAN if target_torque is None else target_torque
+        self.size = i + 1
+
+    def append_row(self, row: Dict[str, Any]) -> None:
+        """Slow path for API callers that already hold a JointSample-shaped dict."""
+        g = row.get
+        ts = g("ts")
+        self.append(
+            ts_to_us(ts) if ts is not None else ts_to_us(datetime.now(timezone.utc)),
+            row["joint_id"], g("run_id"),
+            g("position"), g("velocity"), g("accel"),
+            g("torque"), g("supply_v"), g("motor_temp"), g("controller_temp"),
+            g("mode"), g("fault_code"), g("error_flags"),
+            g("target_position"), g("target_velocity"), g("target_accel"), g("target_torque"),
+        )
+
+    def slice(self, start: int, end: int) -> "SampleBatch":
+        """Copy of rows [start, end) as a new batch."""
+        end = min(end, self.size)
+        out = SampleBatch(max(0, end - start))
+        out.size = out.capacity
+        for name in ("ts", *STR_COLUMNS, *INT_COLUMNS, *FLOAT_COLUMNS):
+            getattr(out, name)[:] = getattr(self, name)[start:end]
+        return out
+
+    def column(self, name: str) -> list:
+        """One column as a Python list with None for NULL (for array-typed SQL params)."""
+        n = self.size
+        col = getattr(self, name)[:n]
+        if name in STR_COLUMNS:
+            table = strings.strings
+            return [table[c] for c in col]
+        if name in INT_COLUMNS:
+            return [None if v == NULL_INT else v for v in col]
+        if name in FLOAT_COLUMNS:
+            return [None if v != v else v for v in col]
+        return col.tolist()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Only ship the filled part (used when the ingest queue spills to disk)
+        n = self.size
+        state = {"capacity": self.capacity, "size": n}
+        for name in ("ts", *STR_COLUMNS, *INT_COLUMNS, *FLOAT_COLUMNS):
+            state[name] = getattr(self, name)[:n]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["capacity"])
+        self.size = state["size"]
+        for name in ("ts", *STR_COLUMNS, *INT_COLUMNS, *FLOAT_COLUMNS):
+            getattr(self, name)[:self.size] = state[name]
@@ -0,0 +1,100 @@
+import asyncio
+import io
+import struct
+from typing import Optional
+
+import asyncpg
+
+from backend.db import asyncpg_dsn
+from backend.ingest.columnar import COLUMNS, NULL_INT, SampleBatch, strings
+
+# PostgreSQL binary COPY framing
+_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_TRAILER = struct.pack(">h", -1)
+_NULL = struct.pack(">i", -1)
+_FIELDS = struct.pack(">h", len(COLUMNS))
+_PG_EPOCH_US = 946_684_800_000_000  # 2000-01-01 relative to the Unix epoch
+
+_int8 = struct.Struct(">iq").pack
+_int4 = struct.Struct(">ii").pack
+_float8 = struct.Struct(">id").pack
+_len = struct.Struct(">i").pack
+
+
+def encode_copy_binary(batch: SampleBatch) -> bytes:
+    """Encode a batch as a binary COPY payload for `joint_samples` in COLUMNS order."""
+    table = strings.bytes
+    text = [_len(len(b)) + b for b in table]
+    text[0] = _NULL
+
+    ts, joint_id, run_id = batch.ts, batch.joint_id, batch.run_id
+    mode, fault_code, error_flags = batch.mode, batch.fault_code, batch.error_flags
+    pre = (batch.position, batch.velocity, batch.accel,
+           batch.torque, batch.supply_v, batch.motor_temp, batch.controller_temp)
+    post = (batch.target_position, batch.target_velocity, batch.target_accel, batch.target_torque)
+
+    out = [_HEADER]
+    put = out.append
+    for i in range(batch.size):
+        put(_FIELDS)
+        put(_int8(8, ts[i] - _PG_EPOCH_US))
+        put(text[joint_id[i]])
+        v = run_id[i]
+        put(_NULL if v == NULL_INT else _int4(4, v))
+        for col in pre:
+            f = col[i]
+            put(_NULL if f != f else _float8(8, f))
+        put(text[mode[i]])
+        v = fault_code[i]
+        put(_NULL if v == NULL_INT else _int4(4, v))
+        v = error_flags[i]
+        put(_NULL if v == NULL_INT else _int8(8, v))
+        for col in post:
+            f = col[i]
+            put(_NULL if f != f else _float8(8, f))
+    put(_TRAILER)
+    return b"".join(out)
+
+
+class CopyWriter:
+    """
+    Streams telemetry batches into `joint_samples` with binary COPY over one
+    long-lived asyncpg connection. The payload is encoded straight from the
+    batch columns, so no per-row Python objects are built on the way out.
+    Live flushes and spool replay share the connection, one COPY at a time.
+    """
+
+    def __init__(self, dsn: Optional[str] = None, table: str = "joint_samples"):
+        self.dsn = dsn or asyncpg_dsn()
+        self.table = table
+        self._conn: Optional[asyncpg.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def _connection(self) -> asyncpg.Connection:
+        if self._conn is None or self._conn.is_closed():
+            self._conn = await asyncpg.connect(self.dsn)
+        return self._conn
+
+    async def write(self, batch: SampleBatch) -> None:
+        if not batch.size:
+            return
+        payload = encode_copy_binary(batch)
+        async with self._lock:
+            conn = await self._connection()
+            try:
+                await conn.copy_to_table(
+                    self.table, source=io.BytesIO(payload), columns=COLUMNS, format="binary",
+                )
+            except (asyncpg.PostgresConnectionError, ConnectionError, OSError):
+                # Drop the broken connection; the next flush reconnects
+                await self._close()
+                raise
+
+    async def _close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None and not conn.is_closed():
+            await conn.close()
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._close()
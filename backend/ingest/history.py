@@ -0,0 +1,219 @@
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.ingest.columnar import (
+    FLOAT_COLUMNS, INT_COLUMNS, NULL_INT, SampleBatch, strings, ts_to_us, us_to_ts,
+)
+
+# Seconds of recent rows kept in memory per joint; 0 disables the rings
+HISTORY_SECONDS = float(os.getenv("TELEMETRY_HISTORY_SECONDS", 60))
+# Rows per second to size the rings for (the sampler writes one row per tick)
+HISTORY_HZ = float(os.getenv("SAMPLER_HZ", 100))
+# Headroom for command/target rows and POSTed samples on top of the sampler's
+HISTORY_HEADROOM = 1.25
+
+
+class JointHistory:
+    """
+    Fixed-capacity columnar ring of one joint's most recent rows.
+
+    Storage is a SampleBatch used as a circular buffer (same typed columns
+    and NULL markers as the ingest batches). `floor_us` is the newest
+    timestamp this ring can no longer vouch for: rows older than the ring
+    itself, or evicted ones. Any window starting after it is complete.
+    """
+
+    def __init__(self, capacity: int, floor_us: int):
+        self.capacity = capacity
+        self.rows = SampleBatch(capacity)
+        self.total = 0          # rows ever written; next slot is total % capacity
+        self.floor_us = floor_us
+        self._last_ts = -(1 << 63)
+        self._disorder_at = -1  # index of the last row older than its predecessor
+
+    def append(self, ts_us: int, *values: Any) -> None:
+        i = self.total % self.capacity
+        rows = self.rows
+        if self.total >= self.capacity:
+            evicted = rows.ts[i]
+            if evicted > self.floor_us:
+                self.floor_us = evicted
+        if ts_us < self._last_ts:
+            self._disorder_at = self.total
+        else:
+            self._last_ts = ts_us
+        rows.size = i  # SampleBatch.append writes at .size
+        rows.append(ts_us, *values)
+        self.total += 1
+
+    def covers(self, since_us: int) -> bool:
+        return since_us > self.floor_us
+
+    def select(self, since_us: int, limit: int, run_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Rows with ts >= since_us, newest first (same order as ORDER BY ts DESC)."""
+        rows = self.rows
+        ts = rows.ts
+        cap = self.capacity
+        first = max(0, self.total - cap)
+        idx: List[int] = []
+        if self.total - self._disorder_at > cap:
+            # Retained rows are in time order: walk back from the newest
+            for n in range(self.total - 1, first - 1, -1):
+                i = n % cap
+                if ts[i] < since_us:
+                    break
+                if run_id is None or rows.run_id[i] == run_id:
+                    idx.append(i)
+                    if len(idx) >= limit:
+                        break
+        else:
+            cand = [n % cap for n in range(first, self.total)]
+            cand = [i for i in cand if ts[i] >= since_us and (run_id is None or rows.run_id[i] == run_id)]
+            cand.sort(key=ts.__getitem__, reverse=True)
+            idx = cand[:limit]
+        return [self._row(i) for i in idx]
+
+    def after(self, after_us: int, limit: int, run_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Rows with ts > after_us, oldest first. A page never ends in the middle
+        of a group of rows sharing one timestamp, so a cursor on the last ts
+        is enough to resume.
+        """
+        rows = self.rows
+        ts = rows.ts
+        cap = self.capacity
+        first = max(0, self.total - cap)
+        idx: List[int] = []
+        if self.total - self._disorder_at > cap:
+            for n in range(self.total - 1, first - 1, -1):
+                i = n % cap
+                if ts[i] <= after_us:
+                    break
+                if run_id is None or rows.run_id[i] == run_id:
+                    idx.append(i)
+            idx.reverse()
+        else:
+            idx = [n % cap for n in range(first, self.total)]
+            idx = [i for i in idx if ts[i] > after_us and (run_id is None or rows.run_id[i] == run_id)]
+            idx.sort(key=ts.__getitem__)
+        end = min(limit, len(idx))
+        while 0 < end < len(idx) and ts[idx[end]] == ts[idx[end - 1]]:
+            end += 1
+        return [self._row(i) for i in idx[:end]]
+
+    def _row(self, i: int) -> Dict[str, Any]:
+        r = self.rows
+        table = strings.strings
+        out: Dict[str, Any] = {
+            "ts": us_to_ts(r.ts[i]),
+            "joint_id": table[r.joint_id[i]],
+            "mode": table[r.mode[i]],
+        }
+        for name in INT_COLUMNS:
+            v = getattr(r, name)[i]
+            out[name] = None if v == NULL_INT else v
+        for name in FLOAT_COLUMNS:
+            v = getattr(r, name)[i]
+            out[name] = None if v != v else v
+        return out
+
+
+class TelemetryHistory:
+    """
+    Per-joint JointHistory rings, written by the ingestor for every row it
+    accepts, so a recent window read from here matches what the database
+    holds (plus rows still waiting to be flushed). Rows recorded here that
+    never reach the database (dropped by the queue's overflow policy,
+    rejected by the DB, lost) are passed to forget(): the ring stops
+    vouching for windows that reach back to them, and those reads go to the
+    database instead.
+    """
+
+    def __init__(self, seconds: float = HISTORY_SECONDS, hz: float = HISTORY_HZ):
+        self.seconds = seconds
+        self.capacity = int(seconds * hz * HISTORY_HEADROOM) if seconds > 0 else 0
+        # Rows written before this process started are only in the database
+        self.started_us = time.time_ns() // 1000
+        self._joints: Dict[str, JointHistory] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def append(self, ts_us: int, joint_id: str, *values: Any) -> None:
+        if not self.capacity:
+            return
+        h = self._joints.get(joint_id)
+        if h is None:
+            h = self._joints[joint_id] = JointHistory(self.capacity, self.started_us)
+        h.append(ts_us, joint_id, *values)
+
+    def append_row(self, row: Dict[str, Any]) -> None:
+        """Same as append() for a JointSample-shaped dict (API callers)."""
+        g = row.get
+        ts = g("ts")
+        self.append(
+            ts_to_us(ts) if ts is not None else time.time_ns() // 1000,
+            row["joint_id"], g("run_id"),
+            g("position"), g("velocity"), g("accel"),
+            g("torque"), g("supply_v"), g("motor_temp"), g("controller_temp"),
+            g("mode"), g("fault_code"), g("error_flags"),
+            g("target_position"), g("target_velocity"), g("target_accel"), g("target_torque"),
+        )
+
+    def forget(self, batch: SampleBatch) -> None:
+        """Rows of `batch` won't be in the database: no window covering them is served from here."""
+        if not self.capacity or not batch.size:
+            return
+        newest: Dict[int, int] = {}
+        ts = batch.ts
+        for i, code in enumerate(batch.joint_id[:batch.size]):
+            if ts[i] > newest.get(code, -(1 << 63)):
+                newest[code] = ts[i]
+        table = strings.strings
+        for code, ts_us in newest.items():
+            h = self._joints.get(table[code])
+            if h is not None and ts_us > h.floor_us:
+                h.floor_us = ts_us
+
+    def recent(
+        self,
+        joint_id: str,
+        since_us: int,
+        limit: int,
+        run_id: Optional[int] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Rows newer than `since_us`, or None if the ring can't vouch for the whole window."""
+        if not self.capacity:
+            return None
+        h = self._joints.get(joint_id)
+        if not (h.covers(since_us) if h is not None else since_us > self.started_us):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return h.select(since_us, limit, run_id) if h is not None else []
+
+    def after(
+        self,
+        joint_id: str,
+        after_us: int,
+        limit: int,
+        run_id: Optional[int] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Rows newer than `after_us`, oldest first, or None if the ring can't vouch for all of them."""
+        if not self.capacity:
+            return None
+        h = self._joints.get(joint_id)
+        if not (h.covers(after_us + 1) if h is not None else after_us >= self.started_us):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return h.after(after_us, limit, run_id) if h is not None else []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "seconds": self.seconds,
+            "capacity": self.capacity,
+            "joints": len(self._joints),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,150 @@
+"""
+In-process LRU cache of telemetry query results, one entry per time segment.
+
+Windows are cut into fixed-width segments aligned to the epoch, and each
+entry holds the rows of one (query, joint, run, field set, segment start).
+A segment that ended more than the source's settle time ago (how late rows
+can still land in it: ingest flush delay, rollup refresh lag) is closed and
+its rows no longer change, so it's queried once and served from here after
+that. The open tail of a window is queried on every request.
+
+Size is bounded by the total number of cached rows; the least recently used
+segments go first. Rows can still land in a closed segment: spool replay,
+batches held back by the block/spill queue policies during a DB stall, or
+POSTed samples with an old `ts`. Every write path reports what it wrote
+through written(), which drops the cached segments of that joint the late
+rows fall into. A rollup segment re-read before the aggregate's next refresh
+would still miss them, so entries also expire after QUERY_CACHE_TTL_S.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional
+
+from backend.ingest.columnar import SampleBatch, strings
+
+# Upper bound on rows held across all cached segments; 0 disables the cache
+QUERY_CACHE_ROWS = int(os.getenv("QUERY_CACHE_ROWS", 500_000))
+# Age after which an entry is read from the database again, whatever happened
+QUERY_CACHE_TTL_S = float(os.getenv("QUERY_CACHE_TTL_S", 300))
+# Rows older than this when written are late: closed raw segments may hold them
+SAMPLES_SETTLE_S = 30
+
+
+def segment_starts(start_us: int, end_us: int, width_us: int) -> List[int]:
+    """Starts of the aligned segments that overlap [start_us, end_us)."""
+    first = start_us - start_us % width_us
+    return list(range(first, end_us, width_us))
+
+
+class _Entry(NamedTuple):
+    rows: List[Dict[str, Any]]
+    joint_id: str
+    start_us: int
+    end_us: int
+    expires: float
+
+
+class QueryCache:
+    def __init__(self, max_rows: int = QUERY_CACHE_ROWS, ttl_s: float = QUERY_CACHE_TTL_S):
+        self.max_rows = max_rows
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.invalidated = 0
+        self.clears = 0
+
+    def _drop(self, key: Hashable) -> None:
+        self.rows -= max(1, len(self._entries.pop(key).rows))
+
+    def get(self, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires <= time.monotonic():
+            self._drop(key)
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.rows
+
+    def put(self, key: Hashable, rows: List[Dict[str, Any]], joint_id: str, start_us: int, end_us: int) -> None:
+        """Cache the rows of `joint_id` in [start_us, end_us) under `key`."""
+        # Empty segments are cached too (an entry costs at least one row)
+        size = max(1, len(rows))
+        if size > self.max_rows:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = _Entry(rows, joint_id, start_us, end_us, time.monotonic() + self.ttl_s)
+        self.rows += size
+        while self.rows > self.max_rows:
+            _, evicted = self._entries.popitem(last=False)
+            self.rows -= max(1, len(evicted.rows))
+            self.evictions += 1
+
+    def invalidate(self, joint_id: str, start_us: int, end_us: int) -> None:
+        """Drop the entries of `joint_id` that overlap [start_us, end_us]."""
+        stale = [
+            key for key, e in self._entries.items()
+            if e.joint_id == joint_id and e.start_us <= end_us and start_us < e.end_us
+        ]
+        for key in stale:
+            self._drop(key)
+        self.invalidated += len(stale)
+
+    def written(self, joint_id: str, first_us: int, last_us: int) -> None:
+        """Rows of `joint_id` with ts in [first_us, last_us] were just written."""
+        if first_us < time.time_ns() // 1000 - SAMPLES_SETTLE_S * 1_000_000:
+            self.invalidate(joint_id, first_us, last_us)
+
+    def written_batch(self, batch: SampleBatch) -> None:
+        n = batch.size
+        if not n:
+            return
+        ts = batch.ts
+        # Fast path: nothing late, which is every live sampler flush
+        if min(ts[:n]) >= time.time_ns() // 1000 - SAMPLES_SETTLE_S * 1_000_000:
+            return
+        spans: Dict[int, List[int]] = {}
+        joint_ids = batch.joint_id
+        for i in range(n):
+            t = ts[i]
+            span = spans.get(joint_ids[i])
+            if span is None:
+                spans[joint_ids[i]] = [t, t]
+            elif t < span[0]:
+                span[0] = t
+            elif t > span[1]:
+                span[1] = t
+        for code, (lo, hi) in spans.items():
+            self.written(strings.strings[code], lo, hi)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.rows = 0
+        self.clears += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "rows": self.rows,
+            "max_rows": self.max_rows,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+            "clears": self.clears,
+        }
+
+
+# Singleton shared by the telemetry endpoints
+query_cache = QueryCache()
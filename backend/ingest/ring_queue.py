@@ -0,0 +1,213 @@
+import asyncio
+import os
+import pickle
+import struct
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional
+
+POLICIES = ("drop_oldest", "drop_newest", "block", "spill")
+
+_LEN = struct.Struct("<I")
+
+
+class _DiskSpill:
+    """
+    Append-only overflow file of length-prefixed pickled items, read back FIFO.
+    The file is truncated once fully drained so it never outgrows one outage.
+    It's only created (and truncated) on the first spill, so merely importing
+    a module that builds a queue (e.g. in the sampler child process) leaves
+    another process's live spill file alone.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+        self._read_pos = 0
+        self._write_pos = 0
+        self.count = 0
+        self.rows = 0
+
+    def append(self, item: Any, rows: int) -> None:
+        data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        if self._fh is None:
+            self._fh = open(self.path, "w+b")
+        self._fh.seek(self._write_pos)
+        self._fh.write(_LEN.pack(len(data)))
+        self._fh.write(data)
+        self._write_pos = self._fh.tell()
+        self.count += 1
+        self.rows += rows
+
+    def read(self, n: int) -> List[Any]:
+        out: List[Any] = []
+        if not self.count:
+            return out
+        self._fh.flush()
+        self._fh.seek(self._read_pos)
+        while len(out) < n and self.count:
+            (size,) = _LEN.unpack(self._fh.read(_LEN.size))
+            item = pickle.loads(self._fh.read(size))
+            out.append(item)
+            self.count -= 1
+            self.rows -= len(item)
+        self._read_pos = self._fh.tell()
+        if not self.count:
+            self._fh.seek(0)
+            self._fh.truncate()
+            self._read_pos = self._write_pos = self.rows = 0
+        return out
+
+    def close(self) -> None:
+        if self._fh is None:
+            return
+        self._fh.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class RingQueue:
+    """
+    Bounded FIFO between producers (samplers, API) and the ingestor's flush loop.
+
+    Items are sized (`len(item)` rows each, e.g. a SampleBatch); `capacity`
+    counts items, while the counters and depths below count rows.
+
+    When `capacity` is reached the overflow policy decides what happens:
+      - drop_oldest: evict the oldest queued item to make room
+      - drop_newest: reject the incoming item
+      - block:       the producer awaits until the consumer makes room
+      - spill:       overflow goes to a file on disk and is pulled back in
+                     FIFO order as room frees up
+    `on_drop` is called with every item the policy discards.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        policy: str = "drop_oldest",
+        spill_path: Optional[str] = None,
+        on_drop: Optional[Callable[[Any], None]] = None,
+    ):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r} (expected one of {', '.join(POLICIES)})")
+        if policy == "spill" and not spill_path:
+            raise ValueError("spill policy needs a spill_path")
+        self.capacity = capacity
+        self.policy = policy
+        self._on_drop = on_drop
+        self._buf: Deque[Any] = deque()
+        self._spill: Optional[_DiskSpill] = _DiskSpill(spill_path) if policy == "spill" else None
+        self._closed = False
+        self._rows = 0
+
+        # Consumer wakes once `_want` items are queued (or on close), not on every put
+        self._want = 1
+        self._ready = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.spilled = 0
+
+    def __len__(self) -> int:
+        return len(self._buf) + (self._spill.count if self._spill else 0)
+
+    @property
+    def depth(self) -> int:
+        """Rows held in memory (excludes anything spilled to disk)."""
+        return self._rows
+
+    @property
+    def spill_depth(self) -> int:
+        return self._spill.rows if self._spill else 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def put(self, item: Any) -> bool:
+        """Queue one item; returns False if the overflow policy discarded it."""
+        n = len(item)
+        if self._closed:
+            self._drop(item)
+            return False
+
+        if self.policy == "block":
+            while len(self._buf) >= self.capacity and not self._closed:
+                self._not_full.clear()
+                await self._not_full.wait()
+            if self._closed:
+                self._drop(item)
+                return False
+        elif self.policy == "spill" and (self._spill.count or len(self._buf) >= self.capacity):
+            # Once spilling, keep spilling until drained so FIFO order holds
+            self._spill.append(item, n)
+            self.spilled += n
+            self.enqueued += n
+            self._wake()
+            return True
+        elif len(self._buf) >= self.capacity:
+            if self.policy == "drop_newest":
+                self._drop(item)
+                return False
+            evicted = self._buf.popleft()
+            self._rows -= len(evicted)
+            self._drop(evicted)
+
+        self._buf.append(item)
+        self._rows += n
+        self.enqueued += n
+        self._wake()
+        return True
+
+    def _drop(self, item: Any) -> None:
+        self.dropped += len(item)
+        if self._on_drop is not None:
+            self._on_drop(item)
+
+    def _wake(self) -> None:
+        if len(self) >= self._want:
+            self._ready.set()
+
+    def _take(self, max_items: int) -> List[Any]:
+        n = min(max_items, len(self._buf))
+        out = [self._buf.popleft() for _ in range(n)]
+        self._rows -= sum(len(x) for x in out)
+        if self._spill and self._spill.count:
+            # Memory ran dry first, so spilled items are next in line
+            if len(out) < max_items:
+                out.extend(self._spill.read(max_items - len(out)))
+            room = self.capacity - len(self._buf)
+            if room > 0:
+                refill = self._spill.read(room)
+                self._buf.extend(refill)
+                self._rows += sum(len(x) for x in refill)
+        if len(self._buf) < self.capacity:
+            self._not_full.set()
+        return out
+
+    async def get_batch(self, max_items: int, timeout: float) -> List[Any]:
+        """Wait until `max_items` are queued, `timeout` seconds pass or the queue closes."""
+        if len(self) < max_items and not self._closed:
+            self._want = max_items
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._take(max_items)
+
+    def close(self) -> None:
+        """Stop accepting items and wake the consumer so it can drain what's left."""
+        self._closed = True
+        self._ready.set()
+        self._not_full.set()
+
+    def dispose(self) -> None:
+        if self._spill:
+            self._spill.close()
@@ -0,0 +1,274 @@
+import logging
+import mmap
+import os
+import re
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.ingest.columnar import FLOAT_COLUMNS, NAN, NULL_INT, SampleBatch, strings
+
+logger = logging.getLogger(__name__)
+
+# Fixed-width record mirroring JointSample (minus the DB-assigned id).
+# Nullable columns are tracked in a bitmap; text is NUL-padded and truncated.
+_NULLABLE = ("run_id", *FLOAT_COLUMNS, "mode", "fault_code", "error_flags")
+_NULL_BIT = {name: 1 << i for i, name in enumerate(_NULLABLE)}
+_MODE_NULL = _NULL_BIT["mode"]
+
+#   ts(us) joint_id run_id nulls  11 x float        mode  fault_code error_flags
+_RECORD = struct.Struct("<q32sqI" + "d" * len(FLOAT_COLUMNS) + "24siq")
+RECORD_SIZE = _RECORD.size
+
+# Segment header: magic, record size, capacity, written count, replayed count
+_MAGIC = b"JSWAL\x00\x00\x01"
+_HEADER = struct.Struct("<8sHxxIII")
+_HEADER_SIZE = 32
+_COUNT_OFF = 16
+_READ_OFF = 20
+
+_SEG_RE = re.compile(r"^seg-(\d{12})\.wal$")
+
+
+def encode_batch(batch: SampleBatch) -> List[bytes]:
+    """One fixed-width record per row, read straight from the batch columns."""
+    table = strings.bytes
+    floats = [getattr(batch, c) for c in FLOAT_COLUMNS]
+    out: List[bytes] = []
+    for i in range(batch.size):
+        nulls = 0
+        run_id = batch.run_id[i]
+        if run_id == NULL_INT:
+            nulls |= _NULL_BIT["run_id"]
+            run_id = 0
+        vals = []
+        for name, col in zip(FLOAT_COLUMNS, floats):
+            v = col[i]
+            if v != v:
+                nulls |= _NULL_BIT[name]
+            vals.append(v)
+        mode = batch.mode[i]
+        if not mode:
+            nulls |= _MODE_NULL
+        fault_code = batch.fault_code[i]
+        if fault_code == NULL_INT:
+            nulls |= _NULL_BIT["fault_code"]
+            fault_code = 0
+        error_flags = batch.error_flags[i]
+        if error_flags == NULL_INT:
+            nulls |= _NULL_BIT["error_flags"]
+            error_flags = 0
+        out.append(_RECORD.pack(
+            batch.ts[i], table[batch.joint_id[i]][:32], run_id, nulls,
+            *vals, table[mode][:24], fault_code, error_flags,
+        ))
+    return out
+
+
+def decode_into(batch: SampleBatch, buf, offset: int) -> None:
+    ts_us, joint_id, run_id, nulls, *rest = _RECORD.unpack_from(buf, offset)
+    floats, (mode, fault_code, error_flags) = rest[:len(FLOAT_COLUMNS)], rest[len(FLOAT_COLUMNS):]
+    i = batch.size
+    batch.ts[i] = ts_us
+    batch.joint_id[i] = strings.code(joint_id.rstrip(b"\x00").decode("utf-8", "replace"))
+    batch.run_id[i] = NULL_INT if nulls & _NULL_BIT["run_id"] else run_id
+    for name, v in zip(FLOAT_COLUMNS, floats):
+        getattr(batch, name)[i] = NAN if nulls & _NULL_BIT[name] else v
+    batch.mode[i] = 0 if nulls & _MODE_NULL else strings.code(mode.rstrip(b"\x00").decode("utf-8", "replace"))
+    batch.fault_code[i] = NULL_INT if nulls & _NULL_BIT["fault_code"] else fault_code
+    batch.error_flags[i] = NULL_INT if nulls & _NULL_BIT["error_flags"] else error_flags
+    batch.size = i + 1
+
+
+class _Segment:
+    """One pre-sized, memory-mapped segment file: header + `capacity` fixed-width records."""
+
+    def __init__(self, path: Path, capacity: Optional[int] = None):
+        self.path = path
+        create = capacity is not None
+        fd = os.open(path, os.O_RDWR | (os.O_CREAT | os.O_EXCL if create else 0), 0o644)
+        try:
+            if create:
+                os.ftruncate(fd, _HEADER_SIZE + capacity * RECORD_SIZE)
+            self._mm = mmap.mmap(fd, 0)
+        finally:
+            os.close(fd)
+        if create:
+            _HEADER.pack_into(self._mm, 0, _MAGIC, RECORD_SIZE, capacity, 0, 0)
+            self._mm.flush()
+        magic, rec_size, self.capacity, _, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or rec_size != RECORD_SIZE:
+            self._mm.close()
+            raise ValueError(f"{path} is not a telemetry spool segment (or has an old layout)")
+
+    @property
+    def count(self) -> int:
+        return struct.unpack_from("<I", self._mm, _COUNT_OFF)[0]
+
+    @property
+    def read(self) -> int:
+        return struct.unpack_from("<I", self._mm, _READ_OFF)[0]
+
+    @property
+    def pending(self) -> int:
+        return self.count - self.read
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    @property
+    def size(self) -> int:
+        return _HEADER_SIZE + self.capacity * RECORD_SIZE
+
+    def append(self, records: List[bytes]) -> int:
+        count = self.count
+        n = min(len(records), self.capacity - count)
+        off = _HEADER_SIZE + count * RECORD_SIZE
+        self._mm[off:off + n * RECORD_SIZE] = b"".join(records[:n])
+        # Commit the records before publishing the new count
+        self._mm.flush()
+        struct.pack_into("<I", self._mm, _COUNT_OFF, count + n)
+        self._mm.flush(0, _HEADER_SIZE)
+        return n
+
+    def peek(self, n: int) -> SampleBatch:
+        start = self.read
+        end = min(self.count, start + n)
+        batch = SampleBatch(end - start)
+        for i in range(start, end):
+            decode_into(batch, self._mm, _HEADER_SIZE + i * RECORD_SIZE)
+        return batch
+
+    def consume(self, n: int) -> None:
+        struct.pack_into("<I", self._mm, _READ_OFF, min(self.count, self.read + n))
+        self._mm.flush(0, _HEADER_SIZE)
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def unlink(self) -> None:
+        self.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SegmentSpool:
+    """
+    Append-only on-disk write-ahead spool for telemetry batches that could not
+    be flushed. Rows are stored as fixed-width records in pre-sized, memory-mapped
+    segment files; a full segment rotates to the next one. Replay reads the
+    oldest segment first and deletes each segment once it is fully replayed.
+
+    The total on-disk size is capped: when a new segment would exceed
+    `max_bytes`, the oldest segment is discarded (and its rows counted as
+    dropped) so the SD card never fills up. The segment a replay has peeked
+    into is never the one discarded while its rows are being written.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int, max_bytes: int):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.segment_records = max(1, (segment_bytes - _HEADER_SIZE) // RECORD_SIZE)
+        self.max_bytes = max_bytes
+        self._segments: List[_Segment] = []
+        self._next_seq = 0
+        # Segment of the last peek(), until its rows are consumed
+        self._pinned: Optional[_Segment] = None
+
+        self.spooled = 0
+        self.replayed = 0
+        self.dropped = 0
+
+        # Pick up whatever a previous process left behind
+        for path in sorted(self.dir.iterdir()):
+            m = _SEG_RE.match(path.name)
+            if not m:
+                continue
+            self._next_seq = max(self._next_seq, int(m.group(1)) + 1)
+            try:
+                seg = _Segment(path)
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping unreadable spool segment %s: %s", path, e)
+                continue
+            if seg.pending:
+                self._segments.append(seg)
+            else:
+                seg.unlink()
+        if self._segments:
+            logger.info("Telemetry spool: %d rows pending replay from a previous run", self.pending)
+
+    @property
+    def pending(self) -> int:
+        return sum(s.pending for s in self._segments)
+
+    @property
+    def bytes(self) -> int:
+        return sum(s.size for s in self._segments)
+
+    def _rotate(self) -> _Segment:
+        seg_size = _HEADER_SIZE + self.segment_records * RECORD_SIZE
+        while self._segments and self.bytes + seg_size > self.max_bytes:
+            victims = [s for s in self._segments if s is not self._pinned]
+            if not victims:
+                break  # only the segment being replayed is left: overshoot for now
+            oldest = victims[0]
+            self._segments.remove(oldest)
+            self.dropped += oldest.pending
+            logger.warning("Telemetry spool over %d bytes; discarded %d rows from %s",
+                           self.max_bytes, oldest.pending, oldest.path.name)
+            oldest.unlink()
+        path = self.dir / f"seg-{self._next_seq:012d}.wal"
+        self._next_seq += 1
+        seg = _Segment(path, capacity=self.segment_records)
+        self._segments.append(seg)
+        return seg
+
+    def append(self, batch: SampleBatch) -> None:
+        records = encode_batch(batch)
+        while records:
+            seg = self._segments[-1] if self._segments and not self._segments[-1].full else self._rotate()
+            n = seg.append(records)
+            records = records[n:]
+            self.spooled += n
+
+    def peek(self, n: int) -> Tuple[Optional[_Segment], Optional[SampleBatch]]:
+        """Oldest `n` (or fewer) pending rows, without consuming them."""
+        for seg in self._segments:
+            if seg.pending:
+                self._pinned = seg
+                return seg, seg.peek(n)
+        self._pinned = None
+        return None, None
+
+    def consume(self, seg: _Segment, n: int) -> None:
+        if seg not in self._segments:
+            return  # closed under us (spool closed); its rows were never counted as replayed
+        seg.consume(n)
+        self.replayed += n
+        if not seg.pending:
+            self._pinned = None
+        # Drop fully replayed segments, but keep the tail one while it still has room
+        while self._segments and not self._segments[0].pending and (
+            self._segments[0].full or len(self._segments) > 1
+        ):
+            self._segments.pop(0).unlink()
+
+    def close(self) -> None:
+        for seg in self._segments:
+            seg.close()
+        self._segments.clear()
+        self._pinned = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending,
+            "segments": len(self._segments),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "dropped": self.dropped,
+        }
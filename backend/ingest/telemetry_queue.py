@@ -1,69 +1,417 @@
 import asyncio
+import logging
+import math
 import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
 from typing import Any, Dict, List, Optional
-from sqlalchemy import insert
+from sqlalchemy import text
 from backend.db import SessionLocal
-from backend.models import JointSample
+from backend.db_pool import db_pool
+from backend.ingest.columnar import COLUMNS, SampleBatch
+from backend.ingest.copy_writer import CopyWriter
+from backend.ingest.history import TelemetryHistory
+from backend.ingest.query_cache import query_cache
+from backend.ingest.ring_queue import RingQueue
+from backend.ingest.spool import SegmentSpool
+
+logger = logging.getLogger(__name__)
 
 FLUSH_MAX = int(os.getenv("TELEMETRY_FLUSH_MAX", 200))
 FLUSH_MS  = int(os.getenv("TELEMETRY_FLUSH_MS", 200))
+# "unnest": one INSERT ... SELECT FROM unnest(column arrays), prepared on the
+#          asyncpg pool once it's started (SQLAlchemy session before that)
+# "copy":   asyncpg binary COPY encoded straight from the batch columns
+FLUSH_BACKEND = os.getenv("TELEMETRY_FLUSH_BACKEND", "unnest").lower()
+FLUSH_BACKENDS = ("unnest", "copy")
+# Old names still accepted in TELEMETRY_FLUSH_BACKEND
+_FLUSH_BACKEND_ALIASES = {"orm": "unnest"}
+# Bounded queue: ~20 s of 12 joints at 100 Hz before the overflow policy kicks in
+QUEUE_MAX    = int(os.getenv("TELEMETRY_QUEUE_MAX", 20000))
+QUEUE_POLICY = os.getenv("TELEMETRY_QUEUE_POLICY", "drop_oldest").lower()
+SPILL_PATH   = os.getenv("TELEMETRY_SPILL_PATH", os.path.join(tempfile.gettempdir(), "telemetry_spill.bin"))
+# Write-ahead spool for batches the DB rejected; empty TELEMETRY_SPOOL_DIR disables it
+SPOOL_DIR        = os.getenv("TELEMETRY_SPOOL_DIR", str(Path(__file__).resolve().parents[1] / ".telemetry_spool"))
+SPOOL_SEGMENT_MB = float(os.getenv("TELEMETRY_SPOOL_SEGMENT_MB", 8))
+SPOOL_MAX_MB     = float(os.getenv("TELEMETRY_SPOOL_MAX_MB", 256))
+SPOOL_REPLAY_RPS = int(os.getenv("TELEMETRY_SPOOL_REPLAY_RPS", 2000))
+SPOOL_REPLAY_CHUNK = 500
+# A replay chunk that keeps failing while live flushes succeed is the problem
+# itself (whatever the error looks like): dropped after this many attempts
+SPOOL_REPLAY_ATTEMPTS = int(os.getenv("TELEMETRY_SPOOL_REPLAY_ATTEMPTS", 5))
+# Preallocated batches kept around for reuse once flushed
+BATCH_POOL = 4
+
+_ARRAY_TYPES = {
+    "ts": "bigint[]", "joint_id": "varchar[]", "run_id": "integer[]",
+    "mode": "text[]", "fault_code": "integer[]", "error_flags": "bigint[]",
+}
+_UNNEST_INSERT = text(
+    f"INSERT INTO joint_samples ({', '.join(COLUMNS)}) "
+    f"SELECT TIMESTAMPTZ 'epoch' + t.ts * INTERVAL '1 microsecond', "
+    f"{', '.join('t.' + c for c in COLUMNS[1:])} "
+    f"FROM unnest("
+    + ", ".join(f"CAST(:{c} AS {_ARRAY_TYPES.get(c, 'double precision[]')})" for c in COLUMNS)
+    + f") AS t({', '.join(COLUMNS)})"
+)
+# Same statement for the asyncpg pool ($n placeholders), prepared per connection
+_UNNEST_INSERT_PG = (
+    f"INSERT INTO joint_samples ({', '.join(COLUMNS)}) "
+    f"SELECT TIMESTAMPTZ 'epoch' + t.ts * INTERVAL '1 microsecond', "
+    f"{', '.join('t.' + c for c in COLUMNS[1:])} "
+    f"FROM unnest("
+    + ", ".join(f"${i}::{_ARRAY_TYPES.get(c, 'double precision[]')}" for i, c in enumerate(COLUMNS, 1))
+    + f") AS t({', '.join(COLUMNS)})"
+)
+db_pool.warm_up(_UNNEST_INSERT_PG, *([] for _ in COLUMNS))  # inserts nothing
+
+# SQLSTATE classes the same rows fail with on every retry: data exceptions
+# and integrity violations (NOT NULL, foreign key, ...). Class 42 (undefined
+# table/column, insufficient privilege) fails every row alike until the schema
+# or grant is fixed, so those batches are spooled like any transient error
+_PERMANENT_SQLSTATE = ("22", "23")
+
+
+def is_permanent(err: BaseException) -> bool:
+    """
+    True if retrying the same rows can't succeed. Anything else (connection
+    lost, timeouts, DB starting up or shutting down, ...) is worth a retry.
+    """
+    seen = set()
+    while err is not None and id(err) not in seen:
+        seen.add(id(err))
+        # asyncpg errors carry `sqlstate`, SQLAlchemy's adapted ones `pgcode`
+        code = getattr(err, "sqlstate", None) or getattr(err, "pgcode", None)
+        if isinstance(code, str):
+            return code[:2] in _PERMANENT_SQLSTATE
+        if isinstance(err, (ValueError, TypeError)):
+            return True  # rejected client-side while encoding (e.g. asyncpg DataError)
+        err = getattr(err, "orig", None) or err.__cause__
+    return False
+
+
+class _Interrupted(Exception):
+    """A transient error after the first `done` rows were written or rejected."""
+
+    def __init__(self, done: int, err: BaseException):
+        super().__init__(str(err))
+        self.done = done
+        self.err = err
+
 
 class TelemetryIngestor:
-    def __init__(self, flush_max: int = FLUSH_MAX, flush_ms: int = FLUSH_MS):
+    def __init__(
+        self,
+        flush_max: int = FLUSH_MAX,
+        flush_ms: int = FLUSH_MS,
+        backend: str = FLUSH_BACKEND,
+        queue_max: int = QUEUE_MAX,
+        queue_policy: str = QUEUE_POLICY,
+        spill_path: str = SPILL_PATH,
+        spool_dir: Optional[str] = SPOOL_DIR,
+        replay_rps: int = SPOOL_REPLAY_RPS,
+    ):
+        if backend in _FLUSH_BACKEND_ALIASES:
+            new_name = _FLUSH_BACKEND_ALIASES[backend]
+            logger.warning("Telemetry flush backend %r is deprecated; use %r", backend, new_name)
+            backend = new_name
+        if backend not in FLUSH_BACKENDS:
+            raise ValueError(f"Unknown telemetry flush backend {backend!r} (expected 'unnest' or 'copy')")
         self.flush_max = flush_max
         self.flush_ms  = flush_ms
-        self.queue: asyncio.Queue[Optional[Dict[str, Any]]] = asyncio.Queue()
+        self.backend = backend
+        self._copy: Optional[CopyWriter] = CopyWriter() if backend == "copy" else None
+        # Rows are written in place into a preallocated columnar batch; full (or
+        # timed-out) batches are what travels through the bounded queue
+        # Recent rows per joint, so short-window reads can skip the database
+        self.history = TelemetryHistory()
+        self._queue_args = (max(1, math.ceil(queue_max / flush_max)), queue_policy, spill_path, self.history.forget)
+        self.queue: RingQueue = RingQueue(*self._queue_args)
+        self._batch = SampleBatch(flush_max)
+        self._free: List[SampleBatch] = []
         self._task: Optional[asyncio.Task] = None
         self._running = False
 
+        self.spool_dir = spool_dir
+        self.replay_rps = max(1, replay_rps)
+        self.spool: Optional[SegmentSpool] = None
+        self._replay_task: Optional[asyncio.Task] = None
+        self._spool_ready = asyncio.Event()
+        self.lost = 0  # rows that failed to flush and could not be spooled either
+        self.rejected = 0  # rows the DB refuses for good (bisected out, or quarantined on replay)
+        self._last_fail_log = 0.0
+        self._last_reject_log = 0.0
+
+        # flush counters (queue keeps enqueued/dropped/spilled)
+        self.flushed = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.flush_last_ms = 0.0
+        self.flush_max_ms = 0.0
+        self._flush_total = 0.0
+
     async def start(self) -> None:
+        if self.queue.closed:
+            # restarted after stop(): fresh queue, same settings
+            self.queue = RingQueue(*self._queue_args)
         self._running = True
+        if self.spool_dir and self.spool is None:
+            self.spool = SegmentSpool(
+                self.spool_dir,
+                segment_bytes=int(SPOOL_SEGMENT_MB * 1024 * 1024),
+                max_bytes=int(SPOOL_MAX_MB * 1024 * 1024),
+            )
         self._task = asyncio.create_task(self._run())
+        if self.spool is not None:
+            self._spool_ready.set()  # replay leftovers from a previous run
+            self._replay_task = asyncio.create_task(self._supervise_replay())
 
     async def stop(self) -> None:
         self._running = False
-        await self.queue.put(None)
+        self.queue.close()
         if self._task:
             await self._task
+        self.queue.dispose()
+        # Whatever is still spooled stays on disk and is replayed on next start
+        if self._replay_task:
+            self._replay_task.cancel()
+            await asyncio.gather(self._replay_task, return_exceptions=True)
+            self._replay_task = None
+        if self.spool is not None:
+            self.spool.close()
+            self.spool = None
+        if self._copy is not None:
+            await self._copy.close()
+
+    async def append(self, *values: Any) -> bool:
+        """
+        Hot path: write one sample straight into the current columnar batch.
+        Takes the same positional columns as SampleBatch.append. False if the
+        overflow policy dropped the batch this row sealed.
+        """
+        b = self._batch
+        b.append(*values)
+        self.history.append(*values)
+        if b.size >= b.capacity:
+            return await self._seal()
+        return True
+
+    async def enqueue(self, row: Dict[str, Any]) -> bool:
+        # row should match JointSample columns; False if the overflow policy dropped it
+        if row.get("ts") is None:
+            row = {**row, "ts": datetime.now(timezone.utc)}  # one timestamp for batch and history
+        b = self._batch
+        b.append_row(row)
+        self.history.append_row(row)
+        if b.size >= b.capacity:
+            return await self._seal()
+        return True
+
+    def _swap(self) -> SampleBatch:
+        b = self._batch
+        self._batch = self._free.pop() if self._free else SampleBatch(self.flush_max)
+        return b
 
-    async def enqueue(self, row: Dict[str, Any]) -> None:
-        # row should match JointSample columns
-        await self.queue.put(row)
+    async def _seal(self) -> bool:
+        return await self.queue.put(self._swap())
+
+    def _recycle(self, b: SampleBatch) -> None:
+        if b.capacity == self.flush_max and len(self._free) < BATCH_POOL:
+            b.clear()
+            self._free.append(b)
+
+    def stats(self) -> Dict[str, Any]:
+        q = self.queue
+        return {
+            "backend": self.backend,
+            "policy": q.policy,
+            "capacity": q.capacity,
+            "depth": q.depth + self._batch.size,
+            "spill_depth": q.spill_depth,
+            "enqueued": q.enqueued,
+            "dropped": q.dropped,
+            "spilled": q.spilled,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "flush_max": self.flush_max,
+            "flush_ms": self.flush_ms,
+            "flush_latency_last_ms": self.flush_last_ms,
+            "flush_latency_avg_ms": (self._flush_total / self.flushes * 1000.0) if self.flushes else 0.0,
+            "flush_latency_max_ms": self.flush_max_ms,
+            "lost": self.lost,
+            "rejected": self.rejected,
+            "spool": self.spool.stats() if self.spool is not None else None,
+            "history": self.history.stats(),
+        }
+
+    async def _flush(self, buf: SampleBatch) -> None:
+        if not buf.size:
+            return
+        await self._insert(buf)
+        # Spooled rows and batches held back during a DB stall can be late
+        # for query segments the cache already considers closed
+        query_cache.written_batch(buf)
 
-    async def _flush(self, buf: List[Dict[str, Any]]) -> None:
-        if not buf:
+    async def _insert(self, buf: SampleBatch) -> None:
+        if self._copy is not None:
+            await self._copy.write(buf)
+            return
+        if db_pool.ready:
+            await db_pool.execute(_UNNEST_INSERT_PG, *(buf.column(c) for c in COLUMNS))
             return
         async with SessionLocal() as session:
-            await session.execute(insert(JointSample), buf)
+            await session.execute(_UNNEST_INSERT, {c: buf.column(c) for c in COLUMNS})
             await session.commit()
 
+    async def _timed_flush(self, buf: SampleBatch) -> None:
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        try:
+            await self._flush(buf)
+        except Exception:
+            self.flush_errors += 1
+            raise
+        dt = loop.time() - t0
+        self.flushes += 1
+        self.flushed += len(buf)
+        self._flush_total += dt
+        self.flush_last_ms = dt * 1000.0
+        self.flush_max_ms = max(self.flush_max_ms, self.flush_last_ms)
+
+    def _reject(self, rows: SampleBatch, err: BaseException) -> None:
+        n = rows.size
+        self.rejected += n
+        self.history.forget(rows)
+        now = time.monotonic()
+        if now - self._last_reject_log > 5.0:
+            reason = (str(err).splitlines() or [type(err).__name__])[0]
+            logger.warning("Telemetry DB rejected %d row(s) for good (%s); dropping them", n, reason)
+            self._last_reject_log = now
+
+    async def _salvage(self, buf: SampleBatch, start: int, end: int, err: BaseException, count: bool) -> None:
+        """
+        Rows [start, end) of `buf` failed with `err`. A permanent error is
+        bisected down to the offending rows, which are dropped; the rest is
+        written. A transient one raises _Interrupted with how far we got.
+        """
+        if not is_permanent(err):
+            raise _Interrupted(start, err)
+        if end - start == 1:
+            self._reject(buf.slice(start, end), err)
+            return
+        mid = (start + end) // 2
+        for a, b in ((start, mid), (mid, end)):
+            try:
+                await self._flush(buf.slice(a, b))
+            except Exception as e:
+                await self._salvage(buf, a, b, e, count)
+            else:
+                if count:
+                    self.flushed += b - a
+
+    async def _write(self, buf: SampleBatch, timed: bool = True) -> None:
+        """Flush `buf`, dropping only rows the DB rejects for good; _Interrupted on a transient error."""
+        try:
+            if timed:
+                await self._timed_flush(buf)
+            else:
+                await self._flush(buf)
+        except Exception as e:
+            await self._salvage(buf, 0, buf.size, e, count=timed)
+
+    def _spool_failed(self, buf: SampleBatch, err: Exception) -> None:
+        now = time.monotonic()
+        if now - self._last_fail_log > 5.0:
+            # first line only: SQLAlchemy appends the (huge) bound parameters
+            reason = (str(err).splitlines() or [type(err).__name__])[0]
+            logger.warning("Telemetry flush failed (%s); %s", reason,
+                           "spooling to disk" if self.spool is not None else "dropping batch")
+            self._last_fail_log = now
+        if self.spool is None:
+            self.lost += len(buf)
+            self.history.forget(buf)
+            return
+        try:
+            self.spool.append(buf)
+            self._spool_ready.set()
+        except Exception:
+            logger.exception("Telemetry spool write failed; dropping %d rows", len(buf))
+            self.lost += len(buf)
+            self.history.forget(buf)
+
     async def _run(self) -> None:
-        buf: List[Dict[str, Any]] = []
         loop = asyncio.get_running_loop()
-        deadline = loop.time() + self.flush_ms / 1000.0
+        timeout = self.flush_ms / 1000.0
+        deadline = loop.time() + timeout
+        while True:
+            items = await self.queue.get_batch(1, max(0.0, deadline - loop.time()))
+            if not items and self._batch.size and (self.queue.closed or loop.time() >= deadline):
+                # Time trigger: nothing sealed is waiting, so the partial batch is next in line
+                items = [self._swap()]
+            if items:
+                for buf in items:
+                    try:
+                        await self._write(buf)
+                    except _Interrupted as e:
+                        self._spool_failed(buf.slice(e.done, buf.size) if e.done else buf, e.err)
+                    self._recycle(buf)
+                deadline = loop.time() + timeout
+            elif self.queue.closed:
+                break
+            elif loop.time() >= deadline:
+                deadline = loop.time() + timeout
 
+    async def _supervise_replay(self) -> None:
+        """Run _replay, restarting it (after a pause) if it ever crashes."""
         while True:
-            timeout = max(0.0, deadline - loop.time())
             try:
-                item = await asyncio.wait_for(self.queue.get(), timeout=timeout)
-            except asyncio.TimeoutError:
-                item = None  # treat as time trigger
-
-            if item is None:
-                # time trigger or stop signal
-                if buf:
-                    await self._flush(buf)
-                    buf.clear()
-                if not self._running:
-                    break
-                deadline = loop.time() + self.flush_ms / 1000.0
-                continue
+                await self._replay()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Telemetry spool replay crashed; restarting it")
+                await asyncio.sleep(5.0)
 
-            buf.append(item)
-            if len(buf) >= self.flush_max:
-                await self._flush(buf)
-                buf.clear()
-                deadline = loop.time() + self.flush_ms / 1000.0
+    async def _replay(self) -> None:
+        """Feed spooled rows back to the DB, oldest first, at most `replay_rps` rows/s."""
+        backoff = 1.0
+        attempts = 0
+        flushes_seen = self.flushes
+        while True:
+            seg, rows = self.spool.peek(SPOOL_REPLAY_CHUNK)
+            if rows is None:
+                self._spool_ready.clear()
+                await self._spool_ready.wait()
+                continue
+            try:
+                await self._write(rows, timed=False)
+                done = len(rows)
+            except _Interrupted as e:
+                done = e.done
+                # Live flushes going through while this chunk keeps failing:
+                # the DB is fine, the rows aren't, whatever the error says
+                if done:
+                    attempts = 0
+                elif self.flushes > flushes_seen:
+                    attempts += 1
+                flushes_seen = self.flushes
+                if attempts >= SPOOL_REPLAY_ATTEMPTS:
+                    self._reject(rows.slice(done, rows.size), e.err)
+                    done = len(rows)
+                else:
+                    if done:
+                        self.spool.consume(seg, done)
+                    # DB still unreachable: keep the rows and probe again later
+                    await asyncio.sleep(backoff)
+                    backoff = min(30.0, backoff * 2)
+                    continue
+            backoff = 1.0
+            attempts = 0
+            self.spool.consume(seg, done)
+            await asyncio.sleep(done / self.replay_rps)
 
 # Singleton used by the app
 ingestor = TelemetryIngestor()
@@ -20,8 +20,13 @@ class Joint(ABC):
         pass
 
     @abstractmethod
-    def status(self) -> dict:
-        """Return current status (e.g., position, running)."""
+    def status(self, include_control: bool = False) -> dict:
+        """
+        Return current status (e.g., position, running). The sampler calls
+        status(include_control=False) every tick and reads position,
+        velocity, supply_v, fault, mode, torque, motor_temp and
+        controller_temp from it.
+        """
         pass
 
     @abstractmethod
@@ -0,0 +1,121 @@
+"""
+Several joints probed or commanded at once, grouped by how they talk to
+the hardware:
+
+- Moteus joints sharing a transport: one `Transport.cycle()` per step
+  (bus.cycle_status / bus.cycle_move), so all position commands leave in
+  the same cycle.
+- ODrive CANSimple joints: armed concurrently, then every joint's frames
+  are queued back to back with no await in between.
+- Anything else (USB ODrive, RemoteJoint proxies under SAMPLER_PROCESS=1):
+  its own status()/move(), all run concurrently.
+
+Groups run concurrently with each other.
+"""
+import asyncio
+import contextlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.joints.moteus.bus import cycle_move, cycle_status, transport_key
+from backend.joints.moteus.joint import MoteusJoint
+from backend.joints.odrive.can_joint import ODriveCanJoint
+
+# One joint's part of a batch: (joint, position, velocity, accel, hold, cmd_id, run_id)
+MoveItem = Tuple[Any, float, Optional[float], Optional[float], bool, str, Optional[int]]
+
+
+def group_joints(joints: Dict[str, Any]):
+    """([names per Moteus transport], ODrive CAN names, other names)."""
+    moteus: Dict[Any, List[str]] = {}
+    odrive_can: List[str] = []
+    other: List[str] = []
+    for name, j in joints.items():
+        if isinstance(j, MoteusJoint):
+            moteus.setdefault(transport_key(j), []).append(name)
+        elif isinstance(j, ODriveCanJoint):
+            odrive_can.append(name)
+        else:
+            other.append(name)
+    return list(moteus.values()), odrive_can, other
+
+
+async def probe(joints: Dict[str, Any]) -> List[str]:
+    """Names of the joints that don't answer a status query."""
+    moteus_groups, odrive_can, other = group_joints(joints)
+
+    async def moteus_probe(names: List[str]) -> List[str]:
+        try:
+            replied = await cycle_status([joints[n] for n in names])
+        except Exception:
+            return names
+        return [n for n in names if joints[n].node_id not in replied]
+
+    async def single_probe(name: str) -> List[str]:
+        try:
+            await joints[name].status()
+        except Exception:
+            return [name]
+        return []
+
+    found = await asyncio.gather(
+        *(moteus_probe(names) for names in moteus_groups),
+        *(single_probe(n) for n in odrive_can + other),
+    )
+    return [n for names in found for n in names]
+
+
+async def _moteus_move(items: Dict[str, MoveItem]) -> Dict[str, dict]:
+    start = await cycle_move([(j, p, v, a) for j, p, v, a, *_ in items.values()])
+    out = {}
+    for name, (j, p, v, a, hold, cmd_id, run_id) in items.items():
+        j.track_cmd(p, v, a, hold, cmd_id, run_id)
+        out[name] = j.move_result(p, start.get(j.node_id), v, a, cmd_id)
+    return out
+
+
+async def _odrive_can_move(items: Dict[str, MoveItem]) -> Dict[str, dict]:
+    ordered = sorted(items.items(), key=lambda kv: kv[1][0].node_id)
+    out = {}
+    async with contextlib.AsyncExitStack() as stack:
+        for _, (j, *_rest) in ordered:
+            await stack.enter_async_context(j._lock)
+        await asyncio.gather(*(j.ensure_armed() for _, (j, *_rest) in ordered))
+        start = {name: j.node.pos for name, (j, *_rest) in ordered}
+        for name, (j, p, v, a, hold, cmd_id, run_id) in ordered:
+            j.send_move(p, v, a)
+        for name, (j, p, v, a, hold, cmd_id, run_id) in ordered:
+            j.track_cmd(p, v, a, hold, cmd_id, run_id)
+            out[name] = {
+                "target_turns": p,
+                "start_turns": start[name],
+                "requested_vel": v,
+                "requested_acc": a,
+                "cmd_id": cmd_id,
+            }
+    return out
+
+
+async def _single_move(name: str, item: MoveItem) -> Dict[str, dict]:
+    j, p, v, a, hold, cmd_id, run_id = item
+    return {name: (await j.move(p, v, a, hold, cmd_id=cmd_id, run_id=run_id)) or {}}
+
+
+async def move(items: Dict[str, MoveItem]) -> Dict[str, dict]:
+    """
+    Send every move in `items` ({joint name: MoveItem}). Returns each joint's
+    move() result, or {"error": ...} for the joints of a group that failed.
+    """
+    moteus_groups, odrive_can, other = group_joints({n: it[0] for n, it in items.items()})
+    groups = [
+        *((names, _moteus_move({n: items[n] for n in names})) for names in moteus_groups),
+        *([(odrive_can, _odrive_can_move({n: items[n] for n in odrive_can}))] if odrive_can else []),
+        *(([n], _single_move(n, items[n])) for n in other),
+    ]
+    parts = await asyncio.gather(*(coro for _, coro in groups), return_exceptions=True)
+    out: Dict[str, dict] = {}
+    for (names, _), part in zip(groups, parts):
+        if isinstance(part, BaseException):
+            out.update({n: {"error": str(part) or type(part).__name__} for n in names})
+        else:
+            out.update(part)
+    return out
@@ -0,0 +1,73 @@
+import asyncio
+import contextlib
+import math
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import moteus
+
+from backend.joints.moteus.joint import MoteusJoint
+
+
+def transport_key(joint: MoteusJoint) -> Any:
+    """Joints with equal keys share one transport (and can share a cycle)."""
+    # Controllers without an injected transport share the moteus singleton
+    return id(joint._ctrl.transport) if joint._ctrl.transport else "default"
+
+
+async def cycle_status(joints: Sequence[MoteusJoint]) -> Dict[int, dict]:
+    """
+    Query every joint on one transport with a single `Transport.cycle()`.
+
+    Returns {node_id: status dict} for each controller that replied; joints
+    that stayed silent are simply missing from the result. All joint locks
+    are taken (in node order, so concurrent moves can't deadlock us) for the
+    duration of the cycle, same as the per-joint `status()` path.
+    """
+    ordered = sorted(joints, key=lambda j: j.node_id)
+    if not ordered:
+        return {}
+
+    async with contextlib.AsyncExitStack() as stack:
+        for j in ordered:
+            await stack.enter_async_context(j._lock)
+        transport = ordered[0].transport
+        results = await transport.cycle([j.make_status_query() for j in ordered])
+
+    by_id = {j.node_id: j for j in ordered}
+    out: Dict[int, dict] = {}
+    for r in results:
+        j = by_id.get(getattr(r, "id", None))
+        if j is not None:
+            out[j.node_id] = j.status_from_values(getattr(r, "values", {}))
+    return out
+
+
+async def cycle_move(
+    moves: Sequence[Tuple[MoteusJoint, float, Optional[float], Optional[float]]],
+) -> Dict[int, Optional[float]]:
+    """
+    MoteusJoint.move() for several (joint, position, velocity, accel) on one
+    transport: the same stop / 20 ms settle / recapture / position sequence,
+    but each step is a single `Transport.cycle()` for all joints, so every
+    position command goes out in the same cycle. The position commands carry
+    a query; returns {node_id: start position in turns} (None if no reply).
+    """
+    ordered = sorted(moves, key=lambda m: m[0].node_id)
+    if not ordered:
+        return {}
+
+    async with contextlib.AsyncExitStack() as stack:
+        for j, *_ in ordered:
+            await stack.enter_async_context(j._lock)
+        transport = ordered[0][0].transport
+        await transport.cycle([j.make_stop() for j, *_ in ordered])
+        await asyncio.sleep(0.02)
+        await transport.cycle([j._ctrl.make_recapture_position_velocity() for j, *_ in ordered])
+        results = await transport.cycle([j.make_move(p, v, a) for j, p, v, a in ordered])
+
+    start: Dict[int, Optional[float]] = {j.node_id: None for j, *_ in ordered}
+    for r in results:
+        pos = getattr(r, "values", {}).get(moteus.Register.POSITION)
+        if getattr(r, "id", None) in start and pos is not None:
+            start[r.id] = pos / (2 * math.pi)
+    return start
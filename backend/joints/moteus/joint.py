@@ -76,33 +76,65 @@ class MoteusJoint(Joint):
             status = await self._ctrl.query()
             start_turns = status.values[moteus.Register.POSITION] / (2 * math.pi)
 
-            vlim = velocity if velocity is not None else 1.0
-            alim = accel if accel is not None else 1.0
-            max_torque = float(os.getenv("MOTEUS_MAX_TORQUE", "3.5"))  # tune if needed
-
             # 4) Fire-and-forget position command (NO wait_complete)
-            await self._ctrl.set_position(
-                position=position,
-                velocity=0.0,                 # stop at target
-                velocity_limit=vlim,
-                accel_limit=alim,
-                maximum_torque=max_torque,
-                feedforward_torque=math.nan,
-                watchdog_timeout=0.5,
-                query=False,
-            )
-            self._running = True
-
-            # >>> include velocity/accel/run_id so sampler can mirror target_* into rows
-            self._current_cmd = {
-                "cmd_id": cmd_id,
-                "target": position,
-                "velocity": velocity,
-                "accel": accel,
-                "run_id": run_id,
-                "hold": hold,
-            }
+            await self._ctrl.set_position(**self._position_kwargs(position, velocity, accel), query=False)
+            self.track_cmd(position, velocity, accel, hold, cmd_id, run_id)
+
+        return self.move_result(position, start_turns, velocity, accel, cmd_id)
+
+    def _position_kwargs(self, position: float, velocity: float = None, accel: float = None) -> dict:
+        return dict(
+            position=position,
+            velocity=0.0,                 # stop at target
+            velocity_limit=velocity if velocity is not None else 1.0,
+            accel_limit=accel if accel is not None else 1.0,
+            maximum_torque=float(os.getenv("MOTEUS_MAX_TORQUE", "3.5")),  # tune if needed
+            feedforward_torque=math.nan,
+            watchdog_timeout=0.5,
+        )
+
+    def make_move(self, position: float, velocity: float = None, accel: float = None):
+        """Build (but don't send) move()'s position command, with a query, for a batched cycle."""
+        return self._ctrl.make_position(**self._position_kwargs(position, velocity, accel), query=True)
+
+    def make_stop(self):
+        return self._ctrl.make_stop()
+
+    def make_setpoint(self, position: float, velocity: float, watchdog: float = math.nan):
+        """
+        One streamed trajectory setpoint (turns, rev/s), with a query. No
+        velocity/accel limits, so the controller follows the stream as sent;
+        `watchdog` stops the motor if the stream stalls (NaN: hold forever).
+        """
+        return self._ctrl.make_position(
+            position=position,
+            velocity=velocity,
+            velocity_limit=math.nan,
+            accel_limit=math.nan,
+            maximum_torque=float(os.getenv("MOTEUS_MAX_TORQUE", "3.5")),
+            feedforward_torque=math.nan,
+            watchdog_timeout=watchdog,
+            query=True,
+        )
+
+    def track_cmd(self, position, velocity, accel, hold, cmd_id, run_id, trajectory=None) -> None:
+        """
+        Record the command just sent (the sampler mirrors it into target_*
+        columns). `trajectory` marks a setpoint of a streamed trajectory.
+        """
+        self._running = True
+        self._current_cmd = {
+            "cmd_id": cmd_id,
+            "target": position,
+            "velocity": velocity,
+            "accel": accel,
+            "run_id": run_id,
+            "hold": hold,
+            "trajectory": trajectory,
+        }
 
+    @staticmethod
+    def move_result(position, start_turns, velocity, accel, cmd_id) -> dict:
         return {
             "target_turns": position,
             "start_turns":  start_turns,
@@ -257,19 +289,17 @@ class MoteusJoint(Joint):
             "persisted": bool(persist),  
         }
 
-    async def status(self, include_control: bool = False) -> dict:
-        """Fast status for the hot path (WS/DB). No diagnostic reads by default."""
-        try:
-            async with self._lock:
-                st = await self._ctrl.query()
-                vals = getattr(st, "values", {})
-        except Exception as e:
-            now = time.monotonic()
-            if now - self._last_status_warn > 5.0:
-                logger.warning("Status query failed (likely offline): %s", e, exc_info=False)
-                self._last_status_warn = now
-            raise
+    @property
+    def transport(self):
+        """The moteus transport this controller talks through (singleton unless injected)."""
+        return self._ctrl._get_transport()
+
+    def make_status_query(self):
+        """Build (but don't send) the fast-path query so a bus sampler can batch it."""
+        return self._ctrl.make_query()
 
+    def status_from_values(self, vals: dict) -> dict:
+        """Convert raw register values from a query reply into the hot-path status dict."""
         # Turns / rev/s
         pos_raw = vals.get(moteus.Register.POSITION)
         vel_raw = vals.get(moteus.Register.VELOCITY)
@@ -297,7 +327,7 @@ class MoteusJoint(Joint):
             except Exception:
                 mode_text = str(mode_val)
 
-        out = {
+        return {
             "position": position,                 # turns
             "velocity": velocity,                 # rev/s
             "supply_v": voltage,                  # V
@@ -312,6 +342,21 @@ class MoteusJoint(Joint):
             "driver_fault2": int(drv2),
         }
 
+    async def status(self, include_control: bool = False) -> dict:
+        """Fast status for the hot path (WS/DB). No diagnostic reads by default."""
+        try:
+            async with self._lock:
+                st = await self._ctrl.query()
+                vals = getattr(st, "values", {})
+        except Exception as e:
+            now = time.monotonic()
+            if now - self._last_status_warn > 5.0:
+                logger.warning("Status query failed (likely offline): %s", e, exc_info=False)
+                self._last_status_warn = now
+            raise
+
+        out = self.status_from_values(vals)
+
         if not include_control:
             return out
 
@@ -1,9 +1,11 @@
 from .calibrator import ODriveCalibrator
 from .configurator import ODriveConfigurator
 from .joint import ODriveJoint
+from .can_joint import ODriveCanJoint
 
 __all__ = [
     "ODriveCalibrator",
     "ODriveConfigurator",
     "ODriveJoint",
+    "ODriveCanJoint",
 ]
\ No newline at end of file
@@ -0,0 +1,236 @@
+import asyncio
+import os
+import struct
+import time
+from typing import Optional
+
+from backend.joints.base import Joint
+from backend.joints.odrive.cansimple import (
+    AXIS_STATE_CLOSED_LOOP_CONTROL,
+    AXIS_STATE_FULL_CALIBRATION_SEQUENCE,
+    AXIS_STATE_IDLE,
+    AXIS_STATE_NAMES,
+    CLEAR_ERRORS,
+    REBOOT,
+    SET_AXIS_STATE,
+    SET_CONTROLLER_MODE,
+    SET_INPUT_POS,
+    SET_TRAJ_ACCEL_LIMITS,
+    SET_TRAJ_VEL_LIMIT,
+    CanSimpleBus,
+    NodeState,
+)
+
+# No heartbeat or encoder estimate for this long -> status() raises and the
+# sampler marks the joint offline
+ODRIVE_CAN_TIMEOUT = float(os.getenv("ODRIVE_CAN_TIMEOUT", "0.5"))
+
+CONTROL_MODE_POSITION = 3
+INPUT_MODE_PASSTHROUGH = 1
+INPUT_MODE_TRAP_TRAJ = 5
+REBOOT_ACTION_SAVE = 1
+
+_U32 = struct.Struct("<I").pack
+_U32U32 = struct.Struct("<II").pack
+_F32 = struct.Struct("<f").pack
+_F32F32 = struct.Struct("<ff").pack
+_INPUT_POS = struct.Struct("<fhh").pack
+
+
+class ODriveCanJoint(Joint):
+    """
+    ODrive joint driven over CANSimple on a shared CanSimpleBus.
+
+    Telemetry comes from the ODrive's cyclic messages (heartbeat, encoder
+    estimates, temperature, bus voltage/current, torques) which the bus
+    dispatcher writes into this node's NodeState, so status() is a read of
+    those slots with no bus round trip. Enable the optional cyclic messages
+    on the ODrive (`axis0.config.can.temperature_msg_rate_ms`,
+    `bus_voltage_msg_rate_ms`, `torques_msg_rate_ms`) for those fields;
+    they read as None otherwise.
+    """
+
+    def __init__(self, node_id: int = 0, channel: str = "can0", interface: str = "socketcan"):
+        super().__init__()
+        self.node_id = node_id
+        self.channel = channel
+        self.interface = interface
+        self._bus: Optional[CanSimpleBus] = None
+        self._node: Optional[NodeState] = None
+        self._running = False
+        self._current_cmd: Optional[dict] = None
+        self._lock = asyncio.Lock()
+
+    def initialize(self) -> None:
+        """Attach to the shared bus for this channel (opened on first use)."""
+        if self._bus is None:
+            self._bus = CanSimpleBus.get(self.channel, self.interface)
+            self._node = self._bus.register(self.node_id)
+
+    @property
+    def node(self) -> NodeState:
+        self.initialize()
+        return self._node
+
+    def _send(self, cmd: int, data: bytes = b"") -> None:
+        self.initialize()
+        self._bus.send(self.node_id, cmd, data)
+
+    def get_current_cmd(self) -> Optional[dict]:
+        return self._current_cmd
+
+    def clear_current_cmd(self) -> None:
+        self._current_cmd = None
+
+    async def status(self, include_control: bool = False) -> dict:
+        """
+        Latest cyclic telemetry for this node; raises TimeoutError if heartbeats
+        or encoder estimates stopped, so a stale position is never sampled.
+        """
+        n = self.node
+        now = time.monotonic()
+        if not n.heartbeat_ts:
+            raise TimeoutError(f"No heartbeat from ODrive node {self.node_id} yet")
+        age = now - n.heartbeat_ts
+        if age > ODRIVE_CAN_TIMEOUT:
+            raise TimeoutError(f"No heartbeat from ODrive node {self.node_id} for {age:.1f}s")
+        if n.pos is None:
+            raise TimeoutError(f"No encoder estimate from ODrive node {self.node_id} yet")
+        age = now - n.encoder_ts
+        if age > ODRIVE_CAN_TIMEOUT:
+            raise TimeoutError(f"No encoder estimate from ODrive node {self.node_id} for {age:.1f}s")
+        return {
+            "position": n.pos,                    # turns
+            "velocity": n.vel,                    # rev/s
+            "supply_v": n.bus_voltage,            # V
+            "bus_current": n.bus_current,         # A
+            "running": self._running,
+            "fault": n.axis_error,
+            "trajectory_complete": n.traj_done,
+            "mode": AXIS_STATE_NAMES.get(n.axis_state, str(n.axis_state)),
+            "torque": n.torque_estimate,          # Nm
+            "motor_temp": n.motor_temp,           # °C
+            "controller_temp": n.fet_temp,        # °C
+            "driver_fault1": 0,
+            "driver_fault2": 0,
+        }
+
+    async def _wait_state(self, done, timeout: float) -> None:
+        """Await heartbeats until `done(node)` holds (state changes are reported by heartbeat)."""
+        n = self.node
+        deadline = time.monotonic() + timeout
+        while not done(n):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"ODrive node {self.node_id} stuck in {AXIS_STATE_NAMES.get(n.axis_state, n.axis_state)}"
+                )
+            await n.next_heartbeat(remaining)
+
+    async def arm(self, timeout: float = 2.0) -> None:
+        """Enter closed-loop control and wait for the heartbeat to confirm it."""
+        self._send(SET_AXIS_STATE, _U32(AXIS_STATE_CLOSED_LOOP_CONTROL))
+        await self._wait_state(lambda n: n.axis_state == AXIS_STATE_CLOSED_LOOP_CONTROL, timeout)
+
+    async def move(
+        self,
+        position: float,
+        velocity: float = None,
+        accel: float = None,
+        hold: bool = True,
+        cmd_id: str | None = None,
+        run_id: int | None = None,
+    ) -> dict:
+        """Non-blocking move to absolute `position` (turns). The sampler will stream telemetry."""
+        async with self._lock:
+            start_turns = self.node.pos
+            await self.ensure_armed()
+            self.send_move(position, velocity, accel)
+            self.track_cmd(position, velocity, accel, hold, cmd_id, run_id)
+
+        return {
+            "target_turns": position,
+            "start_turns": start_turns,
+            "requested_vel": velocity,
+            "requested_acc": accel,
+            "cmd_id": cmd_id,
+        }
+
+    async def ensure_armed(self) -> None:
+        if self.node.axis_state != AXIS_STATE_CLOSED_LOOP_CONTROL:
+            await self.arm()
+
+    def send_move(self, position: float, velocity: float = None, accel: float = None) -> None:
+        """Queue move()'s frames (limits, mode, input pos) without waiting; caller holds the lock."""
+        if velocity is not None or accel is not None:
+            if velocity is not None:
+                self._send(SET_TRAJ_VEL_LIMIT, _F32(velocity))
+            if accel is not None:
+                self._send(SET_TRAJ_ACCEL_LIMITS, _F32F32(accel, accel))
+            input_mode = INPUT_MODE_TRAP_TRAJ
+        else:
+            input_mode = INPUT_MODE_PASSTHROUGH
+        self._send(SET_CONTROLLER_MODE, _U32U32(CONTROL_MODE_POSITION, input_mode))
+        self._send(SET_INPUT_POS, _INPUT_POS(position, 0, 0))
+
+    def begin_stream(self) -> None:
+        """Switch to passthrough input so send_setpoint() frames are followed as sent."""
+        self._send(SET_CONTROLLER_MODE, _U32U32(CONTROL_MODE_POSITION, INPUT_MODE_PASSTHROUGH))
+
+    def send_setpoint(self, position: float, velocity: float) -> None:
+        """One streamed trajectory setpoint (turns, velocity feedforward in rev/s)."""
+        vel_ff = max(-32768, min(32767, round(velocity * 1000.0)))  # 0.001 rev/s per LSB
+        self._send(SET_INPUT_POS, _INPUT_POS(position, vel_ff, 0))
+
+    def track_cmd(self, position, velocity, accel, hold, cmd_id, run_id, trajectory=None) -> None:
+        """
+        Record the command just sent (the sampler mirrors it into target_*
+        columns). `trajectory` marks a setpoint of a streamed trajectory.
+        """
+        self._running = True
+        self._current_cmd = {
+            "cmd_id": cmd_id,
+            "target": position,
+            "velocity": velocity,
+            "accel": accel,
+            "run_id": run_id,
+            "hold": hold,
+            "trajectory": trajectory,
+        }
+
+    async def stop(self) -> None:
+        """Stop movement by holding the current position (stays in closed loop)."""
+        try:
+            n = self.node
+            if n.axis_state == AXIS_STATE_CLOSED_LOOP_CONTROL and n.pos is not None:
+                self._send(SET_CONTROLLER_MODE, _U32U32(CONTROL_MODE_POSITION, INPUT_MODE_PASSTHROUGH))
+                self._send(SET_INPUT_POS, _INPUT_POS(n.pos, 0, 0))
+        finally:
+            self._running = False
+            self._current_cmd = None
+
+    async def disarm(self) -> None:
+        """Put the axis in IDLE."""
+        self._send(SET_AXIS_STATE, _U32(AXIS_STATE_IDLE))
+        self._running = False
+        self._current_cmd = None
+
+    async def calibrate(self, state: int = AXIS_STATE_FULL_CALIBRATION_SEQUENCE, save_config: bool = False,
+                        timeout: float = 60.0) -> dict:
+        """Run a calibration state and wait for the axis to return to IDLE."""
+        self._send(CLEAR_ERRORS, b"\x00")
+        self._send(SET_AXIS_STATE, _U32(state))
+        # Wait for the node to leave IDLE first, then for it to come back
+        await self._wait_state(lambda n: n.axis_state != AXIS_STATE_IDLE, 2.0)
+        await self._wait_state(lambda n: n.axis_state == AXIS_STATE_IDLE, timeout)
+        n = self.node
+        ok = n.axis_error == 0 and n.procedure_result == 0
+        if ok and save_config:
+            self._send(REBOOT, bytes([REBOOT_ACTION_SAVE]))
+        self._running = False
+        return {
+            "ok": ok,
+            "axis_error": n.axis_error,
+            "procedure_result": n.procedure_result,
+            "saved": bool(ok and save_config),
+        }
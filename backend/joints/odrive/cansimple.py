@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import can
+
+logger = logging.getLogger(__name__)
+
+# CANSimple command ids (arbitration id = node_id << 5 | cmd)
+HEARTBEAT = 0x01
+ESTOP = 0x02
+SET_AXIS_STATE = 0x07
+GET_ENCODER_ESTIMATES = 0x09
+SET_CONTROLLER_MODE = 0x0B
+SET_INPUT_POS = 0x0C
+SET_TRAJ_VEL_LIMIT = 0x11
+SET_TRAJ_ACCEL_LIMITS = 0x12
+GET_TEMPERATURE = 0x15
+REBOOT = 0x16
+GET_BUS_VOLTAGE_CURRENT = 0x17
+CLEAR_ERRORS = 0x18
+GET_TORQUES = 0x1C
+
+AXIS_STATE_IDLE = 1
+AXIS_STATE_FULL_CALIBRATION_SEQUENCE = 3
+AXIS_STATE_CLOSED_LOOP_CONTROL = 8
+
+AXIS_STATE_NAMES = {
+    0: "undefined",
+    1: "idle",
+    2: "startup_sequence",
+    3: "full_calibration_sequence",
+    4: "motor_calibration",
+    6: "encoder_index_search",
+    7: "encoder_offset_calibration",
+    8: "closed_loop_control",
+    9: "lockin_spin",
+    10: "encoder_dir_find",
+    11: "homing",
+    12: "encoder_hall_polarity_calibration",
+    13: "encoder_hall_phase_calibration",
+    14: "anticogging_calibration",
+}
+
+_HEARTBEAT = struct.Struct("<IBBB").unpack_from
+_FF = struct.Struct("<ff").unpack_from
+
+
+class NodeState:
+    """
+    Latest-value slots for one ODrive node, written by the bus dispatcher as
+    cyclic frames arrive and read directly by ODriveCanJoint.status().
+    Timestamps are time.monotonic() at dispatch.
+    """
+
+    __slots__ = (
+        "node_id",
+        "axis_error", "axis_state", "procedure_result", "traj_done", "heartbeat_ts",
+        "pos", "vel", "encoder_ts",
+        "fet_temp", "motor_temp", "temperature_ts",
+        "bus_voltage", "bus_current", "bus_ts",
+        "torque_setpoint", "torque_estimate", "torques_ts",
+        "_waiters",
+    )
+
+    def __init__(self, node_id: int) -> None:
+        self.node_id = node_id
+        self.axis_error = 0
+        self.axis_state = 0
+        self.procedure_result = 0
+        self.traj_done = 0
+        self.heartbeat_ts = 0.0
+        self.pos: Optional[float] = None
+        self.vel: Optional[float] = None
+        self.encoder_ts = 0.0
+        self.fet_temp: Optional[float] = None
+        self.motor_temp: Optional[float] = None
+        self.temperature_ts = 0.0
+        self.bus_voltage: Optional[float] = None
+        self.bus_current: Optional[float] = None
+        self.bus_ts = 0.0
+        self.torque_setpoint: Optional[float] = None
+        self.torque_estimate: Optional[float] = None
+        self.torques_ts = 0.0
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    # --- dispatch handlers (data, monotonic timestamp) ---
+
+    def on_heartbeat(self, data: bytes, now: float) -> None:
+        self.axis_error, self.axis_state, self.procedure_result, self.traj_done = _HEARTBEAT(data)
+        self.heartbeat_ts = now
+        waiters = self._waiters
+        while waiters:
+            loop, ev = waiters.pop()  # atomic, safe against the loop thread appending
+            loop.call_soon_threadsafe(ev.set)
+
+    def on_encoder(self, data: bytes, now: float) -> None:
+        self.pos, self.vel = _FF(data)
+        self.encoder_ts = now
+
+    def on_temperature(self, data: bytes, now: float) -> None:
+        fet, motor = _FF(data)
+        self.fet_temp = None if fet != fet else fet
+        self.motor_temp = None if motor != motor else motor
+        self.temperature_ts = now
+
+    def on_bus(self, data: bytes, now: float) -> None:
+        self.bus_voltage, self.bus_current = _FF(data)
+        self.bus_ts = now
+
+    def on_torques(self, data: bytes, now: float) -> None:
+        self.torque_setpoint, self.torque_estimate = _FF(data)
+        self.torques_ts = now
+
+    async def next_heartbeat(self, timeout: float) -> None:
+        """Wait for the next heartbeat frame from this node (no polling)."""
+        ev = asyncio.Event()
+        self._waiters.append((asyncio.get_running_loop(), ev))
+        await asyncio.wait_for(ev.wait(), timeout)
+
+
+class CanSimpleBus:
+    """
+    One python-can bus with a single Notifier for every ODrive node on it.
+
+    Incoming frames are routed through a dispatch table keyed by arbitration
+    id, precomputed when a node registers, straight into that node's
+    NodeState slots; frames for unknown ids cost one dict miss. Use
+    CanSimpleBus.get(channel) so all joints on a channel share one bus.
+    """
+
+    _buses: Dict[Tuple[str, str], "CanSimpleBus"] = {}
+    _buses_lock = threading.Lock()
+
+    def __init__(self, channel: str = "can0", interface: str = "socketcan", **bus_kwargs) -> None:
+        self.channel = channel
+        self.interface = interface
+        self._bus = can.Bus(channel=channel, interface=interface, **bus_kwargs)
+        self._nodes: Dict[int, NodeState] = {}
+        self._table: Dict[int, Callable[[bytes, float], None]] = {}
+        self.frames = 0
+        self.unknown = 0
+        try:
+            # Inside a loop, socketcan frames are read via add_reader: no thread, no polling
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        self._notifier = can.Notifier(self._bus, [self._dispatch], loop=loop)
+
+    @classmethod
+    def get(cls, channel: str = "can0", interface: str = "socketcan", **bus_kwargs) -> "CanSimpleBus":
+        key = (interface, channel)
+        with cls._buses_lock:
+            bus = cls._buses.get(key)
+            if bus is None:
+                bus = cls._buses[key] = cls(channel, interface, **bus_kwargs)
+            return bus
+
+    def register(self, node_id: int) -> NodeState:
+        node = self._nodes.get(node_id)
+        if node is not None:
+            return node
+        node = self._nodes[node_id] = NodeState(node_id)
+        base = node_id << 5
+        self._table.update({
+            base | HEARTBEAT: node.on_heartbeat,
+            base | GET_ENCODER_ESTIMATES: node.on_encoder,
+            base | GET_TEMPERATURE: node.on_temperature,
+            base | GET_BUS_VOLTAGE_CURRENT: node.on_bus,
+            base | GET_TORQUES: node.on_torques,
+        })
+        return node
+
+    def _dispatch(self, msg: can.Message) -> None:
+        handler = self._table.get(msg.arbitration_id)
+        if handler is None:
+            self.unknown += 1
+            return
+        self.frames += 1
+        try:
+            handler(msg.data, time.monotonic())
+        except struct.error:
+            logger.debug("Short CANSimple frame 0x%03x: %r", msg.arbitration_id, bytes(msg.data))
+
+    def send(self, node_id: int, cmd: int, data: bytes = b"", rtr: bool = False) -> None:
+        self._bus.send(can.Message(
+            arbitration_id=(node_id << 5) | cmd,
+            data=data,
+            is_extended_id=False,
+            is_remote_frame=rtr,
+        ))
+
+    def stats(self) -> dict:
+        return {"channel": self.channel, "nodes": sorted(self._nodes), "frames": self.frames, "unknown": self.unknown}
+
+    def shutdown(self) -> None:
+        self._notifier.stop()
+        self._bus.shutdown()
+        with self._buses_lock:
+            self._buses.pop((self.interface, self.channel), None)
@@ -1,85 +1,204 @@
-import asyncio  
-from typing import Optional  
-import time  
+import asyncio
+import os
+import time
 import concurrent.futures
-import odrive  
-from odrive.enums import *  
-  
-from backend.joints.base import Joint  
-  
-class ODriveJoint:    
-    def __init__(self, serial_number: str = None, axis_num: int = 0):    
-        self.serial_number = serial_number  
-        self.axis_num = axis_num  
-          
-        # Run ODrive discovery in a separate thread to avoid event loop conflict  
-        with concurrent.futures.ThreadPoolExecutor() as executor:  
-            future = executor.submit(self._find_odrive_sync)  
-            self.odrive = future.result(timeout=30)  # 30 second timeout  
-          
-        self.axis = getattr(self.odrive, f'axis{self.axis_num}')  
-        self.arm()  
-      
-    def _find_odrive_sync(self):  
-        import odrive  
-        return odrive.find_any(serial_number=self.serial_number)
-        
-    def move(self, position: float, velocity: float = None, accel: float = None):    
-        # Check if motor is armed, arm if needed    
-        if self.axis.current_state != AXIS_STATE_CLOSED_LOOP_CONTROL:    
-            self.arm()    
-            
-        # Configure trajectory if velocity/accel specified    
-        if velocity is not None or accel is not None:    
-            self._setup_trajectory_mode(velocity, accel)    
-            self.axis.controller.config.input_mode = INPUT_MODE_TRAP_TRAJ    
-        else:    
-            self.axis.controller.config.input_mode = INPUT_MODE_PASSTHROUGH    
-            
-        # Execute move    
-        self.axis.controller.input_pos = position    
-  
-    def _setup_trajectory_mode(self, velocity: float = None, accel: float = None):  
-        """Configure trajectory parameters for smooth motion."""  
-        if velocity is not None:  
-            self.axis.trap_traj.config.vel_limit = velocity  
-        if accel is not None:  
-            self.axis.trap_traj.config.accel_limit = accel  
-            self.axis.trap_traj.config.decel_limit = accel  
-  
-    def _is_calibrated(self) -> bool:  
-        """Check if the axis is calibrated."""  
-        # This is a simplified check - you may want to add more comprehensive validation  
-        return (self.axis.motor.is_calibrated and   
-                self.axis.encoder.is_ready)  
-        
-    def arm(self):    
-        # Run calibration if needed    
-        if not self._is_calibrated():    
-            self.axis.requested_state = AXIS_STATE_FULL_CALIBRATION_SEQUENCE    
-            while self.axis.current_state != AXIS_STATE_IDLE:    
-                time.sleep(0.1)    
-            
-        # Enter closed loop control    
-        self.axis.requested_state = AXIS_STATE_CLOSED_LOOP_CONTROL  
-  
-    def disarm(self):  
-        """Disarm the axis."""  
-        self.axis.requested_state = AXIS_STATE_IDLE  
-  
-    def calibrate(self) -> None:  
-        """Calibrate the axis."""  
-        self.axis.requested_state = AXIS_STATE_FULL_CALIBRATION_SEQUENCE  
-        while self.axis.current_state != AXIS_STATE_IDLE:  
-            time.sleep(0.1)  
-  
-    async def status(self) -> dict:  
-        """Get the status of the axis."""  
-        return {  
-            "position": self.axis.encoder.pos_estimate,  
-            "velocity": self.axis.encoder.vel_estimate,  
-            "current": self.axis.motor.current_control.Iq_measured,  
-            "temperature": self.axis.motor.temperature,  
-            "state": self.axis.current_state,  
-            "errors": self.axis.error  
-        }
\ No newline at end of file
+from typing import Any, Callable, Optional
+
+from odrive.enums import *
+
+from backend.joints.base import Joint
+from backend.joints.odrive.cansimple import AXIS_STATE_NAMES
+
+# status() results younger than this are shared instead of re-read over USB
+ODRIVE_STATUS_TTL = float(os.getenv("ODRIVE_STATUS_TTL", "0.005"))
+
+
+class ODriveJoint(Joint):
+    """
+    ODrive axis over USB (odrive/fibre). Every property access is a blocking
+    USB transfer, so all of them go through one worker thread per device;
+    the event loop only awaits the results.
+    """
+
+    def __init__(self, serial_number: str = None, axis_num: int = 0, odrv: Any = None):
+        super().__init__()
+        self.serial_number = serial_number
+        self.axis_num = axis_num
+
+        # One thread per device keeps USB access serialized and off the event loop
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"odrive-{serial_number or axis_num}",
+        )
+        # Discovery runs on the device thread; the first awaited call waits for it
+        if odrv is not None:
+            self._found = concurrent.futures.Future()
+            self._found.set_result(odrv)
+        else:
+            self._found = self._executor.submit(self._find_odrive_sync)
+        self.odrive = None
+        self.axis = None
+
+        self._status: Optional[dict] = None
+        self._status_time = 0.0
+        self._status_inflight: Optional[asyncio.Future] = None
+        self._current_cmd: Optional[dict] = None
+
+    def initialize(self) -> None:
+        """Nothing to open: discovery already runs on the device thread."""
+
+    def _find_odrive_sync(self):
+        import odrive
+        return odrive.find_any(serial_number=self.serial_number, timeout=30)
+
+    async def _device(self):
+        if self.axis is None:
+            self.odrive = await asyncio.wrap_future(self._found)
+            self.axis = getattr(self.odrive, f'axis{self.axis_num}')
+        return self.axis
+
+    async def _call(self, fn: Callable, *args):
+        """Run a blocking USB function on this device's thread."""
+        await self._device()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def get_current_cmd(self) -> Optional[dict]:
+        return self._current_cmd
+
+    def clear_current_cmd(self) -> None:
+        self._current_cmd = None
+
+    async def move(
+        self,
+        position: float,
+        velocity: float = None,
+        accel: float = None,
+        hold: bool = True,
+        cmd_id: str | None = None,
+        run_id: int | None = None,
+    ) -> dict:
+        # Arm first if needed (awaits calibration/closed loop without blocking the loop)
+        if await self._call(lambda: self.axis.current_state) != AXIS_STATE_CLOSED_LOOP_CONTROL:
+            await self.arm()
+        await self._call(self._move_sync, position, velocity, accel)
+        self._current_cmd = {
+            "cmd_id": cmd_id,
+            "target": position,
+            "velocity": velocity,
+            "accel": accel,
+            "run_id": run_id,
+            "hold": hold,
+        }
+        return {"target_turns": position, "requested_vel": velocity, "requested_acc": accel, "cmd_id": cmd_id}
+
+    def _move_sync(self, position: float, velocity: float = None, accel: float = None):
+        # Configure trajectory if velocity/accel specified
+        if velocity is not None or accel is not None:
+            self._setup_trajectory_mode(velocity, accel)
+            self.axis.controller.config.input_mode = INPUT_MODE_TRAP_TRAJ
+        else:
+            self.axis.controller.config.input_mode = INPUT_MODE_PASSTHROUGH
+
+        # Execute move
+        self.axis.controller.input_pos = position
+
+    def _setup_trajectory_mode(self, velocity: float = None, accel: float = None):
+        """Configure trajectory parameters for smooth motion."""
+        if velocity is not None:
+            self.axis.trap_traj.config.vel_limit = velocity
+        if accel is not None:
+            self.axis.trap_traj.config.accel_limit = accel
+            self.axis.trap_traj.config.decel_limit = accel
+
+    def _is_calibrated(self) -> bool:
+        """Check if the axis is calibrated."""
+        # This is a simplified check - you may want to add more comprehensive validation
+        return (self.axis.motor.is_calibrated and
+                self.axis.encoder.is_ready)
+
+    def _request_state(self, state: int) -> None:
+        self.axis.requested_state = state
+
+    async def _wait_state(self, state: int, timeout: float, interval: float = 0.1) -> None:
+        """Await until the axis reports `state`; the loop stays free between reads."""
+        deadline = time.monotonic() + timeout
+        while await self._call(lambda: self.axis.current_state) != state:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"ODrive axis{self.axis_num} did not reach state {state} in {timeout:.0f}s")
+            await asyncio.sleep(interval)
+
+    async def arm(self, timeout: float = 60.0) -> None:
+        # Run calibration if needed
+        if not await self._call(self._is_calibrated):
+            await self.calibrate(timeout=timeout)
+
+        # Enter closed loop control
+        await self._call(self._request_state, AXIS_STATE_CLOSED_LOOP_CONTROL)
+
+    async def stop(self) -> None:
+        """Hold the current position."""
+        def _hold():
+            self.axis.controller.config.input_mode = INPUT_MODE_PASSTHROUGH
+            self.axis.controller.input_pos = self.axis.encoder.pos_estimate
+        try:
+            await self._call(_hold)
+        finally:
+            self._current_cmd = None
+
+    async def disarm(self) -> None:
+        """Disarm the axis."""
+        await self._call(self._request_state, AXIS_STATE_IDLE)
+        self._current_cmd = None
+
+    async def calibrate(
+        self,
+        state: int = AXIS_STATE_FULL_CALIBRATION_SEQUENCE,
+        save_config: bool = False,
+        timeout: float = 60.0,
+    ) -> dict:
+        """Calibrate the axis."""
+        await self._call(self._request_state, state)
+        await asyncio.sleep(0.1)  # let it leave IDLE before waiting for it to come back
+        await self._wait_state(AXIS_STATE_IDLE, timeout)
+        error = await self._call(lambda: self.axis.error)
+        if save_config and not error:
+            await self._call(self.odrive.save_configuration)
+        return {"ok": not error, "axis_error": error, "saved": bool(save_config and not error)}
+
+    def _read_status_sync(self) -> dict:
+        # Same keys as the other joints' status(), so the sampler can ingest it
+        axis = self.axis
+        state = axis.current_state
+        iq = axis.motor.current_control.Iq_measured
+        return {
+            "position": axis.encoder.pos_estimate,               # turns
+            "velocity": axis.encoder.vel_estimate,               # rev/s
+            "supply_v": self.odrive.vbus_voltage,                # V
+            "current": iq,                                       # A
+            "running": self._current_cmd is not None,
+            "fault": int(axis.error),
+            "mode": AXIS_STATE_NAMES.get(state, str(state)),
+            "torque": iq * axis.motor.config.torque_constant,    # Nm
+            "motor_temp": axis.motor.temperature,                # °C
+            "controller_temp": None,
+            "driver_fault1": 0,
+            "driver_fault2": 0,
+        }
+
+    async def status(self, include_control: bool = False) -> dict:
+        """
+        Get the status of the axis. Concurrent callers share one in-flight
+        USB read, and a result younger than ODRIVE_STATUS_TTL is reused.
+        """
+        if self._status is not None and time.monotonic() - self._status_time < ODRIVE_STATUS_TTL:
+            return dict(self._status)
+        if self._status_inflight is None:
+            self._status_inflight = asyncio.ensure_future(self._refresh_status())
+        return dict(await asyncio.shield(self._status_inflight))
+
+    async def _refresh_status(self) -> dict:
+        try:
+            st = await self._call(self._read_status_sync)
+            self._status, self._status_time = st, time.monotonic()
+            return st
+        finally:
+            self._status_inflight = None
@@ -1,11 +1,14 @@
 import asyncio
+import inspect
 import random
-from datetime import datetime, timezone
-from typing import Any, Optional, Dict, Tuple
+import time
+from typing import Any, Optional, Dict, List, Tuple
 
-from backend.util.json_fast import fast_dumps
-from backend.api.ws_manager import manager
+from backend.api.ws_manager import WS_DEFAULT_HZ, manager
 from backend.api.faults import explain_fault
+from backend.ingest.columnar import us_to_ts
+from backend.util.metrics import period_buckets, registry
+from backend.util.scheduler import SKIP, PeriodicScheduler
 
 _last_by_joint: Dict[str, dict] = {}
 _prev_kin: Dict[str, Tuple[float, float]] = {}
@@ -16,71 +19,240 @@ def get_last_snapshot(joint_name: str) -> Optional[dict]:
     return _last_by_joint.get(joint_name)
 
 
-async def run_joint_sampler(
-    joint_name: str,
-    joint_obj: Any,
-    ingestor: Any,
-    hz: int = 100,
-    eps_pos: float = 0.005,
-    eps_vel: float = 0.01,
-    settle_ticks: int = 3,
-    ws_hz: int = 30,
-):
-    period = 1.0 / max(1, hz)
-    ws_period = 1.0 / max(1, ws_hz)
+class TickStats:
+    """
+    Per-tick numbers for one sampler loop (seconds in, ms out): running
+    latency figures plus fixed-bucket histograms of query latency and tick
+    period and a missed-deadline counter, all exported at /metrics.
+    """
 
-    ok_count = 0
-    offline = False
-    backoff = 0.5
-    backoff_max = 5.0
+    def __init__(self, name: str, mode: str, joints: int, hz: int):
+        self.name = name
+        self.mode = mode
+        self.joints = joints
+        self.hz = hz
+        self.ticks = 0
+        self.last = 0.0
+        self.ewma = 0.0
+        self.max = 0.0
+        self.total = 0.0
+        self._last_start: Optional[float] = None
+        self.latency_hist = registry.histogram(
+            "sampler_query_latency_seconds", "Status query (or bus cycle) latency per tick", sampler=name,
+        )
+        self.period_hist = registry.histogram(
+            "sampler_tick_period_seconds", "Time between the starts of consecutive ticks",
+            buckets=period_buckets(1.0 / max(1, hz)), sampler=name,
+        )
+        self.missed = registry.counter(
+            "sampler_missed_deadlines_total", "Ticks that could not start at their deadline", sampler=name,
+        )
 
-    loop = asyncio.get_running_loop()
-    next_ws_time = loop.time()
-    last_ws_task: Optional[asyncio.Task] = None
+    def observe(self, latency: float) -> None:
+        self.ticks += 1
+        self.last = latency
+        self.total += latency
+        self.ewma = latency if self.ticks == 1 else (0.95 * self.ewma + 0.05 * latency)
+        if latency > self.max:
+            self.max = latency
+        self.latency_hist.observe(latency)
 
-    async def _send_ws(joint: str, payload: dict) -> None:
-        try:
-            await manager.broadcast(joint, fast_dumps(payload))
-        except Exception:
-            pass
+    def tick(self, start: float) -> None:
+        """Mark the start of a tick (loop.time())."""
+        if self._last_start is not None:
+            self.period_hist.observe(start - self._last_start)
+        self._last_start = start
 
-    while True:
-        t0 = loop.time()
-        try:
-            st = await joint_obj.status(include_control=False)
+    def gap(self) -> None:
+        """The loop is backing off; don't count the pause as a tick period."""
+        self._last_start = None
+
+    def as_dict(self) -> dict:
+        def ms(v: Optional[float]) -> Optional[float]:
+            return None if v is None else v * 1000.0
+
+        return {
+            "mode": self.mode,
+            "joints": self.joints,
+            "hz": self.hz,
+            "ticks": self.ticks,
+            "missed": self.missed.value,
+            "last_ms": self.last * 1000.0,
+            "ewma_ms": self.ewma * 1000.0,
+            "avg_ms": (self.total / self.ticks * 1000.0) if self.ticks else 0.0,
+            "max_ms": self.max * 1000.0,
+            "latency_p99_ms": ms(self.latency_hist.quantile(0.99)),
+            "period_p50_ms": ms(self.period_hist.quantile(0.5)),
+            "period_p99_ms": ms(self.period_hist.quantile(0.99)),
+        }
+
+
+_tick_stats: Dict[str, TickStats] = {}
+# Stats reported by a separate sampler process (SAMPLER_PROCESS=1)
+_remote_stats: Dict[str, dict] = {}
+
+
+def get_sampler_stats() -> Dict[str, dict]:
+    out = {name: s.as_dict() for name, s in _tick_stats.items()}
+    out.update(_remote_stats)
+    return out
+
+
+def check_joint(name: str, joint_obj: Any) -> None:
+    """
+    Fail at startup, rather than as a joint that is offline on every tick,
+    if `joint_obj` can't be sampled.
+    """
+    try:
+        inspect.signature(joint_obj.status).bind(include_control=False)
+    except (AttributeError, TypeError):
+        raise TypeError(
+            f"Joint {name!r} ({type(joint_obj).__name__}) needs status(include_control=False) to be sampled"
+        ) from None
+
+
+def plan_samplers(joints: Dict[str, Any], mode: str = "joint", stagger: bool = True) -> List[Tuple[str, str, Any, float]]:
+    """
+    Decide which sampler tasks to run: a list of (kind, name, target, phase).
+    kind "bus" samples a {joint name: MoteusJoint} group with one
+    Transport.cycle() per tick (SAMPLER_MODE=bus groups Moteus joints by
+    transport); kind "joint" samples a single joint. With `stagger`, phases
+    are spread evenly over one period so the tasks don't all hit the bus
+    (and the event loop) at the same instant.
+    """
+    from backend.joints.moteus.bus import transport_key
+    from backend.joints.moteus.joint import MoteusJoint
+
+    for name, joint_obj in joints.items():
+        check_joint(name, joint_obj)
+
+    per_joint = dict(joints)
+    buses: Dict[Any, Dict[str, Any]] = {}
+    if mode == "bus":
+        for name, joint_obj in joints.items():
+            if isinstance(joint_obj, MoteusJoint):
+                buses.setdefault(transport_key(joint_obj), {})[name] = per_joint.pop(name)
+
+    plan: List[Tuple[str, str, Any, float]] = [
+        ("bus", f"moteus{i}", members, 0.0) for i, members in enumerate(buses.values())
+    ]
+    plan += [("joint", name, joint_obj, 0.0) for name, joint_obj in per_joint.items()]
+    if stagger:
+        plan = [(kind, name, target, i / len(plan)) for i, (kind, name, target, _) in enumerate(plan)]
+    return plan
+
+
+async def _send_ws(joint: str, payload: dict) -> None:
+    try:
+        await manager.broadcast(joint, payload)
+    except Exception:
+        pass
+
+
+class _Backoff:
+    """Jittered exponential backoff used while a joint (or whole bus) is offline."""
+
+    def __init__(self, start: float = 0.5, maximum: float = 5.0):
+        self.start = start
+        self.maximum = maximum
+        self.current = start
+
+    def reset(self) -> None:
+        self.current = self.start
+
+    def next(self) -> float:
+        jitter = random.uniform(-0.05, 0.05) * self.current
+        delay = max(0.25, min(self.maximum, self.current + jitter))
+        self.current = min(self.maximum, self.current * 1.5)
+        return delay
+
+
+class _JointState:
+    """
+    Everything a sampler does with one status reading: row building, ingest,
+    WS throttling, fault edges and done detection. Shared by the per-joint
+    and the bus-level sampler so both feed the same row/WS pipeline.
+    """
+
+    def __init__(
+        self,
+        joint_name: str,
+        joint_obj: Any,
+        ingestor: Any,
+        eps_pos: float,
+        eps_vel: float,
+        settle_ticks: int,
+        ws_hz: float,
+    ):
+        self.joint_name = joint_name
+        self.joint_obj = joint_obj
+        self.ingestor = ingestor
+        self.eps_pos = eps_pos
+        self.eps_vel = eps_vel
+        self.settle_ticks = settle_ticks
+        self.ws_hz = max(1, ws_hz)
+
+        self.ok_count = 0
+        self.offline = False
+        self.backoff = _Backoff()
+
+        self.loop = asyncio.get_running_loop()
+        self.next_ws_time = self.loop.time()
+
+    async def on_status(self, st: dict, ts_us: Optional[int] = None, mono: Optional[float] = None) -> None:
+        """`ts_us`/`mono` default to now; a sampler process passes its read times."""
+        joint_name = self.joint_name
+        joint_obj = self.joint_obj
+
+        if self.offline:
+            self.offline = False
+            self.backoff.reset()
+            _prev_kin.pop(joint_name, None)
+            await _send_ws(joint_name, {"type": "status", "joint_id": joint_name, "online": True})
+
+        drv1 = int(st.get("driver_fault1") or 0)
+        drv2 = int(st.get("driver_fault2") or 0)
+        error_flags = (drv1 & 0xFFFF) | ((drv2 & 0xFFFF) << 16)
+
+        now_mono = self.loop.time() if mono is None else mono
+        vel = st.get("velocity")
+        accel = None
+        if vel is not None:
+            prev = _prev_kin.get(joint_name)
+            if prev is not None:
+                prev_vel, prev_t = prev
+                dt = max(1e-6, now_mono - prev_t)
+                accel = (vel - prev_vel) / dt
+            _prev_kin[joint_name] = (vel, now_mono)
+
+        if ts_us is None:
+            ts_us = time.time_ns() // 1000
+        fault_code = int(st.get("fault") or 0)
+        position = st.get("position")
+
+        # >>> Pull current command so we can mirror targets into each row
+        current = joint_obj.get_current_cmd() if hasattr(joint_obj, "get_current_cmd") else None
+        run_id = current.get("run_id") if current else None
+        target_position = current.get("target") if current else None
+        target_velocity = current.get("velocity") if current else None
+        target_accel = current.get("accel") if current else None
 
-            if offline:
-                offline = False
-                backoff = 0.5
-                _prev_kin.pop(joint_name, None)
-                await _send_ws(joint_name, {"type": "status", "joint_id": joint_name, "online": True})
-
-            drv1 = int(st.get("driver_fault1") or 0)
-            drv2 = int(st.get("driver_fault2") or 0)
-            error_flags = (drv1 & 0xFFFF) | ((drv2 & 0xFFFF) << 16)
-
-            now_mono = loop.time()
-            vel = st.get("velocity")
-            accel = None
-            if vel is not None:
-                prev = _prev_kin.get(joint_name)
-                if prev is not None:
-                    prev_vel, prev_t = prev
-                    dt = max(1e-6, now_mono - prev_t)
-                    accel = (vel - prev_vel) / dt
-                _prev_kin[joint_name] = (vel, now_mono)
-
-            now = datetime.now(timezone.utc)
-            fault_code = int(st.get("fault") or 0)
-
-            # >>> Pull current command so we can mirror targets into each row
-            current = joint_obj.get_current_cmd() if hasattr(joint_obj, "get_current_cmd") else None
-
-            row = {
-                "ts": now,
+        # Written in place into the ingestor's columnar batch (no per-row dict)
+        await self.ingestor.append(
+            ts_us, joint_name, run_id,
+            position, vel, accel,
+            st.get("torque"), st.get("supply_v"), st.get("motor_temp"), st.get("controller_temp"),
+            st.get("mode"), fault_code, error_flags,
+            target_position, target_velocity, target_accel, None,
+        )
+
+        if now_mono >= self.next_ws_time:
+            ws_msg = {
+                "type": "telemetry",
+                "ts": us_to_ts(ts_us).isoformat(),
                 "joint_id": joint_name,
-                "run_id": (current.get("run_id") if current else None),
-                "position": st.get("position"),
+                "run_id": run_id,
+                "position": position,
                 "velocity": vel,
                 "accel": accel,
                 "torque": st.get("torque"),
@@ -90,73 +262,160 @@ async def run_joint_sampler(
                 "mode": st.get("mode"),
                 "fault_code": fault_code,
                 "error_flags": error_flags,
-
-                # >>> Fill target_* while a command is active
-                "target_position": (current.get("target") if current else None),
-                "target_velocity": (current.get("velocity") if current else None),
-                "target_accel":    (current.get("accel") if current else None),
-                "target_torque":   None,
+                "target_position": target_position,
+                "target_velocity": target_velocity,
+                "target_accel": target_accel,
+                "target_torque": None,
             }
+            _last_by_joint[joint_name] = ws_msg
 
-            await ingestor.enqueue(row)
-
-            if now_mono >= next_ws_time:
-                ws_msg = {"type": "telemetry", **row, "ts": now.isoformat()}
-                _last_by_joint[joint_name] = ws_msg
+            # broadcast() only encodes once and enqueues, so no task per message
+            await _send_ws(joint_name, ws_msg)
 
-                if last_ws_task is None or last_ws_task.done():
-                    last_ws_task = asyncio.create_task(_send_ws(joint_name, ws_msg))
+            # Publish as fast as the fastest subscriber asked for; slower ones
+            # are decimated per subscriber in the ConnectionManager
+            self.next_ws_time = now_mono + 1.0 / manager.max_rate(joint_name, self.ws_hz)
 
-                next_ws_time = now_mono + ws_period
+        last_fault = _last_fault_code.get(joint_name, 0)
+        if fault_code != last_fault:
+            _last_fault_code[joint_name] = fault_code
+            if fault_code:
+                msg = explain_fault(fault_code)
+                await _send_ws(joint_name, {
+                    "type": "fault",
+                    "joint_id": joint_name,
+                    "fault_code": fault_code,
+                    "error_flags": error_flags,
+                    "message": msg,
+                })
 
-            last_fault = _last_fault_code.get(joint_name, 0)
-            if fault_code != last_fault:
-                _last_fault_code[joint_name] = fault_code
-                if fault_code:
-                    msg = explain_fault(fault_code, drv1=drv1, drv2=drv2)
-                    asyncio.create_task(_send_ws(joint_name, {
-                        "type": "fault",
+        # Done detection (not while a trajectory is streaming setpoints)
+        if current and not current.get("trajectory") and position is not None and vel is not None:
+            pos_err = abs(position - current["target"])
+            vel_mag = abs(vel)
+            if pos_err < self.eps_pos and vel_mag < self.eps_vel:
+                self.ok_count += 1
+                if self.ok_count >= self.settle_ticks:
+                    await _send_ws(joint_name, {
+                        "type": "cmd_done",
                         "joint_id": joint_name,
-                        "fault_code": fault_code,
-                        "error_flags": error_flags,
-                        "message": msg,
-                    }))
-
-            # Done detection
-            if current and row["position"] is not None and vel is not None:
-                pos_err = abs(row["position"] - current["target"])
-                vel_mag = abs(vel)
-                if pos_err < eps_pos and vel_mag < eps_vel:
-                    ok_count += 1
-                    if ok_count >= settle_ticks:
-                        asyncio.create_task(_send_ws(joint_name, {
-                            "type": "cmd_done",
-                            "joint_id": joint_name,
-                            "cmd_id": current.get("cmd_id"),
-                            "ok": True,
-                        }))
-                        joint_obj.clear_current_cmd()
-                        ok_count = 0
-                else:
-                    ok_count = 0
-
-            dt = loop.time() - t0
-            await asyncio.sleep(max(0.0, period - dt))
+                        "cmd_id": current.get("cmd_id"),
+                        "ok": True,
+                    })
+                    joint_obj.clear_current_cmd()
+                    self.ok_count = 0
+            else:
+                self.ok_count = 0
+
+    async def on_error(self, e: Exception) -> None:
+        if not self.offline:
+            self.offline = True
+            self.ok_count = 0
+            _prev_kin.pop(self.joint_name, None)
+            await _send_ws(self.joint_name, {
+                "type": "status",
+                "joint_id": self.joint_name,
+                "online": False,
+                "reason": str(e),
+            })
+
+
+async def run_joint_sampler(
+    joint_name: str,
+    joint_obj: Any,
+    ingestor: Any,
+    hz: int = 100,
+    eps_pos: float = 0.005,
+    eps_vel: float = 0.01,
+    settle_ticks: int = 3,
+    ws_hz: float = WS_DEFAULT_HZ,
+    phase: float = 0.0,
+    overrun: str = SKIP,
+):
+    """
+    Poll one joint at `hz` on absolute deadlines. `phase` (0..1 of a period)
+    offsets this sampler's ticks from others; `overrun` is the scheduler's
+    policy for ticks that can't start on time ("skip" or "catchup").
+    """
+    loop = asyncio.get_running_loop()
+    state = _JointState(joint_name, joint_obj, ingestor, eps_pos, eps_vel, settle_ticks, ws_hz)
+    stats = _tick_stats[joint_name] = TickStats(joint_name, "joint", 1, hz)
+    sched = PeriodicScheduler(1.0 / max(1, hz), overrun, phase, missed=stats.missed)
+
+    while True:
+        try:
+            await sched.wait()
+            t0 = loop.time()
+            stats.tick(t0)
+            st = await joint_obj.status(include_control=False)
+            stats.observe(loop.time() - t0)
+            await state.on_status(st)
 
         except asyncio.CancelledError:
             break
 
         except Exception as e:
-            if not offline:
-                offline = True
-                ok_count = 0
-                _prev_kin.pop(joint_name, None)
-                await _send_ws(joint_name, {
-                    "type": "status",
-                    "joint_id": joint_name,
-                    "online": False,
-                    "reason": str(e),
-                })
-            jitter = random.uniform(-0.05, 0.05) * backoff
-            await asyncio.sleep(max(0.25, min(backoff_max, backoff + jitter)))
-            backoff = min(backoff_max, backoff * 1.5)
\ No newline at end of file
+            await state.on_error(e)
+            stats.gap()
+            sched.reset()
+            await asyncio.sleep(state.backoff.next())
+
+
+async def run_bus_sampler(
+    bus_name: str,
+    members: Dict[str, Any],
+    ingestor: Any,
+    hz: int = 100,
+    eps_pos: float = 0.005,
+    eps_vel: float = 0.01,
+    settle_ticks: int = 3,
+    ws_hz: float = WS_DEFAULT_HZ,
+    phase: float = 0.0,
+    overrun: str = SKIP,
+):
+    """
+    Sample every Moteus joint sharing one transport with a single
+    `Transport.cycle()` per tick, then fan the replies out to the same
+    per-joint row/WS handling as `run_joint_sampler`.
+    """
+    from backend.joints.moteus.bus import cycle_status
+
+    loop = asyncio.get_running_loop()
+    states = {
+        name: _JointState(name, j, ingestor, eps_pos, eps_vel, settle_ticks, ws_hz)
+        for name, j in members.items()
+    }
+    joint_list = list(members.values())
+    stats = _tick_stats[f"bus:{bus_name}"] = TickStats(f"bus:{bus_name}", "bus", len(members), hz)
+    backoff = _Backoff()
+    sched = PeriodicScheduler(1.0 / max(1, hz), overrun, phase, missed=stats.missed)
+
+    while True:
+        try:
+            await sched.wait()
+            t0 = loop.time()
+            stats.tick(t0)
+            statuses = await cycle_status(joint_list)
+            stats.observe(loop.time() - t0)
+            backoff.reset()
+
+            for name, j in members.items():
+                state = states[name]
+                st = statuses.get(j.node_id)
+                try:
+                    if st is None:
+                        raise TimeoutError(f"no reply from node {j.node_id}")
+                    await state.on_status(st)
+                except Exception as e:
+                    await state.on_error(e)
+
+        except asyncio.CancelledError:
+            break
+
+        except Exception as e:
+            # Whole transport failed: every joint on it is offline
+            for state in states.values():
+                await state.on_error(e)
+            stats.gap()
+            sched.reset()
+            await asyncio.sleep(backoff.next())
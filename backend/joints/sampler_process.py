@@ -0,0 +1,610 @@
+"""
+Hardware sampling in a dedicated process (SAMPLER_PROCESS=1).
+
+The child process owns the joints (and so the CAN/serial transports) and
+runs nothing but the tick loops, at raised priority. Each status reading
+is packed into a fixed-size record and written to a shared-memory ring;
+the API process drains that ring and feeds the same _JointState pipeline
+(ingest, WS, fault edges, done detection) as the in-process samplers, so a
+slow query or a burst of WS clients on the web loop no longer moves the
+hardware ticks.
+
+Commands (move/stop/calibrate/...) go the other way over a second ring
+and their results come back over a third; RemoteJoint proxies replace the
+registry entries so the routers don't change. Each ring has one producer
+and one consumer, and a pipe byte is only used as a doorbell to wake the
+reader's event loop.
+"""
+import asyncio
+import itertools
+import logging
+import math
+import multiprocessing as mp
+import os
+import pickle
+import struct
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.joints.base import Joint
+from backend.util.scheduler import SKIP, PeriodicScheduler
+from backend.util.shm_ring import ShmRing
+
+logger = logging.getLogger(__name__)
+
+SAMPLER_PROCESS = os.getenv("SAMPLER_PROCESS", "0").lower() in ("1", "true", "yes")
+# Applied to the sampler process if permitted (negative values need CAP_SYS_NICE)
+SAMPLER_PROCESS_NICE = int(os.getenv("SAMPLER_PROCESS_NICE", "-10"))
+# SCHED_FIFO priority for the sampler process; 0 leaves the default scheduler
+SAMPLER_PROCESS_RT_PRIO = int(os.getenv("SAMPLER_PROCESS_RT_PRIO", "0"))
+
+SAMPLE_RING_BYTES = 1 << 20  # ~10k samples, >0.8 s of 12 joints at 1 kHz
+COMMAND_RING_BYTES = 1 << 18
+
+# joint index, flags, ts_us, monotonic read time, 6 floats, fault, driver faults;
+# followed by the mode text (or the error message when F_ERROR is set)
+_SAMPLE = struct.Struct("<HB5xqd6dqII")
+_FLOATS = ("position", "velocity", "torque", "supply_v", "motor_temp", "controller_temp")
+F_ERROR = 1
+F_RUNNING = 2
+F_TRAJ_DONE = 4
+F_MODE = 8
+
+_SHUTDOWN = "__shutdown__"
+_STATS = "__stats__"
+
+
+def _f(v) -> float:
+    return math.nan if v is None else float(v)
+
+
+def _opt(v: float) -> Optional[float]:
+    return None if v != v else v
+
+
+def encode_sample(idx: int, st: dict, ts_us: int, mono: float) -> bytes:
+    mode = st.get("mode")
+    flags = (
+        (F_RUNNING if st.get("running") else 0)
+        | (F_TRAJ_DONE if st.get("trajectory_complete") else 0)
+        | (F_MODE if mode is not None else 0)
+    )
+    return _SAMPLE.pack(
+        idx, flags, ts_us, mono,
+        *[_f(st.get(k)) for k in _FLOATS],
+        int(st.get("fault") or 0),
+        int(st.get("driver_fault1") or 0) & 0xFFFFFFFF,
+        int(st.get("driver_fault2") or 0) & 0xFFFFFFFF,
+    ) + (b"" if mode is None else str(mode).encode("utf-8"))
+
+
+def encode_error(idx: int, error: BaseException, ts_us: int, mono: float) -> bytes:
+    return _SAMPLE.pack(idx, F_ERROR, ts_us, mono, *([math.nan] * 6), 0, 0, 0) + str(error).encode("utf-8")
+
+
+def decode_sample(rec: bytes) -> Tuple[int, int, float, Optional[dict], Optional[str]]:
+    """(joint index, ts_us, mono, status dict or None, error message or None)"""
+    idx, flags, ts_us, mono, p, v, tq, sv, mt, ct, fault, d1, d2 = _SAMPLE.unpack_from(rec)
+    tail = rec[_SAMPLE.size:].decode("utf-8")
+    if flags & F_ERROR:
+        return idx, ts_us, mono, None, tail
+    return idx, ts_us, mono, {
+        "position": _opt(p),
+        "velocity": _opt(v),
+        "supply_v": _opt(sv),
+        "running": bool(flags & F_RUNNING),
+        "fault": fault,
+        "trajectory_complete": int(bool(flags & F_TRAJ_DONE)),
+        "mode": tail if flags & F_MODE else None,
+        "torque": _opt(tq),
+        "motor_temp": _opt(mt),
+        "controller_temp": _opt(ct),
+        "driver_fault1": d1,
+        "driver_fault2": d2,
+    }, None
+
+
+def _ring_bell(fd: int) -> None:
+    try:
+        os.write(fd, b"\0")
+    except BlockingIOError:
+        pass  # pipe already full of wake-ups; the reader will drain everything
+
+
+def _drain_bell(fd: int) -> None:
+    try:
+        while os.read(fd, 4096):
+            pass
+    except BlockingIOError:
+        pass
+
+
+# --------------------------------------------------------------------------
+# Child process
+# --------------------------------------------------------------------------
+
+def _raise_priority() -> None:
+    try:
+        if SAMPLER_PROCESS_NICE:
+            os.nice(SAMPLER_PROCESS_NICE)
+    except (OSError, AttributeError) as e:
+        logger.warning("Sampler process: could not renice to %d: %s", SAMPLER_PROCESS_NICE, e)
+    if SAMPLER_PROCESS_RT_PRIO > 0:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(SAMPLER_PROCESS_RT_PRIO))
+        except (OSError, AttributeError) as e:
+            logger.warning("Sampler process: could not set SCHED_FIFO %d: %s", SAMPLER_PROCESS_RT_PRIO, e)
+
+
+def _child_main(cfg: dict) -> None:
+    logging.basicConfig(level=logging.INFO)
+    _raise_priority()
+    try:
+        asyncio.run(_child_run(cfg))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _child_run(cfg: dict) -> None:
+    import importlib
+    from backend.joints.sampler import _Backoff, _tick_stats, TickStats, get_sampler_stats, plan_samplers
+    from backend.joints.moteus.bus import cycle_status
+
+    loop = asyncio.get_running_loop()
+    samples = ShmRing(cfg["samples"])
+    commands = ShmRing(cfg["commands"])
+    replies = ShmRing(cfg["replies"])
+    bell_out = cfg["bell_out"].fileno()
+    bell_in = cfg["bell_in"].fileno()
+    os.set_blocking(bell_out, False)
+    os.set_blocking(bell_in, False)
+
+    module, _, attr = cfg["registry"].partition(":")
+    registry = getattr(importlib.import_module(module), attr)
+    names: List[str] = cfg["joints"]
+    index = {name: i for i, name in enumerate(names)}
+    joints = {name: registry[name] for name in names}
+    hz, overrun = cfg["hz"], cfg["overrun"]
+
+    def publish(rec: bytes) -> None:
+        samples.write(rec)
+        _ring_bell(bell_out)
+
+    def reply(msg: tuple) -> None:
+        try:
+            data = pickle.dumps(msg, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            data = pickle.dumps((msg[0], False, f"unpicklable result: {e}"))
+        if not replies.write(data):
+            logger.error("Sampler process: reply ring full, dropping reply %r", msg[0])
+        _ring_bell(bell_out)
+
+    async def sample_joint(name: str, joint: Any, phase: float) -> None:
+        idx = index[name]
+        stats = _tick_stats[name] = TickStats(name, "joint", 1, hz)
+        sched = PeriodicScheduler(1.0 / max(1, hz), overrun, phase, missed=stats.missed)
+        backoff = _Backoff()
+        while True:
+            await sched.wait()
+            t0 = loop.time()
+            stats.tick(t0)
+            try:
+                st = await joint.status(include_control=False)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                publish(encode_error(idx, e, time.time_ns() // 1000, loop.time()))
+                stats.gap()
+                sched.reset()
+                await asyncio.sleep(backoff.next())
+                continue
+            now = loop.time()
+            stats.observe(now - t0)
+            backoff.reset()
+            publish(encode_sample(idx, st, time.time_ns() // 1000, now))
+
+    async def sample_bus(bus_name: str, members: Dict[str, Any], phase: float) -> None:
+        stats = _tick_stats[f"bus:{bus_name}"] = TickStats(f"bus:{bus_name}", "bus", len(members), hz)
+        sched = PeriodicScheduler(1.0 / max(1, hz), overrun, phase, missed=stats.missed)
+        backoff = _Backoff()
+        joint_list = list(members.values())
+        while True:
+            await sched.wait()
+            t0 = loop.time()
+            stats.tick(t0)
+            try:
+                statuses = await cycle_status(joint_list)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                ts_us, now = time.time_ns() // 1000, loop.time()
+                for name in members:
+                    samples.write(encode_error(index[name], e, ts_us, now))
+                _ring_bell(bell_out)
+                stats.gap()
+                sched.reset()
+                await asyncio.sleep(backoff.next())
+                continue
+            now = loop.time()
+            stats.observe(now - t0)
+            backoff.reset()
+            ts_us = time.time_ns() // 1000
+            for name, j in members.items():
+                st = statuses.get(j.node_id)
+                if st is None:
+                    samples.write(encode_error(index[name], TimeoutError(f"no reply from node {j.node_id}"), ts_us, now))
+                else:
+                    samples.write(encode_sample(index[name], st, ts_us, now))
+            _ring_bell(bell_out)
+
+    async def execute(req_id: int, name: str, method: str, args: tuple, kwargs: dict) -> None:
+        try:
+            result = getattr(joints[name], method)(*args, **kwargs)
+            if asyncio.iscoroutine(result):
+                result = await result
+            reply((req_id, True, result))
+        except Exception as e:
+            reply((req_id, False, f"{type(e).__name__}: {e}"))
+
+    tasks = []
+    for kind, name, target, phase in plan_samplers(joints, cfg["mode"], cfg["stagger"]):
+        coro = sample_bus(name, target, phase) if kind == "bus" else sample_joint(name, target, phase)
+        tasks.append(asyncio.create_task(coro))
+
+    wake = asyncio.Event()
+
+    def on_bell() -> None:
+        _drain_bell(bell_in)
+        wake.set()
+
+    loop.add_reader(bell_in, on_bell)
+    ppid = os.getppid()
+    next_stats = loop.time() + 1.0
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(wake.wait(), max(0.0, next_stats - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            if loop.time() >= next_stats:
+                next_stats += 1.0
+                if os.getppid() != ppid:
+                    logger.error("Sampler process: API process went away, exiting")
+                    return
+                reply((None, _STATS, {**get_sampler_stats(), "_ring": {
+                    "samples_dropped": samples.dropped, "replies_dropped": replies.dropped,
+                }}))
+            if not wake.is_set():
+                continue
+            wake.clear()
+            for rec in commands.read_all():
+                req_id, name, method, args, kwargs = pickle.loads(rec)
+                if method == _SHUTDOWN:
+                    return
+                asyncio.create_task(execute(req_id, name, method, args, kwargs))
+    finally:
+        loop.remove_reader(bell_in)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for j in joints.values():
+            try:
+                await j.stop()
+            except Exception:
+                pass
+        for ring in (samples, commands, replies):
+            ring.close()
+
+
+# --------------------------------------------------------------------------
+# API process
+# --------------------------------------------------------------------------
+
+class RemoteJoint(Joint):
+    """
+    Registry stand-in for a joint that lives in the sampler process.
+    status() answers from the latest sample without a round trip; every
+    other call is forwarded and awaited.
+    """
+
+    def __init__(self, name: str, proc: "SamplerProcess", joint_type: str, stale_after: float):
+        self.name = name
+        self.joint_type = joint_type
+        self._proc = proc
+        self._stale_after = stale_after
+        self._status: Optional[dict] = None
+        self._error: Optional[str] = "no sample yet"
+        self._status_mono = 0.0
+        self._current_cmd: Optional[dict] = None
+
+    def _on_sample(self, st: Optional[dict], error: Optional[str], mono: float) -> None:
+        self._status, self._error, self._status_mono = st, error, mono
+
+    def get_current_cmd(self) -> Optional[dict]:
+        return self._current_cmd
+
+    def clear_current_cmd(self) -> None:
+        self._current_cmd = None
+
+    def initialize(self) -> None:
+        self._proc.send(self.name, "initialize")
+
+    async def status(self, include_control: bool = False) -> dict:
+        if include_control:
+            return await self._proc.call(self.name, "status", include_control=True)
+        if self._error is not None:
+            raise TimeoutError(self._error)
+        age = time.monotonic() - self._status_mono
+        if age > self._stale_after:
+            raise TimeoutError(f"No sample from {self.name} for {age:.1f}s")
+        return dict(self._status)
+
+    async def move(
+        self,
+        position: float,
+        velocity: float = None,
+        accel: float = None,
+        hold: bool = True,
+        cmd_id: str | None = None,
+        run_id: int | None = None,
+    ) -> dict:
+        result = await self._proc.call(
+            self.name, "move", position, velocity, accel, hold, cmd_id=cmd_id, run_id=run_id,
+        )
+        self._current_cmd = {
+            "cmd_id": cmd_id,
+            "target": position,
+            "velocity": velocity,
+            "accel": accel,
+            "run_id": run_id,
+            "hold": hold,
+        }
+        return result
+
+    async def stop(self) -> None:
+        try:
+            await self._proc.call(self.name, "stop")
+        finally:
+            self._current_cmd = None
+
+    async def disarm(self) -> None:
+        await self._proc.call(self.name, "disarm")
+        self._current_cmd = None
+
+    async def arm(self, *args, **kwargs) -> None:
+        await self._proc.call(self.name, "arm", *args, **kwargs)
+
+    async def calibrate(self, *args, **kwargs) -> dict:
+        return await self._proc.call(self.name, "calibrate", *args, **kwargs)
+
+    async def configure(self, **params) -> None:
+        await self._proc.call(self.name, "configure", **params)
+
+
+def _joint_type(joint: Any) -> str:
+    module = type(joint).__module__
+    if ".odrive." in module:
+        return "odrive"
+    if ".moteus." in module:
+        return "moteus"
+    return type(joint).__name__.lower()
+
+
+class SamplerProcess:
+    """
+    API-side handle: spawns the sampler process, drains its sample/reply
+    rings into the _JointState pipeline, forwards commands, and respawns
+    the process if it dies. The child builds its own joints by importing
+    `registry` ("module:attribute", a {name: joint} dict) and picking the
+    names in `joints`.
+    """
+
+    def __init__(
+        self,
+        joints: Dict[str, Any],
+        ingestor: Any,
+        hz: int = 100,
+        mode: str = "joint",
+        overrun: str = SKIP,
+        stagger: bool = True,
+        eps_pos: float = 0.005,
+        eps_vel: float = 0.01,
+        settle_ticks: int = 3,
+        registry: str = "backend.api.routers.joints:joints",
+    ):
+        self.names = list(joints)
+        self.registry = registry
+        self.ingestor = ingestor
+        self.hz = hz
+        self.mode = mode
+        self.overrun = overrun
+        self.stagger = stagger
+        self._state_args = (eps_pos, eps_vel, settle_ticks)
+        # Several periods without a sample (or at least half a second) means offline
+        stale_after = max(0.5, 10.0 / max(1, hz))
+        self.remotes: Dict[str, RemoteJoint] = {
+            name: RemoteJoint(name, self, _joint_type(j), stale_after) for name, j in joints.items()
+        }
+        self.restarts = 0
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._wake = asyncio.Event()
+        self._proc: Optional[mp.Process] = None
+        self._bell_in = self._bell_out = None
+        self.ring_stats: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def start(self) -> None:
+        from backend.api.ws_manager import WS_DEFAULT_HZ
+        from backend.joints.sampler import _JointState
+
+        self._loop = asyncio.get_running_loop()
+        self.samples = ShmRing(capacity=SAMPLE_RING_BYTES)
+        self.commands = ShmRing(capacity=COMMAND_RING_BYTES)
+        self.replies = ShmRing(capacity=COMMAND_RING_BYTES)
+        self.states = {
+            name: _JointState(name, remote, self.ingestor, *self._state_args, WS_DEFAULT_HZ)
+            for name, remote in self.remotes.items()
+        }
+        self._spawn()
+        self._task = asyncio.create_task(self._consume())
+
+    def _spawn(self) -> None:
+        ctx = mp.get_context("spawn")  # a fresh interpreter: no inherited loop, sockets or threads
+        bell_in_r, bell_in_w = ctx.Pipe(duplex=False)
+        bell_out_r, bell_out_w = ctx.Pipe(duplex=False)
+        self._proc = ctx.Process(
+            target=_child_main,
+            name="sampler",
+            daemon=True,
+            args=({
+                "samples": self.samples.name,
+                "commands": self.commands.name,
+                "replies": self.replies.name,
+                "bell_in": bell_in_r,
+                "bell_out": bell_out_w,
+                "registry": self.registry,
+                "joints": self.names,
+                "hz": self.hz,
+                "mode": self.mode,
+                "overrun": self.overrun,
+                "stagger": self.stagger,
+            },),
+        )
+        self._proc.start()
+        bell_in_r.close()
+        bell_out_w.close()
+        self._bell_in, self._bell_out = bell_in_w, bell_out_r
+        os.set_blocking(bell_in_w.fileno(), False)
+        os.set_blocking(bell_out_r.fileno(), False)
+        self._loop.add_reader(bell_out_r.fileno(), self._on_bell)
+        self._loop.add_reader(self._proc.sentinel, self._on_exit)
+
+    def _on_bell(self) -> None:
+        _drain_bell(self._bell_out.fileno())
+        self._wake.set()
+
+    def _detach(self) -> None:
+        if self._bell_in is None:
+            return
+        self._loop.remove_reader(self._proc.sentinel)
+        self._loop.remove_reader(self._bell_out.fileno())
+        self._bell_in.close()
+        self._bell_out.close()
+        self._bell_in = self._bell_out = None
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(RuntimeError("sampler process exited"))
+        self._pending.clear()
+
+    def _on_exit(self) -> None:
+        self._detach()
+        if self._closing:
+            return
+        self._proc.join(1.0)  # the sentinel fired, so this only reaps it
+        logger.error("Sampler process exited with code %s; restarting", self._proc.exitcode)
+        self._loop.create_task(self._all_offline("sampler process exited"))
+        self._loop.call_later(1.0, self._respawn)
+
+    async def _all_offline(self, reason: str) -> None:
+        now = time.monotonic()
+        for name, remote in self.remotes.items():
+            remote._on_sample(None, reason, now)
+            await self.states[name].on_error(RuntimeError(reason))
+
+    def _respawn(self) -> None:
+        if self._closing:
+            return
+        self.commands.read_all()  # the dead child's unread commands must not run later
+        self.restarts += 1
+        self._spawn()
+
+    async def _consume(self) -> None:
+        from backend.joints.sampler import _remote_stats
+
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            for rec in self.replies.read_all():
+                req_id, ok, value = pickle.loads(rec)
+                if ok == _STATS:
+                    _remote_stats.clear()
+                    _remote_stats.update({k: {**v, "process": "sampler"} for k, v in value.items()
+                                          if not k.startswith("_")})
+                    self.ring_stats = value.get("_ring")
+                    continue
+                fut = self._pending.get(req_id)
+                if fut is None or fut.done():
+                    continue
+                if ok:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(RuntimeError(value))
+
+            while True:
+                recs = self.samples.read_all(256)
+                if not recs:
+                    break
+                for rec in recs:
+                    idx, ts_us, mono, st, error = decode_sample(rec)
+                    name = self.names[idx]
+                    self.remotes[name]._on_sample(st, error, mono)
+                    state = self.states[name]
+                    try:
+                        if error is None:
+                            await state.on_status(st, ts_us, mono)
+                        else:
+                            await state.on_error(RuntimeError(error))
+                    except Exception as e:
+                        await state.on_error(e)
+                await asyncio.sleep(0)  # a large backlog must not starve the web loop
+
+    def send(self, name: str, method: str, *args, req_id: int = 0, **kwargs) -> None:
+        """Queue a command without waiting for its result."""
+        if self._bell_in is None:
+            raise RuntimeError("sampler process is not running")
+        data = pickle.dumps((req_id, name, method, args, kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+        if not self.commands.write(data):
+            raise RuntimeError("sampler command ring is full")
+        _ring_bell(self._bell_in.fileno())
+
+    async def call(self, name: str, method: str, *args, **kwargs) -> Any:
+        """Run `joints[name].method(*args, **kwargs)` in the sampler process and return its result."""
+        req_id = next(self._ids)
+        fut = self._pending[req_id] = self._loop.create_future()
+        try:
+            self.send(name, method, *args, req_id=req_id, **kwargs)
+            return await fut
+        finally:
+            self._pending.pop(req_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "pid": self._proc.pid if self._proc else None,
+            "alive": bool(self._proc and self._proc.is_alive()),
+            "restarts": self.restarts,
+            "samples_pending_bytes": self.samples.pending(),
+            "commands_dropped": self.commands.dropped,
+            **(self.ring_stats or {}),
+        }
+
+    async def stop(self, timeout: float = 2.0) -> None:
+        self._closing = True
+        proc = self._proc
+        if proc is not None and proc.is_alive():
+            try:
+                self.send("", _SHUTDOWN)
+            except Exception:
+                pass
+            await self._loop.run_in_executor(None, proc.join, timeout)
+            if proc.is_alive():
+                proc.terminate()
+                await self._loop.run_in_executor(None, proc.join, timeout)
+        if proc is not None:
+            self._detach()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        for ring in (self.samples, self.commands, self.replies):
+            ring.close()
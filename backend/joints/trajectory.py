@@ -0,0 +1,276 @@
+"""
+Streaming execution of multi-joint trajectories.
+
+The whole trajectory is sampled up front (backend.util.spline) into
+position/velocity/acceleration arrays, one row per control cycle. A task
+then streams one row per cycle on a PeriodicScheduler deadline grid:
+
+- Moteus joints sharing a transport: one `Transport.cycle()` per cycle with
+  every joint's setpoint (position + velocity feedforward, no limits) and a
+  query, so the replies give the measured positions of the same cycle.
+- ODrive CANSimple joints: Set_Input_Pos frames (passthrough, velocity
+  feedforward) queued back to back; measured positions come from the
+  cyclic encoder estimates.
+
+The setpoint of a cycle is picked by elapsed time on the grid, so a missed
+deadline skips ahead rather than letting the motion lag behind the clock.
+Each joint's current command is updated with the setpoint every cycle, so
+the sampler writes it into the `target_*` columns of `joint_samples` next
+to the measured values; tracking error is `position - target_position` in
+those rows. Runs also keep the max/RMS error per joint for their status.
+
+On the last cycle the final waypoint is sent as a regular command, and the
+sampler reports cmd_done once each joint has settled on it.
+"""
+import asyncio
+import contextlib
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+import moteus
+import numpy as np
+
+from backend.joints.batch import group_joints
+from backend.util.metrics import registry
+from backend.util.scheduler import SKIP, PeriodicScheduler
+
+logger = logging.getLogger(__name__)
+
+TRAJ_RATE_HZ = float(os.getenv("TRAJ_RATE_HZ", 200))
+TRAJ_MAX_RATE_HZ = float(os.getenv("TRAJ_MAX_RATE_HZ", 1000))
+TRAJ_MAX_SECONDS = float(os.getenv("TRAJ_MAX_SECONDS", 600))
+# A Moteus joint whose setpoint stream stalls this long stops on its own
+TRAJ_WATCHDOG_S = float(os.getenv("TRAJ_WATCHDOG_S", 0.1))
+# How far (turns) the first waypoint may be from where the joint is
+TRAJ_START_TOLERANCE = float(os.getenv("TRAJ_START_TOLERANCE", 0.02))
+# Finished runs kept for GET /joints/trajectory/{id}
+TRAJ_KEEP = 32
+
+_cycle_hist = registry.histogram(
+    "trajectory_cycle_latency_seconds", "Time to send one cycle of trajectory setpoints",
+)
+_missed = registry.counter(
+    "trajectory_missed_deadlines_total", "Trajectory cycles that could not start at their deadline",
+)
+
+
+class TrajectoryRun:
+    """
+    One trajectory over `joints` ({name: joint}); `pos`/`vel`/`acc` are
+    (K, J) arrays with one column per joint in `joints` order and one row
+    per cycle at `rate_hz`. With `hold`, the final setpoint is held
+    indefinitely; otherwise the Moteus watchdog releases it.
+    """
+
+    def __init__(
+        self,
+        joints: Dict[str, Any],
+        pos: np.ndarray,
+        vel: np.ndarray,
+        acc: np.ndarray,
+        rate_hz: float,
+        hold: bool = True,
+        run_id: Optional[int] = None,
+    ):
+        moteus_groups, odrive_can, other = group_joints(joints)
+        if other:
+            raise ValueError(f"Trajectories stream to Moteus and ODrive CAN joints only: {', '.join(other)}")
+        self.id = str(uuid4())
+        self.joints = joints
+        self.names = list(joints)
+        self.rate_hz = rate_hz
+        self.hold = hold
+        self.run_id = run_id
+        self.cmd_ids = {n: str(uuid4()) for n in self.names}
+        self.cycles_total = len(pos)
+        self._col = {n: i for i, n in enumerate(self.names)}
+        self._moteus_groups = moteus_groups
+        self._odrive_can = odrive_can
+        # Plain lists: per-cycle indexing without numpy scalar boxing
+        self._pos = pos.tolist()
+        self._vel = vel.tolist()
+        self._acc = acc.tolist()
+        # Come to rest on the final waypoint: a held setpoint with a velocity
+        # feedforward would keep the Moteus position target moving
+        self._vel[-1] = [0.0] * len(self.names)
+        self._acc[-1] = [0.0] * len(self.names)
+
+        self.state = "pending"  # running | done | aborted | error
+        self.error: Optional[str] = None
+        self.index = 0  # last setpoint row sent
+        self.cycles = 0
+        self.missed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._prev = 0
+        n = len(self.names)
+        self._err_max = [0.0] * n
+        self._err_sq = [0.0] * n
+        self._err_n = [0] * n
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self.state in ("pending", "running")
+
+    def _track(self, col: int, measured: float) -> None:
+        # The reply to a cycle's command reflects the setpoint of the cycle before
+        err = measured - self._pos[self._prev][col]
+        self._err_max[col] = max(self._err_max[col], abs(err))
+        self._err_sq[col] += err * err
+        self._err_n[col] += 1
+
+    async def _moteus_cycle(self, names: List[str], k: int, watchdog: float) -> None:
+        ordered = sorted(names, key=lambda n: self.joints[n].node_id)
+        pos, vel = self._pos[k], self._vel[k]
+        async with contextlib.AsyncExitStack() as stack:
+            for n in ordered:
+                await stack.enter_async_context(self.joints[n]._lock)
+            transport = self.joints[ordered[0]].transport
+            results = await transport.cycle([
+                self.joints[n].make_setpoint(pos[self._col[n]], vel[self._col[n]], watchdog) for n in ordered
+            ])
+        by_id = {self.joints[n].node_id: self._col[n] for n in ordered}
+        for r in results:
+            col = by_id.get(getattr(r, "id", None))
+            value = getattr(r, "values", {}).get(moteus.Register.POSITION)
+            if col is not None and value is not None:
+                self._track(col, value / (2 * math.pi))
+
+    def _odrive_cycle(self, k: int) -> None:
+        pos, vel = self._pos[k], self._vel[k]
+        for n in self._odrive_can:
+            j, col = self.joints[n], self._col[n]
+            if j.node.pos is not None:
+                self._track(col, j.node.pos)
+            j.send_setpoint(pos[col], vel[col])
+
+    def _mirror(self, k: int, final: bool) -> None:
+        pos, vel, acc = self._pos[k], self._vel[k], self._acc[k]
+        for n in self.names:
+            col = self._col[n]
+            self.joints[n].track_cmd(
+                pos[col], vel[col], acc[col], self.hold, self.cmd_ids[n], self.run_id,
+                trajectory=None if final else self.id,
+            )
+
+    async def _stop_all(self) -> None:
+        await asyncio.gather(*(j.stop() for j in self.joints.values()), return_exceptions=True)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        sched = PeriodicScheduler(1.0 / self.rate_hz, SKIP, missed=_missed)
+        last = self.cycles_total - 1
+        try:
+            await asyncio.gather(*(self.joints[n].ensure_armed() for n in self._odrive_can))
+            for n in self._odrive_can:
+                self.joints[n].begin_stream()
+            self.state = "running"
+            self.started_at = time.time()
+            t0 = None
+            while True:
+                deadline = await sched.wait()
+                if t0 is None:
+                    t0 = deadline
+                k = min(last, round((deadline - t0) * self.rate_hz))
+                final = k == last
+                watchdog = math.nan if final and self.hold else TRAJ_WATCHDOG_S
+
+                start = loop.time()
+                self._odrive_cycle(k)
+                if self._moteus_groups:
+                    await asyncio.gather(*(
+                        self._moteus_cycle(names, k, watchdog) for names in self._moteus_groups
+                    ))
+                _cycle_hist.observe(loop.time() - start)
+
+                self._mirror(k, final)
+                self.index = self._prev = k
+                self.cycles += 1
+                if final:
+                    break
+            self.state = "done"
+        except asyncio.CancelledError:
+            self.state = "aborted"
+            await self._stop_all()
+            raise
+        except Exception as e:
+            logger.warning("Trajectory %s failed: %s", self.id, e)
+            self.state = "error"
+            self.error = str(e) or type(e).__name__
+            await self._stop_all()
+        finally:
+            self.missed = sched.missed
+            self.finished_at = time.time()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def abort(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        if self.active:
+            # Cancelled before its first step
+            self.state = "aborted"
+            self.finished_at = time.time()
+
+    def as_dict(self) -> dict:
+        tracking = {}
+        for n in self.names:
+            col = self._col[n]
+            count = self._err_n[col]
+            tracking[n] = {
+                "max_error": self._err_max[col] if count else None,
+                "rms_error": math.sqrt(self._err_sq[col] / count) if count else None,
+                "samples": count,
+            }
+        return {
+            "id": self.id,
+            "state": self.state,
+            "error": self.error,
+            "joints": self.names,
+            "cmd_ids": self.cmd_ids,
+            "run_id": self.run_id,
+            "rate_hz": self.rate_hz,
+            "duration_s": (self.cycles_total - 1) / self.rate_hz,
+            "cycles_total": self.cycles_total,
+            "cycles": self.cycles,
+            "index": self.index,
+            "missed": self.missed,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "tracking": tracking,
+        }
+
+
+_runs: "OrderedDict[str, TrajectoryRun]" = OrderedDict()
+
+
+def busy_joints(names: List[str]) -> List[str]:
+    """Those of `names` that an active trajectory is streaming to."""
+    active = {n for run in _runs.values() if run.active for n in run.names}
+    return [n for n in names if n in active]
+
+
+def start(run: TrajectoryRun) -> TrajectoryRun:
+    _runs[run.id] = run
+    run.start()
+    # Forget the oldest finished runs
+    for old_id in [i for i, r in _runs.items() if not r.active][:-TRAJ_KEEP]:
+        del _runs[old_id]
+    return run
+
+
+def get(run_id: str) -> Optional[TrajectoryRun]:
+    return _runs.get(run_id)
+
+
+async def abort_all() -> None:
+    await asyncio.gather(*(run.abort() for run in list(_runs.values()) if run.active))
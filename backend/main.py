@@ -5,11 +5,18 @@ from backend.api.routers import joints as joints_router
 from backend.api.routers import telemetry as telemetry_router
 from backend.api.routers import runs as runs_router
 from backend.api.routers import ws as ws_router
+from backend.api.routers import metrics as metrics_router
 
 from backend.api.routers.joints import joints
 from backend.api.ws_manager import manager
-from backend.ingest.telemetry_queue import TelemetryIngestor
-from backend.joints.sampler import run_joint_sampler
+from backend.db import warm_engine
+from backend.db_pool import db_pool
+from backend.ingest.telemetry_queue import ingestor
+from backend.joints import trajectory
+from backend.joints.sampler import plan_samplers, run_joint_sampler, run_bus_sampler
+from backend.joints.sampler_process import SAMPLER_PROCESS, SamplerProcess
+from backend.util.metrics import LoopLagMonitor
+from backend.util.scheduler import POLICIES
 from backend.debugging import enable_debugpy
 
 enable_debugpy()
@@ -19,16 +26,44 @@ app.include_router(joints_router.router)
 app.include_router(telemetry_router.router)
 app.include_router(runs_router.router)
 app.include_router(ws_router.router)
+app.include_router(metrics_router.router)
 
 @app.on_event("startup")
 async def on_startup():
-    app.state.ingestor = TelemetryIngestor(flush_max=200, flush_ms=200)
+    # Connect and prepare the hot statements before the first flush/request
+    await asyncio.gather(warm_engine(), db_pool.start())
+
+    # Same instance the telemetry router enqueues into
+    app.state.ingestor = ingestor
     await app.state.ingestor.start()
 
+    # Sentinel that measures event-loop lag (exported at /metrics)
+    app.state.loop_lag_task = asyncio.create_task(LoopLagMonitor().run())
+
     hz = int(os.getenv("SAMPLER_HZ", "100"))
+    # "joint": one sampler task per joint; "bus": one Transport.cycle() per tick
+    # for all Moteus joints sharing a transport (non-Moteus joints stay per-joint)
+    mode = os.getenv("SAMPLER_MODE", "joint").lower()
+    overrun = os.getenv("SAMPLER_OVERRUN", "skip").lower()
+    if overrun not in POLICIES:
+        raise ValueError(f"SAMPLER_OVERRUN must be one of {POLICIES}, got {overrun!r}")
+    stagger = os.getenv("SAMPLER_STAGGER", "1") not in ("0", "false", "no")
     app.state.sampler_tasks = []
-    for name, joint_obj in joints.items():
-        task = asyncio.create_task(run_joint_sampler(name, joint_obj, app.state.ingestor, hz=hz))
+
+    if SAMPLER_PROCESS:
+        # Hardware ticks run in their own process; the registry gets proxies
+        # so the routers keep calling joints[name].move(...) as before
+        proc = SamplerProcess(dict(joints), app.state.ingestor, hz=hz, mode=mode, overrun=overrun, stagger=stagger)
+        await proc.start()
+        joints.update(proc.remotes)
+        app.state.sampler_process = proc
+        return
+
+    for kind, name, target, phase in plan_samplers(joints, mode, stagger):
+        runner = run_bus_sampler if kind == "bus" else run_joint_sampler
+        task = asyncio.create_task(runner(
+            name, target, app.state.ingestor, hz=hz, phase=phase, overrun=overrun,
+        ))
         app.state.sampler_tasks.append(task)
 
 @app.on_event("shutdown")
@@ -39,12 +74,17 @@ async def on_shutdown():
     except Exception:
         pass
 
-    # 2) Cancel samplers fast
-    tasks = getattr(app.state, "sampler_tasks", [])
+    # 2) Stop streaming trajectories, then cancel samplers (and the loop-lag sentinel) fast
+    await trajectory.abort_all()
+    tasks = list(getattr(app.state, "sampler_tasks", []))
+    if getattr(app.state, "loop_lag_task", None):
+        tasks.append(app.state.loop_lag_task)
     for t in tasks:
         t.cancel()
     if tasks:
         await asyncio.gather(*tasks, return_exceptions=True)
+    if getattr(app.state, "sampler_process", None):
+        await app.state.sampler_process.stop()
 
     # 3) Stop ingestor
     ing = getattr(app.state, "ingestor", None)
@@ -52,4 +92,7 @@ async def on_shutdown():
         try:
             await ing.stop()
         except Exception:
-            pass
\ No newline at end of file
+            pass
+
+    # 4) Close the hot-statement pool after the last flush
+    await db_pool.close()
@@ -0,0 +1,44 @@
+"""
+Time of backend.util.downsample on a long synthetic position trace.
+
+    python -m backend.scripts.bench_downsample --points 1000000 --out 1000
+
+Builds --points samples at 100 Hz (a slow sine with noise, a few NULLs and
+one overshoot spike), runs lttb and minmax down to --out points --repeat
+times each and prints the best wall time and whether the spike survived.
+No server or database needed.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.util.downsample import METHODS, downsample
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--points", type=int, default=1_000_000)
+    p.add_argument("--out", type=int, default=1000)
+    p.add_argument("--repeat", type=int, default=5)
+    args = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    t = 1.7e9 + np.arange(args.points) / 100.0
+    y = np.sin(t / 30.0) + rng.normal(0.0, 0.01, args.points)
+    spike = args.points // 3
+    y[spike] += 5.0
+    y[rng.integers(0, args.points, args.points // 1000)] = np.nan
+
+    for method in METHODS:
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            idx = downsample(t, y, args.out, method)
+            best = min(best, time.perf_counter() - t0)
+        print(f"{method:>7}: {args.points} -> {len(idx)} points  best {best * 1000:7.1f} ms  "
+              f"spike kept: {spike in idx}")
+
+
+if __name__ == "__main__":
+    main()
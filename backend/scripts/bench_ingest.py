@@ -0,0 +1,90 @@
+"""
+Compare telemetry flush backends against a live database.
+
+    python -m backend.scripts.bench_ingest --rows 50000 --batch 200
+
+Inserts synthetic rows for a throwaway joint id through the ORM
+(SQLAlchemy unnest insert) path and the asyncpg binary COPY path, prints
+rows/sec and process CPU per row for each, then deletes the rows again.
+"""
+import argparse
+import asyncio
+import math
+import time
+
+from sqlalchemy import delete
+
+from backend.db import SessionLocal
+from backend.ingest.columnar import SampleBatch
+from backend.ingest.telemetry_queue import TelemetryIngestor
+from backend.models import JointSample
+
+BENCH_JOINT = "__bench_ingest__"
+
+
+def _make_batches(n: int, batch: int) -> list:
+    t0 = time.time_ns() // 1000
+    out = []
+    for start in range(0, n, batch):
+        b = SampleBatch(batch)
+        for i in range(start, min(n, start + batch)):
+            b.append(
+                t0 + i * 10_000, BENCH_JOINT, None,
+                math.sin(i * 0.01), math.cos(i * 0.01), 0.0,
+                0.1, 24.0, 30.0, 35.0,
+                "position", 0, 0,
+                None, None, None, None,
+            )
+        out.append(b)
+    return out
+
+
+async def _cleanup() -> None:
+    async with SessionLocal() as session:
+        await session.execute(delete(JointSample).where(JointSample.joint_id == BENCH_JOINT))
+        await session.commit()
+
+
+async def _bench(backend: str, batches: list) -> dict:
+    ing = TelemetryIngestor(flush_max=batches[0].capacity, backend=backend, spool_dir=None)
+    # Warm up connection/pool outside the measured window
+    await ing._flush(batches[0])
+
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    for b in batches[1:]:
+        await ing._flush(b)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+
+    if ing._copy is not None:
+        await ing._copy.close()
+    n = sum(len(b) for b in batches[1:])
+    return {
+        "backend": backend,
+        "rows": n,
+        "rows_per_sec": n / wall if wall else float("inf"),
+        "cpu_us_per_row": cpu / n * 1e6,
+        "wall_s": wall,
+    }
+
+
+async def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("-n", "--rows", type=int, default=50000)
+    p.add_argument("-b", "--batch", type=int, default=200)
+    p.add_argument("--backend", choices=["unnest", "copy", "both"], default="both")
+    args = p.parse_args()
+
+    backends = ["unnest", "copy"] if args.backend == "both" else [args.backend]
+    batches = _make_batches(args.rows + args.batch, args.batch)
+    try:
+        for backend in backends:
+            r = await _bench(backend, batches)
+            print(f"{r['backend']:>6}: {r['rows']} rows in {r['wall_s']:.2f}s  "
+                  f"{r['rows_per_sec']:,.0f} rows/s  {r['cpu_us_per_row']:.1f} µs CPU/row")
+            await _cleanup()
+    finally:
+        await _cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
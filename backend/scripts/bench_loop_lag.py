@@ -0,0 +1,111 @@
+"""
+Event-loop lag while ODriveJoint status is being sampled.
+
+    python -m backend.scripts.bench_loop_lag --usb-ms 1.0 --callers 4 --hz 100
+
+Uses a fake ODrive whose every property read blocks for --usb-ms (a USB
+round trip), then runs --callers concurrent status pollers at --hz for
+--seconds in two modes:
+
+  inline:   the old behaviour, blocking reads inside the coroutine
+  executor: ODriveJoint.status() (device thread + coalescing + TTL)
+
+Meanwhile a sentinel task sleeps 1 ms in a loop and records how late it
+wakes up; that lateness is the lag every other task on the loop sees.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from backend.joints.odrive.joint import ODriveJoint
+
+
+class _SlowAttr:
+    """Attribute namespace where every read blocks like a USB transfer."""
+
+    def __init__(self, delay: float, **values):
+        object.__setattr__(self, "_delay", delay)
+        object.__setattr__(self, "_values", values)
+
+    def __getattr__(self, name):
+        time.sleep(self._delay)
+        return self._values[name]
+
+    def __setattr__(self, name, value):
+        time.sleep(self._delay)
+        self._values[name] = value
+
+
+def _fake_odrive(delay: float):
+    encoder = _SlowAttr(delay, pos_estimate=0.0, vel_estimate=0.0, is_ready=True)
+    current_control = _SlowAttr(delay, Iq_measured=0.0)
+    motor_config = _SlowAttr(delay, torque_constant=0.04)
+    motor = _SlowAttr(delay, current_control=current_control, config=motor_config, temperature=30.0,
+                      is_calibrated=True)
+    axis = _SlowAttr(delay, encoder=encoder, motor=motor, current_state=8, error=0)
+    return _SlowAttr(delay, axis0=axis, vbus_voltage=24.0)
+
+
+async def _sentinel(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        t = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append((time.perf_counter() - t - 0.001) * 1000)
+
+
+async def _poller(status, hz: float, stop: asyncio.Event, counter: list) -> None:
+    period = 1.0 / hz
+    while not stop.is_set():
+        t = time.perf_counter()
+        await status()
+        counter[0] += 1
+        await asyncio.sleep(max(0.0, period - (time.perf_counter() - t)))
+
+
+async def _run(mode: str, args) -> dict:
+    joint = ODriveJoint(axis_num=0, odrv=_fake_odrive(args.usb_ms / 1000))
+    await joint._device()
+
+    if mode == "inline":
+        async def status():
+            return joint._read_status_sync()
+    else:
+        status = joint.status
+
+    stop = asyncio.Event()
+    lags: list = []
+    counter = [0]
+    tasks = [asyncio.create_task(_sentinel(stop, lags))]
+    tasks += [asyncio.create_task(_poller(status, args.hz, stop, counter)) for _ in range(args.callers)]
+    await asyncio.sleep(args.seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    joint._executor.shutdown(wait=True)
+
+    lags.sort()
+    return {
+        "mode": mode,
+        "status_calls": counter[0],
+        "lag_p50_ms": statistics.median(lags),
+        "lag_p99_ms": lags[int(len(lags) * 0.99) - 1],
+        "lag_max_ms": lags[-1],
+    }
+
+
+async def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--usb-ms", type=float, default=1.0, help="simulated blocking time per property read")
+    p.add_argument("--callers", type=int, default=4, help="concurrent status() pollers")
+    p.add_argument("--hz", type=float, default=100.0, help="poll rate per caller")
+    p.add_argument("--seconds", type=float, default=3.0)
+    args = p.parse_args()
+
+    for mode in ("inline", "executor"):
+        r = await _run(mode, args)
+        print(f"{r['mode']:>8}: {r['status_calls']:6d} status calls  "
+              f"loop lag p50 {r['lag_p50_ms']:6.2f} ms  p99 {r['lag_p99_ms']:6.2f} ms  max {r['lag_max_ms']:6.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Allocation microbenchmark for the sampler -> ingestor row path.
+
+    python -m backend.scripts.bench_sample_alloc --samples 200000
+
+Compares the old per-row dict path (17-key row dict buffered in a list
+until flush) with writing into a preallocated SampleBatch. For each it
+reports retained heap per buffered sample, live blocks per buffered sample,
+and how many generation-0 GC passes the run triggered. No DB needed.
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from backend.ingest.columnar import SampleBatch
+
+
+def _dict_path(n: int, flush_max: int) -> list:
+    buf = []
+    for i in range(n):
+        buf.append({
+            "ts": datetime.now(timezone.utc),
+            "joint_id": "joint1",
+            "run_id": None,
+            "position": i * 0.001,
+            "velocity": 0.5,
+            "accel": 0.0,
+            "torque": 0.1,
+            "supply_v": 24.0,
+            "motor_temp": 30.0,
+            "controller_temp": 35.0,
+            "mode": "position",
+            "fault_code": 0,
+            "error_flags": 0,
+            "target_position": None,
+            "target_velocity": None,
+            "target_accel": None,
+            "target_torque": None,
+        })
+        if len(buf) >= flush_max:
+            buf = []
+    return buf
+
+
+def _columnar_path(n: int, flush_max: int) -> SampleBatch:
+    batch = SampleBatch(flush_max)
+    for i in range(n):
+        batch.append(
+            time.time_ns() // 1000, "joint1", None,
+            i * 0.001, 0.5, 0.0,
+            0.1, 24.0, 30.0, 35.0,
+            "position", 0, 0,
+            None, None, None, None,
+        )
+        if batch.full:
+            batch.clear()
+    return batch
+
+
+def _measure(fn, n: int, flush_max: int) -> dict:
+    fn(flush_max, flush_max)  # warm up interned strings / caches
+    gc.collect()
+
+    # Retained memory while one full batch is buffered
+    tracemalloc.start()
+    blocks0 = sys.getallocatedblocks()
+    held = fn(flush_max - 1, flush_max)
+    blocks = sys.getallocatedblocks() - blocks0
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+
+    # GC pressure and time over a long run
+    gc.collect()
+    gen0 = gc.get_stats()[0]["collections"]
+    t0 = time.perf_counter()
+    fn(n, flush_max)
+    dt = time.perf_counter() - t0
+    gen0 = gc.get_stats()[0]["collections"] - gen0
+
+    per = max(1, flush_max - 1)
+    return {
+        "bytes_per_sample": retained / per,
+        "blocks_per_sample": blocks / per,
+        "gen0_per_10k": gen0 / n * 10_000,
+        "us_per_sample": dt / n * 1e6,
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("-n", "--samples", type=int, default=200_000)
+    p.add_argument("-b", "--batch", type=int, default=200)
+    args = p.parse_args()
+
+    for name, fn in (("dict rows", _dict_path), ("columnar", _columnar_path)):
+        r = _measure(fn, args.samples, args.batch)
+        print(f"{name:>10}: {r['bytes_per_sample']:7.1f} B/sample retained  "
+              f"{r['blocks_per_sample']:5.1f} blocks/sample  "
+              f"{r['gen0_per_10k']:5.1f} gen0 GCs/10k samples  "
+              f"{r['us_per_sample']:.2f} µs/sample")
+
+
+if __name__ == "__main__":
+    main()
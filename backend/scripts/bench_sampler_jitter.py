@@ -0,0 +1,107 @@
+"""
+Sampler tick jitter while the web loop is busy: in-process vs SAMPLER_PROCESS.
+
+    python -m backend.scripts.bench_sampler_jitter --joints 12 --hz 100 --block-ms 20
+
+Runs --joints fake joints (1 ms status reads) at --hz for --seconds twice:
+once with run_joint_sampler tasks on this loop, once in a SamplerProcess.
+Meanwhile a "slow request" blocks this loop for --block-ms every
+--every-ms, standing in for a heavy query or a burst of WS work. Prints
+the tick period p50/p99 and missed deadlines from the sampler stats.
+No server or hardware needed.
+"""
+import argparse
+import asyncio
+import time
+
+from backend.joints import sampler
+from backend.joints.sampler import run_joint_sampler
+from backend.joints.sampler_process import SamplerProcess
+
+
+class FakeJoint:
+    def __init__(self) -> None:
+        self._current_cmd = None
+
+    async def status(self, include_control: bool = False) -> dict:
+        await asyncio.sleep(0.001)
+        return {"position": 0.0, "velocity": 0.0, "mode": "position", "fault": 0}
+
+    async def stop(self) -> None:
+        pass
+
+
+# Imported by the sampler process as "backend.scripts.bench_sampler_jitter:joints"
+joints = {f"joint{i + 1}": FakeJoint() for i in range(64)}
+
+
+class _NullIngestor:
+    async def append(self, *row) -> None:
+        pass
+
+
+async def _hog(stop: asyncio.Event, block_ms: float, every_ms: float) -> None:
+    while not stop.is_set():
+        time.sleep(block_ms / 1000)
+        await asyncio.sleep(every_ms / 1000)
+
+
+async def _run(mode: str, args) -> dict:
+    sampler._tick_stats.clear()
+    sampler._remote_stats.clear()
+    names = list(joints)[:args.joints]
+    stop = asyncio.Event()
+
+    if mode == "in-process":
+        tasks = [
+            asyncio.create_task(run_joint_sampler(n, joints[n], _NullIngestor(), hz=args.hz, phase=i / len(names)))
+            for i, n in enumerate(names)
+        ]
+        proc = None
+    else:
+        proc = SamplerProcess({n: joints[n] for n in names}, _NullIngestor(), hz=args.hz,
+                              registry="backend.scripts.bench_sampler_jitter:joints")
+        await proc.start()
+        tasks = []
+        await asyncio.sleep(1.0)  # let the child import and settle
+
+    hog = asyncio.create_task(_hog(stop, args.block_ms, args.every_ms))
+    await asyncio.sleep(args.seconds)
+    stop.set()
+    await hog
+    await asyncio.sleep(1.1)  # one more stats report from the child
+
+    stats = sampler.get_sampler_stats()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if proc is not None:
+        await proc.stop()
+
+    rows = [stats[n] for n in names if n in stats]
+    return {
+        "mode": mode,
+        "ticks": sum(r["ticks"] for r in rows),
+        "missed": sum(r["missed"] for r in rows),
+        "period_p50_ms": max(r["period_p50_ms"] or 0 for r in rows),
+        "period_p99_ms": max(r["period_p99_ms"] or 0 for r in rows),
+    }
+
+
+async def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--joints", type=int, default=12)
+    p.add_argument("--hz", type=int, default=100)
+    p.add_argument("--seconds", type=float, default=3.0)
+    p.add_argument("--block-ms", type=float, default=20.0, help="how long each slow request blocks the web loop")
+    p.add_argument("--every-ms", type=float, default=100.0, help="pause between slow requests")
+    args = p.parse_args()
+
+    for mode in ("in-process", "process"):
+        r = await _run(mode, args)
+        print(f"{r['mode']:>10}: {r['ticks']:6d} ticks  {r['missed']:5d} missed  "
+              f"period p50 {r['period_p50_ms']:6.2f} ms  p99 {r['period_p99_ms']:6.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Payload size / encode time of WebSocket telemetry: JSON vs compact frames.
+
+    python -m backend.scripts.bench_ws_encoding --messages 20000 --joints 12
+
+Replays a synthetic stream shaped like the sampler's telemetry messages
+(moving position/velocity, slowly drifting temps, constant mode, mostly
+null targets) through fast_dumps and through one CompactEncoder per
+client, and prints bytes and µs per joint update for each. No server or
+hardware needed.
+"""
+import argparse
+import math
+import time
+from datetime import datetime, timedelta, timezone
+
+from backend.api.ws_compact import CompactEncoder
+from backend.util.json_fast import fast_dumps_bytes
+
+
+def _messages(n: int, joints: int) -> list:
+    t0 = datetime.now(timezone.utc)
+    out = []
+    for i in range(n):
+        tick = []
+        for j in range(joints):
+            x = i * 0.01 + j
+            tick.append((f"joint{j + 1}", {
+                "type": "telemetry",
+                "ts": (t0 + timedelta(milliseconds=33 * i)).isoformat(),
+                "joint_id": f"joint{j + 1}",
+                "run_id": None,
+                "position": math.sin(x),
+                "velocity": math.cos(x),
+                "accel": -math.sin(x),
+                "torque": 0.1 * math.sin(x),
+                "supply_v": 24.0,
+                "motor_temp": 30.0 + (i // 300) * 0.5,
+                "controller_temp": 35.0,
+                "mode": "position",
+                "fault_code": 0,
+                "error_flags": 0,
+                "target_position": 1.0 if i % 100 < 50 else None,
+                "target_velocity": None,
+                "target_accel": None,
+                "target_torque": None,
+            }))
+        out.append(tick)
+    return out
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("-n", "--messages", type=int, default=20000, help="ticks to replay")
+    p.add_argument("-j", "--joints", type=int, default=1, help="joints per tick (one compact frame per tick)")
+    args = p.parse_args()
+
+    ticks = _messages(args.messages, args.joints)
+    updates = args.messages * args.joints
+
+    t = time.perf_counter()
+    json_bytes = sum(len(fast_dumps_bytes(m)) for tick in ticks for _, m in tick)
+    json_s = time.perf_counter() - t
+
+    enc = CompactEncoder()
+    t = time.perf_counter()
+    compact_bytes = 0
+    for tick in ticks:
+        _, frames = enc.encode(tick)
+        compact_bytes += sum(len(data) for data in frames)
+    compact_s = time.perf_counter() - t
+
+    print(f"{'json':>8}: {json_bytes / updates:7.1f} B/update  {json_s / updates * 1e6:6.2f} µs/update")
+    print(f"{'compact':>8}: {compact_bytes / updates:7.1f} B/update  {compact_s / updates * 1e6:6.2f} µs/update")
+    print(f"{'ratio':>8}: {json_bytes / compact_bytes:7.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
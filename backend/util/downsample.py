@@ -0,0 +1,90 @@
+"""
+Downsampling of a plotted series (x ascending, e.g. epoch seconds) to a
+point budget, vectorized with NumPy. Both methods return indices into the
+input, so the caller picks rows/columns with them and every point drawn is
+a real sample.
+
+lttb()    Largest-Triangle-Three-Buckets: per bucket, the point forming the
+          largest triangle with the previously kept point and the next
+          bucket's average. Keeps peaks and corners with an even look.
+minmax()  The min and the max of each bucket, in time order. Cheapest, and
+          guarantees every extreme survives (what overshoot plots need).
+
+NaN values (NULL columns) are skipped.
+"""
+from typing import Literal
+
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def _finite(y: np.ndarray):
+    keep = ~np.isnan(y)
+    return None if keep.all() else np.flatnonzero(keep)
+
+
+def lttb(x, y, n_out: int) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    sel = _finite(y)
+    if sel is not None:
+        return sel[lttb(x[sel], y[sel], n_out)]
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n) if n <= n_out else np.array([0, n - 1])[:n_out]
+
+    x = x - x[0]  # keeps the prefix sums exact enough for epoch timestamps
+    # n_out - 2 buckets between the first and the last point, which are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    # Average of the bucket after each one; the last bucket looks at the last point
+    lo, hi = edges[1:-1], edges[2:]
+    cnt = hi - lo
+    nx = np.append((cx[hi] - cx[lo]) / cnt, x[-1])
+    ny = np.append((cy[hi] - cy[lo]) / cnt, y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        s, e = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # Twice the triangle area; the constant factor doesn't change the argmax
+        area = np.abs((ax - nx[i]) * (y[s:e] - ay) - (ax - x[s:e]) * (ny[i] - ay))
+        a = s + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def minmax(x, y, n_out: int) -> np.ndarray:
+    y = np.asarray(y, dtype=np.float64)
+    sel = _finite(y)
+    if sel is not None:
+        return sel[minmax(None, y[sel], n_out)]
+    n = len(y)
+    if n <= n_out or n_out < 2:
+        return np.arange(n) if n <= n_out else np.array([0])
+
+    nb = n_out // 2
+    starts = np.linspace(0, n, nb + 1).astype(np.int64)[:-1]
+    bucket = np.repeat(np.arange(nb), np.diff(np.append(starts, n)))
+    lo = np.minimum.reduceat(y, starts)
+    hi = np.maximum.reduceat(y, starts)
+    # First index in each bucket that hits its min / max
+    i_lo = np.flatnonzero(y == lo[bucket])
+    i_lo = i_lo[np.unique(bucket[i_lo], return_index=True)[1]]
+    i_hi = np.flatnonzero(y == hi[bucket])
+    i_hi = i_hi[np.unique(bucket[i_hi], return_index=True)[1]]
+    return np.unique(np.concatenate((i_lo, i_hi)))  # sorted; flat buckets give one point
+
+
+def downsample(x, y, n_out: int, method: Literal["lttb", "minmax"] = "lttb") -> np.ndarray:
+    """Indices of at most n_out points of (x, y) to draw."""
+    if method == "lttb":
+        return lttb(x, y, n_out)
+    if method == "minmax":
+        return minmax(x, y, n_out)
+    raise ValueError(f"unknown downsampling method {method!r}")
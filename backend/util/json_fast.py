@@ -2,7 +2,11 @@ try:
     import orjson
     def fast_dumps(obj) -> str:
         return orjson.dumps(obj).decode("utf-8")
+    def fast_dumps_bytes(obj) -> bytes:
+        return orjson.dumps(obj)
 except Exception:
     import json
     def fast_dumps(obj) -> str:
-        return json.dumps(obj, separators=(",", ":"))
\ No newline at end of file
+        return json.dumps(obj, separators=(",", ":"))
+    def fast_dumps_bytes(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,232 @@
+"""
+In-process metrics with Prometheus text exposition (served at GET /metrics).
+
+Histograms use fixed bucket bounds (log-spaced for latencies, multiples of
+the nominal period for tick periods), so each one is a short list of ints
+no matter how many values it sees and an observation is one bisect plus
+three additions.
+"""
+import asyncio
+import bisect
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def log_buckets(lo: float, hi: float, steps: Tuple[float, ...] = (1.0, 2.0, 5.0)) -> Tuple[float, ...]:
+    """Bucket upper bounds lo..hi on a 1-2-5 (or `steps`) grid per decade."""
+    out = []
+    exp = math.floor(math.log10(lo))
+    while True:
+        for s in steps:
+            v = round(s * 10.0 ** exp, 12)
+            if v < lo:
+                continue
+            if v > hi:
+                return tuple(out)
+            out.append(v)
+        exp += 1
+
+
+# 10 µs .. 10 s, 6 buckets per decade (37 total)
+LATENCY_BUCKETS = log_buckets(1e-5, 10.0, (1.0, 1.5, 2.0, 3.0, 5.0, 7.0))
+
+# Multiples of a nominal period: fine around 1.0 where tick jitter lives
+_PERIOD_FACTORS = (0.5, 0.8, 0.9, 0.95, 0.98, 0.99, 1.0, 1.01, 1.02, 1.05, 1.1, 1.2, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+
+def period_buckets(period: float) -> Tuple[float, ...]:
+    """Bucket bounds for a loop's tick period histogram (seconds)."""
+    return tuple(round(f * period, 9) for f in _PERIOD_FACTORS)
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None if empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else math.inf
+        return math.inf
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, n: int = 1) -> None:
+        self.value += n
+
+
+class Gauge:
+    __slots__ = ("value", "fn")
+
+    def __init__(self, fn: Optional[Callable[[], float]] = None) -> None:
+        self.value = 0.0
+        self.fn = fn
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def get(self) -> float:
+        return self.fn() if self.fn is not None else self.value
+
+
+_FACTORIES = {"histogram": Histogram, "counter": Counter, "gauge": Gauge}
+
+
+def _labels(labels: LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if v != v:
+        return "NaN"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Registry:
+    """Metric families by name; each family holds one metric per label set."""
+
+    def __init__(self) -> None:
+        self._families: Dict[str, Tuple[str, str, Dict[LabelKey, object]]] = {}
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def _get(self, kind: str, name: str, help: str, labels: Dict[str, str], **kwargs):
+        fam = self._families.get(name)
+        if fam is None:
+            fam = self._families[name] = (kind, help, {})
+        elif fam[0] != kind:
+            raise ValueError(f"metric {name} already registered as a {fam[0]}")
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        metric = fam[2].get(key)
+        if metric is None:
+            metric = fam[2][key] = _FACTORIES[kind](**kwargs)
+        return metric
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels) -> Histogram:
+        return self._get("histogram", name, help, labels, bounds=buckets)
+
+    def counter(self, name: str, help: str, **labels) -> Counter:
+        return self._get("counter", name, help, labels)
+
+    def gauge(self, name: str, help: str, fn: Optional[Callable[[], float]] = None, **labels) -> Gauge:
+        return self._get("gauge", name, help, labels, fn=fn)
+
+    def remove(self, name: str, **labels) -> None:
+        fam = self._families.get(name)
+        if fam is not None:
+            fam[2].pop(tuple(sorted((k, str(v)) for k, v in labels.items())), None)
+
+    def add_collector(self, fn: Callable[[], Iterable[str]]) -> None:
+        """Register a callable yielding extra exposition lines at scrape time."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        out: List[str] = []
+        for name, (kind, help, metrics) in sorted(self._families.items()):
+            if not metrics:
+                continue
+            out.append(f"# HELP {name} {help}")
+            out.append(f"# TYPE {name} {kind}")
+            for key, m in metrics.items():
+                if kind == "histogram":
+                    cum = 0
+                    for bound, c in zip(m.bounds, m.counts):
+                        cum += c
+                        le = 'le="%s"' % _num(bound)
+                        out.append(f"{name}_bucket{_labels(key, le)} {cum}")
+                    inf = 'le="+Inf"'
+                    out.append(f"{name}_bucket{_labels(key, inf)} {m.count}")
+                    out.append(f"{name}_sum{_labels(key)} {_num(m.sum)}")
+                    out.append(f"{name}_count{_labels(key)} {m.count}")
+                elif kind == "counter":
+                    out.append(f"{name}{_labels(key)} {_num(m.value)}")
+                else:
+                    try:
+                        out.append(f"{name}{_labels(key)} {_num(m.get())}")
+                    except Exception:
+                        pass
+        for fn in self._collectors:
+            try:
+                out.extend(fn())
+            except Exception:
+                pass
+        out.append("")
+        return "\n".join(out)
+
+
+def render_stats(prefix: str, stats: dict, counters: Iterable[str] = (), help: str = "", **labels) -> List[str]:
+    """
+    Expose the numeric entries of an existing `stats()` dict as metrics named
+    `<prefix>_<key>`; keys listed in `counters` are typed as counters
+    (with a `_total` suffix), everything else as gauges.
+    """
+    counters = set(counters)
+    lab = _labels(tuple(sorted((k, str(v)) for k, v in labels.items())))
+    out: List[str] = []
+    for key, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        kind = "counter" if key in counters else "gauge"
+        name = f"{prefix}_{key}_total" if kind == "counter" else f"{prefix}_{key}"
+        out.append(f"# HELP {name} {help or prefix} {key}")
+        out.append(f"# TYPE {name} {kind}")
+        out.append(f"{name}{lab} {_num(value)}")
+    return out
+
+
+registry = Registry()
+
+
+class LoopLagMonitor:
+    """
+    Sentinel task: ticks every `interval` on the event loop and records how
+    late each tick starts past its deadline. Anything that blocks the loop
+    shows up here.
+    """
+
+    def __init__(self, interval: float = 0.05, reg: Registry = registry):
+        self.interval = interval
+        self.hist = reg.histogram("event_loop_lag_seconds", "How late a sleeping sentinel task wakes up")
+        self.last = reg.gauge("event_loop_lag_last_seconds", "Most recent event loop lag sample")
+
+    async def run(self) -> None:
+        from backend.util.scheduler import PeriodicScheduler
+
+        loop = asyncio.get_running_loop()
+        sched = PeriodicScheduler(self.interval)
+        while True:
+            deadline = await sched.wait()
+            lag = max(0.0, loop.time() - deadline)
+            self.hist.observe(lag)
+            self.last.set(lag)
@@ -0,0 +1,93 @@
+"""
+Fixed-rate tick scheduling on absolute deadlines.
+
+Deadlines sit on a grid `phase * period + k * period` on loop.time(), so
+they don't drift when a tick's work or the sleep wake-up jitters, and the
+long-run rate is exactly `1 / period`. A tick that can't start at its
+deadline is counted as missed; what happens next depends on the policy:
+
+  skip:    run the late tick now, then continue on the grid from the next
+           slot after now (the rate dips, the phase is kept)
+  catchup: run every passed tick back-to-back until the loop is on time
+           again, up to `max_catchup` ticks; further behind than that it
+           re-anchors like skip
+"""
+import asyncio
+import math
+from typing import Optional
+
+SKIP = "skip"
+CATCHUP = "catchup"
+POLICIES = (SKIP, CATCHUP)
+
+
+class PeriodicScheduler:
+    """
+    Usage:
+
+        sched = PeriodicScheduler(1 / hz, phase=i / n)
+        while True:
+            await sched.wait()
+            ...  # one tick of work
+
+    wait() returns the deadline of the tick it released. Call reset() after
+    a deliberate pause (e.g. an error backoff) so the pause isn't counted as
+    missed ticks.
+    """
+
+    def __init__(
+        self,
+        period: float,
+        policy: str = SKIP,
+        phase: float = 0.0,
+        max_catchup: int = 10,
+        missed=None,
+    ):
+        if period <= 0:
+            raise ValueError("period must be > 0")
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+        self.period = period
+        self.policy = policy
+        self.offset = (phase % 1.0) * period
+        self.max_catchup = max_catchup
+        self.missed = 0
+        self._counter = missed  # optional metrics Counter mirrored with `missed`
+        self._next: Optional[float] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _slot_at_or_after(self, t: float) -> float:
+        return math.ceil((t - self.offset) / self.period) * self.period + self.offset
+
+    def _miss(self, n: int) -> None:
+        self.missed += n
+        if self._counter is not None:
+            self._counter.inc(n)
+
+    def reset(self) -> None:
+        """Re-anchor on the next grid slot at the following wait()."""
+        self._next = None
+
+    async def wait(self) -> float:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        now = self._loop.time()
+        if self._next is None:
+            self._next = self._slot_at_or_after(now)
+
+        deadline = self._next
+        late = now - deadline
+        if late <= 0:
+            await asyncio.sleep(-late)
+            self._next = deadline + self.period
+            return deadline
+
+        passed = int(late // self.period) + 1  # deadlines at or before now
+        if self.policy == CATCHUP and passed <= self.max_catchup:
+            # This tick runs late; the ones behind it follow back-to-back
+            self._miss(1)
+            self._next = deadline + self.period
+        else:
+            self._miss(passed)
+            self._next = deadline + passed * self.period
+        return deadline
@@ -0,0 +1,130 @@
+"""
+Single-producer / single-consumer byte ring in multiprocessing.shared_memory.
+
+Layout: a 128-byte header (producer `head` at offset 0, consumer `tail` at
+offset 64, capacity at offset 8; each counter on its own cache line) and a
+power-of-two data area. Records are a u32 length and a u32 check word plus
+payload, padded to 8 bytes; a record that would straddle the end is
+preceded by a pad marker and starts again at offset 0.
+
+`head` and `tail` are monotonically increasing byte counts, each written by
+exactly one side as an aligned 8-byte store after the data it covers, so
+neither side ever takes a lock. Both are re-read from the header on every
+call, so after the consumer process dies its owner can drain the ring in
+its place. A full ring makes write() return False instead of blocking the
+producer.
+
+Python has no memory fences, so "after" above only holds on a strongly
+ordered CPU (x86 TSO). To stay correct elsewhere (ARM) the reader does not
+trust `head` alone: the check word is a CRC32 of the payload seeded with
+the record's position in the stream, so a record whose payload or header
+isn't visible yet, or is left over from the previous lap, fails the check
+and is read again on the next call instead.
+"""
+import struct
+import zlib
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+_HEADER = 128
+_HEAD = 0
+_CAP = 8
+_TAIL = 64
+_U64 = struct.Struct("<Q")
+_REC = struct.Struct("<II")  # length, check
+_PAD = 0xFFFFFFFF
+
+
+def _align8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _seq(offset: int) -> int:
+    """Seed of the check word of the record at stream `offset`."""
+    return (offset >> 3) & 0xFFFFFFFF
+
+
+class ShmRing:
+    def __init__(self, name: Optional[str] = None, capacity: int = 1 << 20):
+        if name is None:
+            if capacity & (capacity - 1) or capacity < 64:
+                raise ValueError("capacity must be a power of two >= 64")
+            self._shm = shared_memory.SharedMemory(create=True, size=_HEADER + capacity)
+            self._owner = True
+            self._shm.buf[:_HEADER] = bytes(_HEADER)
+            _U64.pack_into(self._shm.buf, _CAP, capacity)
+        else:
+            # Attaching side; only the creating process unlinks
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self.buf = self._shm.buf
+        self.capacity = _U64.unpack_from(self.buf, _CAP)[0]
+        self._mask = self.capacity - 1
+        self.dropped = 0
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    # --- producer side ---
+
+    def write(self, payload: bytes) -> bool:
+        n = len(payload)
+        size = _align8(_REC.size + n)
+        buf = self.buf
+        head = _U64.unpack_from(buf, _HEAD)[0]
+        pos = head & self._mask
+        pad = self.capacity - pos if pos + size > self.capacity else 0
+        if size + pad > self.capacity - (head - _U64.unpack_from(buf, _TAIL)[0]):
+            self.dropped += 1
+            return False
+        if pad:
+            _REC.pack_into(buf, _HEADER + pos, _PAD, _seq(head))
+            head += pad
+            pos = 0
+        start = _HEADER + pos + _REC.size
+        buf[start:start + n] = payload
+        _REC.pack_into(buf, _HEADER + pos, n, zlib.crc32(payload, _seq(head)))
+        _U64.pack_into(buf, _HEAD, head + size)  # publish after the record is in place
+        return True
+
+    # --- consumer side ---
+
+    def read_all(self, limit: int = 1 << 30) -> List[bytes]:
+        """Pop up to `limit` records (oldest first)."""
+        buf = self.buf
+        head = _U64.unpack_from(buf, _HEAD)[0]
+        tail = _U64.unpack_from(buf, _TAIL)[0]
+        out: List[bytes] = []
+        while tail < head and len(out) < limit:
+            pos = tail & self._mask
+            n, check = _REC.unpack_from(buf, _HEADER + pos)
+            if n == _PAD:
+                if check != _seq(tail):
+                    break  # not visible yet
+                tail += self.capacity - pos
+                continue
+            size = _align8(_REC.size + n)
+            if pos + size > self.capacity or tail + size > head:
+                break  # stale length
+            start = _HEADER + pos + _REC.size
+            payload = bytes(buf[start:start + n])
+            if zlib.crc32(payload, _seq(tail)) != check:
+                break  # payload not visible yet
+            out.append(payload)
+            tail += size
+        _U64.pack_into(buf, _TAIL, tail)  # frees the space for the producer
+        return out
+
+    def pending(self) -> int:
+        """Bytes written but not yet consumed."""
+        return _U64.unpack_from(self.buf, _HEAD)[0] - _U64.unpack_from(self.buf, _TAIL)[0]
+
+    def close(self) -> None:
+        self.buf = None
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
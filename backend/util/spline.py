@@ -0,0 +1,130 @@
+"""
+Setpoints of a multi-joint trajectory through time-stamped waypoints,
+sampled at a fixed rate and vectorized with NumPy.
+
+Waypoints are `t` (N,) seconds from the start, strictly increasing, and
+`q` (N, J) positions, one column per joint. Between two waypoints each
+joint follows a piecewise polynomial:
+
+linear   constant velocity per segment (velocity jumps at the waypoints)
+cubic    Hermite cubic through positions and knot velocities: C1, so
+         position and velocity are continuous
+quintic  Hermite quintic through positions, knot velocities and knot
+         accelerations: C2, acceleration is continuous as well
+
+Knot velocities default to the three-point estimate from the neighbouring
+segments, and to 0 at the first and the last waypoint so the trajectory
+starts and ends at rest; knot accelerations default to 0.
+"""
+from typing import Literal, Tuple
+
+import numpy as np
+
+METHODS = ("linear", "cubic", "quintic")
+
+# Hermite basis functions as coefficients of s^0..s^5, s in [0, 1] across a
+# segment of length h. Rows weight (p0, h*v0, p1, h*v1) for the cubic and
+# (p0, h*v0, h^2*a0, p1, h*v1, h^2*a1) for the quintic.
+_CUBIC = np.array([
+    [1, 0, -3, 2, 0, 0],
+    [0, 1, -2, 1, 0, 0],
+    [0, 0, 3, -2, 0, 0],
+    [0, 0, -1, 1, 0, 0],
+], dtype=np.float64)
+_QUINTIC = np.array([
+    [1, 0, 0, -10, 15, -6],
+    [0, 1, 0, -6, 8, -3],
+    [0, 0, 0.5, -1.5, 1.5, -0.5],
+    [0, 0, 0, 10, -15, 6],
+    [0, 0, 0, -4, 7, -3],
+    [0, 0, 0, 0.5, -1, 0.5],
+], dtype=np.float64)
+
+
+def knot_velocities(t: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Three-point velocity estimate at each waypoint, 0 at both ends."""
+    h = np.diff(t)[:, None]
+    d = np.diff(q, axis=0) / h
+    v = np.zeros_like(q)
+    # Slopes of the two adjacent segments, each weighted by the other's length
+    v[1:-1] = (d[:-1] * h[1:] + d[1:] * h[:-1]) / (h[:-1] + h[1:])
+    return v
+
+
+def _check(name: str, a, shape) -> np.ndarray:
+    a = np.asarray(a, dtype=np.float64)
+    if a.shape != shape:
+        raise ValueError(f"{name} must have shape {shape}, got {a.shape}")
+    if not np.isfinite(a).all():
+        raise ValueError(f"{name} must be finite")
+    return a
+
+
+def setpoints(
+    t,
+    q,
+    rate_hz: float,
+    method: Literal["linear", "cubic", "quintic"] = "cubic",
+    v=None,
+    a=None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sample the trajectory every 1 / rate_hz seconds from t[0] to t[-1] (the
+    last waypoint is always the last sample). Returns (ts, pos, vel, acc):
+    ts (K,) seconds relative to t[0], the others (K, J). `v` / `a` (N, J)
+    override the default knot velocities / accelerations.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown interpolation method {method!r}")
+    if rate_hz <= 0:
+        raise ValueError("rate_hz must be > 0")
+    t = np.asarray(t, dtype=np.float64)
+    if t.ndim != 1 or len(t) < 2:
+        raise ValueError("need at least two waypoints")
+    if not np.isfinite(t).all() or (np.diff(t) <= 0).any():
+        raise ValueError("waypoint times must be finite and strictly increasing")
+    q = np.asarray(q, dtype=np.float64)
+    if q.ndim == 1:
+        q = q[:, None]
+    if q.ndim != 2:
+        raise ValueError("positions must be one row per waypoint, one column per joint")
+    q = _check("positions", q, (len(t), q.shape[1]))
+
+    t = t - t[0]
+    n_out = int(np.floor(t[-1] * rate_hz + 1e-9)) + 1
+    ts = np.arange(n_out, dtype=np.float64) / rate_hz
+    if ts[-1] < t[-1]:
+        ts = np.append(ts, t[-1])
+
+    seg = np.clip(np.searchsorted(t, ts, side="right") - 1, 0, len(t) - 2)
+    h = (t[seg + 1] - t[seg])[:, None]
+    s = (ts[:, None] - t[seg][:, None]) / h
+    p0, p1 = q[seg], q[seg + 1]
+
+    if method == "linear":
+        vel = (p1 - p0) / h
+        return ts, p0 + (p1 - p0) * s, vel, np.zeros_like(vel)
+
+    v = knot_velocities(t, q) if v is None else _check("velocities", v, q.shape)
+    if method == "cubic":
+        basis = _CUBIC
+        terms = (p0, h * v[seg], p1, h * v[seg + 1])
+    else:
+        a = np.zeros_like(q) if a is None else _check("accelerations", a, q.shape)
+        basis = _QUINTIC
+        terms = (p0, h * v[seg], h * h * a[seg], p1, h * v[seg + 1], h * h * a[seg + 1])
+
+    # Powers of s and their first two derivatives, (K, 6) each
+    k = np.arange(6, dtype=np.float64)
+    s1 = s[:, 0]
+    pw = s1[:, None] ** k
+    d1 = np.zeros_like(pw)
+    d1[:, 1:] = k[1:] * pw[:, :-1]
+    d2 = np.zeros_like(pw)
+    d2[:, 2:] = k[2:] * (k[2:] - 1) * pw[:, :-2]
+
+    w0, w1, w2 = pw @ basis.T, d1 @ basis.T, d2 @ basis.T  # (K, terms)
+    pos = sum(w0[:, i, None] * term for i, term in enumerate(terms))
+    vel = sum(w1[:, i, None] * term for i, term in enumerate(terms)) / h
+    acc = sum(w2[:, i, None] * term for i, term in enumerate(terms)) / (h * h)
+    return ts, pos, vel, acc